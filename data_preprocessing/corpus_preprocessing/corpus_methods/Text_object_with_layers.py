@@ -3,12 +3,15 @@
 # Requirements: EstNLTK 1.7.2
 # 
 # -- imports
+import re
 import estnltk
 from estnltk import Text
 from estnltk_core import RelationLayer
 
 # -- method for creating event and timex layers
-def create_event_and_timex_layers(text_obj, sentence_base_annotations, sentence_events, sentence_timex, mapping):
+# -- if exact_mapping is True, the words layer was built from corpus tokens and spans in mapping are used as they are
+def create_event_and_timex_layers(text_obj, sentence_base_annotations, sentence_events, sentence_timex, mapping,
+                                  exact_mapping=False):
     event_classes = ['REPORTING', 'PERCEPTION', 'ASPECTUAL', 'I_ACTION', 'I_STATE', 'STATE', 'MODAL',
                      'OCCURRENCE', 'EVENT_CONTAINER', 'CAUSE']
     timex_types = ['DATE', 'TIME', 'DURATION', 'SET']
@@ -22,18 +25,24 @@ def create_event_and_timex_layers(text_obj, sentence_base_annotations, sentence_
                   attributes=['corpus_sentence_ID', 'corpus_word_ID', 'timex_ID', 'expression', 'timex_annotation',
                               'type', 'value'], ambiguous=True)
 
-    last_event_class = None
     last_timex_type = None
     last_timex_value = None
     previous_multiword = False
     estnltk_word_id = 0
+    # event_ID -> annotations of the event parts added so far
+    event_parts = dict()
+    # event_ID -> class field of the first event part
+    first_part_classes = dict()
     
     for sentence_id, sentence in enumerate(sentence_base_annotations):
         for word_id_in_sentence, word_info in enumerate(sentence):
             word = word_info[2]
-            estnltk_word = text_obj.words[estnltk_word_id]
             startend = mapping.get((sentence_id, word_id_in_sentence))
-            estnltk_startend = tuple([estnltk_word.start, estnltk_word.end])     
+            if exact_mapping:
+                estnltk_startend = startend
+            else:
+                estnltk_word = text_obj.words[estnltk_word_id]
+                estnltk_startend = tuple([estnltk_word.start, estnltk_word.end])
             event = sentence_events.get((str(sentence_id), str(word_id_in_sentence)))
             if sentence_timex:
                 timex = sentence_timex.get((str(sentence_id), str(word_id_in_sentence)))
@@ -45,32 +54,31 @@ def create_event_and_timex_layers(text_obj, sentence_base_annotations, sentence_
                 if estnltk_startend[0] <= startend[0] <= estnltk_startend[1] or startend[0] <= estnltk_startend[0] <= startend[1]:
                     startend = estnltk_startend        
                 event_tag = event[0][0]
-                e_class = event[0][2].split()[1]
+                event_fields = event[0][2].split()
+                # event class is in second position
+                e_class = event_fields[1]
                 # if multiword
-                if 'multiword="true"' in event[0][2].split():
-                    # event class is in second position
-                    if event[0][2].split()[1] not in event_classes:
+                if 'multiword="true"' in event_fields:
+                    if e_class not in event_classes:
                         # if multiword part with class is before multiword part without class in text, event class will be corrected
-                        previous_class = None
-                        for e in event_layer:
-                            if e.event_ID==event_tag:
-                                previous_class = e.event_annotation.split()[1]
-                                break
+                        previous_class = first_part_classes.get(event_tag)
                         if previous_class!=None and previous_class in event_classes:
                             e_class = previous_class
                         else:
                             previous_multiword = True
                     # if multiword part without class is before multiword part with class in text, event class will be corrected
                     if previous_multiword:
-                        for e in event_layer:
-                            if e.event_ID==event_tag and e.event_class not in event_classes and e_class in event_classes:
-                                e.event_class=e_class
+                        for annotation in event_parts.get(event_tag, []):
+                            if annotation.event_class not in event_classes and e_class in event_classes:
+                                annotation.event_class=e_class
                                 previous_multiword=False
                                 
-                event_layer.add_annotation((startend[0], startend[1]), corpus_sentence_ID=sentence_id,
-                                           corpus_word_ID=word_id_in_sentence, event_ID=event_tag,
-                                           expression=event[0][1], event_annotation=event[0][2],
-                                           event_class=e_class)
+                annotation = event_layer.add_annotation((startend[0], startend[1]), corpus_sentence_ID=sentence_id,
+                                                        corpus_word_ID=word_id_in_sentence, event_ID=event_tag,
+                                                        expression=event[0][1], event_annotation=event[0][2],
+                                                        event_class=e_class)
+                event_parts.setdefault(event_tag, []).append(annotation)
+                first_part_classes.setdefault(event_tag, event_fields[1])
             
             elif timex:
                 # if spans are not overlapping, start and end are synced with estNLTK words layer
@@ -79,11 +87,12 @@ def create_event_and_timex_layers(text_obj, sentence_base_annotations, sentence_
                 token_start = startend[0]
                 token_end = startend[1]
                 for i in range(len(timex)):
-                    timex_type = timex[i][2].split()[1]
+                    timex_fields = timex[i][2].split()
+                    timex_type = timex_fields[1]
                     # timex is probably part of multiword, if timex type does not exist in timex types
                     if timex_type in timex_types:
                         last_timex_type = timex_type
-                        timex_value = timex[i][2].split()[2]
+                        timex_value = timex_fields[2]
                         last_timex_value = timex_value
                     else:
                         timex_type = last_timex_type
@@ -100,47 +109,83 @@ def create_event_and_timex_layers(text_obj, sentence_base_annotations, sentence_
     return event_layer, timex_layer
 
 
-# -- method for creating gold_word_events layer with IOB-annotations
-def create_gold_word_events_layer(text_obj):
-    gold_word_events = estnltk.Layer(name="gold_word_events", text_object=text_obj, attributes=['nertag'],
-                                     enveloping='words')
+# -- aggregated event classes: classes of events taking an event argument are merged into ARG_CLASS
+agg_event_classes = {'REPORTING': 'ARG_CLASS', 'PERCEPTION': 'ARG_CLASS', 'ASPECTUAL': 'ARG_CLASS',
+                     'I_ACTION': 'ARG_CLASS', 'I_STATE': 'ARG_CLASS'}
+agg_event_classes_no_modal = dict(agg_event_classes, MODAL='ARG_CLASS')
+
+# -- derived IOB event layers: layer name -> (only first words of events, event class mapping)
+# -- if event class mapping is None, tags have no event classes; classes missing from the mapping are kept as they are
+gold_word_event_layers = {
+    'gold_word_events': (False, None),
+    'gold_word_events_w_classes': (False, {}),
+    'gold_word_events_w_agg_classes': (False, agg_event_classes),
+    'gold_word_events_w_agg_classes_no_modal': (False, agg_event_classes_no_modal),
+    'gold_word_events_main': (True, None),
+    'gold_word_events_main_w_classes': (True, {}),
+    'gold_word_events_main_w_agg_classes': (True, agg_event_classes),
+    'gold_word_events_main_w_agg_classes_no_modal': (True, agg_event_classes_no_modal),
+}
+
+
+# -- method for finding IOB-tags ('B', 'I' or 'O') and event classes of words, returns two lists aligned with words layer
+def get_word_event_labels(text_obj):
+    events = {(span.start, span.end): span.annotations[0] for span in text_obj.gold_events}
+    iob_tags = []
+    event_classes = []
     last_event_tag = None
     multiword_event_tags = set()
     for word in text_obj.words:
-        event = text_obj.gold_events.get(word)
+        event = events.get((word.start, word.end))
         if event:
-            is_multiword = 'multiword="true"' in event['event_annotation']
             event_tag = event['event_ID']
             if event_tag != last_event_tag and event_tag not in multiword_event_tags:
-                gold_word_events.add_annotation([word.base_span], nertag='B-EVENT')
+                iob_tags.append('B')
             else:
-                gold_word_events.add_annotation([word.base_span], nertag='I-EVENT')
-            if is_multiword:
+                iob_tags.append('I')
+            event_classes.append(event['event_class'])
+            if 'multiword="true"' in event['event_annotation']:
                 multiword_event_tags.add(event_tag)
             last_event_tag = event_tag
         else:
-            gold_word_events.add_annotation([word.base_span], nertag='O')
+            iob_tags.append('O')
+            event_classes.append(None)
     
-    return gold_word_events
+    return iob_tags, event_classes
 
 
-# -- method for creating gold_word_events layer with IOB-annotations and event classes
-def create_gold_word_events_with_classes_layer(text_obj):
-    gold_word_events_w_classes = estnltk.Layer(name="gold_word_events_w_classes", text_object=text_obj, attributes=['nertag'],
-                                     enveloping='words')
-    
-    for i in range(len(text_obj.gold_word_events)):
-        iob_word = text_obj.gold_word_events[i]
-        event = None
-        if iob_word['nertag'] == 'B-EVENT' or iob_word['nertag'] == 'I-EVENT':
-            event = text_obj.gold_events.get(iob_word)
-        if event:
-            event_class = event['event_class']
-            gold_word_events_w_classes.add_annotation([iob_word[0].base_span], nertag=iob_word['nertag']+'_'+event_class[0])
+# -- method for creating derived IOB-annotated event layers in one pass, returns list of layers
+def create_gold_word_event_layers(text_obj, layer_names=None):
+    if layer_names is None:
+        layer_names = list(gold_word_event_layers.keys())
+    iob_tags, event_classes = get_word_event_labels(text_obj)
+    word_spans = [word.base_span for word in text_obj.words]
+    layers = []
+    for name in layer_names:
+        main_only, class_mapping = gold_word_event_layers[name]
+        if class_mapping is None:
+            labels = ['O' if iob == 'O' else iob+'-EVENT' for iob in iob_tags]
         else:
-            gold_word_events_w_classes.add_annotation([iob_word[0].base_span], nertag='O')
+            labels = ['O' if iob == 'O' else iob+'-EVENT_'+class_mapping.get(e_class, e_class)
+                      for iob, e_class in zip(iob_tags, event_classes)]
+        if main_only:
+            labels = ['O' if iob == 'I' else label for iob, label in zip(iob_tags, labels)]
+        layer = estnltk.Layer(name=name, text_object=text_obj, attributes=['nertag'], enveloping='words')
+        for word_span, label in zip(word_spans, labels):
+            layer.add_annotation([word_span], nertag=label)
+        layers.append(layer)
     
-    return gold_word_events_w_classes
+    return layers
+
+
+# -- method for creating gold_word_events layer with IOB-annotations
+def create_gold_word_events_layer(text_obj):
+    return create_gold_word_event_layers(text_obj, ['gold_word_events'])[0]
+
+
+# -- method for creating gold_word_events layer with IOB-annotations and event classes
+def create_gold_word_events_with_classes_layer(text_obj):
+    return create_gold_word_event_layers(text_obj, ['gold_word_events_w_classes'])[0]
 
 
 # -- method for creating layer of gold event phrases
@@ -178,6 +223,19 @@ def create_gold_timex_phrases(text_obj):
     return gold_timex_phrases
 
 
+# -- relation types of TLINKs with switched argument positions
+reversed_rel_types = {'AFTER': 'BEFORE', 'BEFORE': 'AFTER', 'INCLUDES': 'IS_INCLUDED', 'IS_INCLUDED': 'INCLUDES'}
+
+
+# -- method for finding base spans of each event or timex in a layer, returns dict ID -> list of base spans
+def get_entity_base_spans(layer, id_attribute):
+    entity_spans = dict()
+    for span in layer:
+        for entity_id in dict.fromkeys(annotation[id_attribute] for annotation in span.annotations):
+            entity_spans.setdefault(entity_id, []).append(span.base_span)
+    return entity_spans
+
+
 # -- method for creating event-timex TLINK relation layer
 def create_event_timex_rel_layer(text_obj, relations):
     tlinks_layer = RelationLayer('event_timex_tlinks', span_names=['a_text', 'b_text'], 
@@ -185,55 +243,29 @@ def create_event_timex_rel_layer(text_obj, relations):
                                  display_order=['a_text', 'a_ID', 'rel_type', 'b_text', 'b_ID', 'comment'], 
                                  text_object=text_obj, enveloping='words')    
     if relations:
-        last_ann = None
+        event_spans = get_entity_base_spans(text_obj.gold_events, 'event_ID')
+        timex_spans = get_entity_base_spans(text_obj.gold_timexes, 'timex_ID')
+        added_anns = set()
         for entity in relations:
             ann = relations.get(entity)[0]
-            if last_ann==ann:
-                last_ann == None
-                continue      
-            else:
-                last_ann = ann
-                a_ID = ann[0]
-                rel_type = ann[1]
-                b_ID = ann[2]
-                comment = ann[3]           
-                event_groups = text_obj.gold_events.groupby(['event_ID'], return_type='spans')
-                timex_groups = text_obj.gold_timexes.groupby(['timex_ID'], return_type='spans') 
-                
-                a_event = None
-                b_event = None
-                for key, value in event_groups:
-                    if key[0] == a_ID:
-                        a_event = [span.base_span for span in value]
-                    elif key[0] == b_ID:
-                        b_event = [span.base_span for span in value]
+            if tuple(ann) in added_anns:
+                continue
+            added_anns.add(tuple(ann))
+            a_ID = ann[0]
+            rel_type = ann[1]
+            b_ID = ann[2]
+            comment = ann[3]
+            a_event = event_spans.get(a_ID)
+            b_event = event_spans.get(b_ID)
+            
+            if a_event:
+                tlinks_layer.add_annotation(a_text=a_event, a_ID=a_ID, rel_type=rel_type,
+                                            b_text=timex_spans.get(b_ID), b_ID=b_ID, comment=comment)
             
-                if a_event:
-                    b_timex = None
-                    for key, value in timex_groups:
-                        if key[0] == b_ID:
-                            b_timex = [span.base_span for span in value]
-                            
-                    tlinks_layer.add_annotation(a_text=a_event, a_ID=a_ID, rel_type=rel_type,
-                                                b_text=b_timex, b_ID=b_ID, comment=comment)
-                
-                # if second argument is event, argument positions will be switched and relation type reversed
-                elif b_event:
-                    a_timex = None
-                    for key, value in timex_groups:
-                        if key[0] == a_ID:
-                            a_timex = [span.base_span for span in value]               
-                    if rel_type == 'AFTER':
-                        rel_type = 'BEFORE'
-                    elif rel_type == 'BEFORE':
-                        rel_type = 'AFTER'
-                    elif rel_type == 'INCLUDES':
-                        rel_type = 'IS_INCLUDED'
-                    elif rel_type == 'IS_INCLUDED':
-                        rel_type = 'INCLUDES'
-                
-                    tlinks_layer.add_annotation(a_text=b_event, a_ID=b_ID, rel_type=rel_type,
-                                                b_text=a_timex, b_ID=a_ID, comment=comment)
+            # if second argument is event, argument positions will be switched and relation type reversed
+            elif b_event:
+                tlinks_layer.add_annotation(a_text=b_event, a_ID=b_ID, rel_type=reversed_rel_types.get(rel_type, rel_type),
+                                            b_text=timex_spans.get(a_ID), b_ID=a_ID, comment=comment)
     
     return tlinks_layer
 
@@ -244,44 +276,27 @@ def create_event_dct_rel_layer(text_obj, relations):
                                      attributes=['a_ID', 'rel_type', 'b_ID', 'comment'], 
                                      display_order=['a_text', 'a_ID', 'rel_type', 'b_ID', 'comment'], 
                                      text_object=text_obj, enveloping='words')   
-    last_ann = None   
+    event_spans = get_entity_base_spans(text_obj.gold_events, 'event_ID')
+    added_anns = set()
     for entity in relations:
         ann = relations.get(entity)[0]
-        if last_ann==ann:
-            last_ann == None
-            continue         
-        else:
-            last_ann = ann
-            a_ID = ann[0]
-            rel_type = ann[1]
-            b_ID = ann[2]
-            comment = ann[3]
-            event_groups = text_obj.gold_events.groupby(['event_ID'], return_type='spans')
-            
-            a_event = None
-            b_event = None
-            for key, value in event_groups:
-                if key[0] == a_ID:
-                    a_event = [span.base_span for span in value]
-                elif key[0] == b_ID:
-                    b_event = [span.base_span for span in value]
-            
-            if a_event:
-                tlinks_dct_layer.add_annotation(a_text=a_event, a_ID=a_ID, rel_type=rel_type,
-                                        b_ID=b_ID, comment=comment)
-            
-            # if second argument is event, argument positions will be switched and relation type reversed
-            elif b_event:
-                if rel_type == 'AFTER':
-                    rel_type = 'BEFORE'
-                elif rel_type == 'BEFORE':
-                    rel_type = 'AFTER'
-                elif rel_type == 'INCLUDES':
-                    rel_type = 'IS_INCLUDED'
-                elif rel_type == 'IS_INCLUDED':
-                    rel_type = 'INCLUDES'
-                
-                tlinks_dct_layer.add_annotation(a_text=b_event, a_ID=b_ID, rel_type=rel_type,
+        if tuple(ann) in added_anns:
+            continue
+        added_anns.add(tuple(ann))
+        a_ID = ann[0]
+        rel_type = ann[1]
+        b_ID = ann[2]
+        comment = ann[3]
+        a_event = event_spans.get(a_ID)
+        b_event = event_spans.get(b_ID)
+        
+        if a_event:
+            tlinks_dct_layer.add_annotation(a_text=a_event, a_ID=a_ID, rel_type=rel_type,
+                                            b_ID=b_ID, comment=comment)
+        
+        # if second argument is event, argument positions will be switched and relation type reversed
+        elif b_event:
+            tlinks_dct_layer.add_annotation(a_text=b_event, a_ID=b_ID, rel_type=reversed_rel_types.get(rel_type, rel_type),
                                             b_ID=a_ID, comment=comment)
     
     # article DCT is added to relation layer metadata
@@ -289,11 +304,139 @@ def create_event_dct_rel_layer(text_obj, relations):
     return tlinks_dct_layer
 
 
+# -- mappings from corpus morphological categories to Vabamorf's form and part of speech tags
+corpus_case_forms = {'nom': 'n', 'gen': 'g', 'part': 'p', 'ill': 'ill', 'in': 'in', 'el': 'el', 'all': 'all',
+                     'ad': 'ad', 'abl': 'abl', 'tr': 'tr', 'term': 'ter', 'es': 'es', 'abes': 'ab', 'kom': 'kom',
+                     'adit': 'adt'}
+corpus_person_forms = {
+    'indic pres': {'ps1 sg': 'n', 'ps2 sg': 'd', 'ps3 sg': 'b', 'ps1 pl': 'me', 'ps2 pl': 'te', 'ps3 pl': 'vad'},
+    'indic impf': {'ps1 sg': 'sin', 'ps2 sg': 'sid', 'ps3 sg': 's', 'ps1 pl': 'sime', 'ps2 pl': 'site', 'ps3 pl': 'sid'},
+    'cond pres': {'ps1 sg': 'ksin', 'ps2 sg': 'ksid', 'ps3 sg': 'ks', 'ps1 pl': 'ksime', 'ps2 pl': 'ksite', 'ps3 pl': 'ksid'},
+    'cond past': {'ps1 sg': 'nuksin', 'ps2 sg': 'nuksid', 'ps3 sg': 'nuks', 'ps1 pl': 'nuksime', 'ps2 pl': 'nuksite',
+                  'ps3 pl': 'nuksid'},
+    'imper pres': {'ps2 sg': 'o', 'ps1 pl': 'gem', 'ps2 pl': 'ge', 'ps3 sg': 'gu', 'ps3 pl': 'gu'},
+}
+corpus_verb_forms = {
+    # (mood/non-finite form, tense, voice, polarity) -> form
+    ('indic', 'pres', 'ps', 'neg'): 'o', ('indic', 'impf', 'ps', 'neg'): 'nud',
+    ('indic', 'pres', 'imps', 'af'): 'takse', ('indic', 'pres', 'imps', 'neg'): 'ta',
+    ('indic', 'impf', 'imps', 'af'): 'ti', ('indic', 'impf', 'imps', 'neg'): 'tud',
+    ('cond', 'pres', 'ps', 'af'): 'ks', ('cond', 'pres', 'ps', 'neg'): 'ks',
+    ('cond', 'past', 'ps', 'af'): 'nuks', ('cond', 'past', 'ps', 'neg'): 'nuks',
+    ('cond', 'pres', 'imps', 'af'): 'taks', ('cond', 'pres', 'imps', 'neg'): 'taks',
+    ('imper', 'pres', 'ps', 'neg'): 'o', ('quot', 'pres', 'ps', 'af'): 'vat', ('quot', 'past', 'ps', 'af'): 'nuvat',
+}
+corpus_infinite_forms = {
+    ('inf',): 'da', ('ger',): 'des', ('sup', 'ps', 'ill'): 'ma', ('sup', 'ps', 'in'): 'mas', ('sup', 'ps', 'el'): 'mast',
+    ('sup', 'ps', 'tr'): 'maks', ('sup', 'ps', 'abes'): 'mata', ('sup', 'imps'): 'tama',
+    ('partic', 'past', 'ps'): 'nud', ('partic', 'past', 'imps'): 'tud', ('partic', 'pres', 'ps'): 'v',
+    ('partic', 'pres', 'imps'): 'tav',
+}
+corpus_morph_pat = re.compile('^"(.+?)" (.*)$')
+
+
+def _corpus_verb_form(token, categories, ending):
+    cats = [c for c in categories if c not in ('main', 'aux', 'mod', 'cap')]
+    if categories[:2] == ['aux', 'neg']:
+        return 'neg'
+    if cats and cats[0] == 'imper' and 'neg' in cats and 'aux' in categories:
+        # 'ära'
+        return 'neg o'
+    for length in (3, 2, 1):
+        if tuple(cats[:length]) in corpus_infinite_forms:
+            return corpus_infinite_forms[tuple(cats[:length])]
+    mood_tense = ' '.join(cats[:2])
+    if len(cats) >= 4 and cats[2].startswith('ps') and cats[2] != 'ps' and mood_tense in corpus_person_forms:
+        form = corpus_person_forms[mood_tense].get(cats[2]+' '+cats[3])
+        if form is not None:
+            return form
+    voice = 'imps' if 'imps' in cats else 'ps'
+    polarity = 'neg' if 'neg' in cats else 'af'
+    form = corpus_verb_forms.get((cats[0] if cats else None, cats[1] if len(cats) > 1 else None, voice, polarity))
+    if form is not None:
+        if form in ('o', 'nud') and token.lower().startswith('pol'):
+            # 'pole', 'polnud' = 'ei ole', 'ei olnud'
+            return 'neg '+form
+        return form
+    return ending if ending not in ('0', '') else ''
+
+
+# -- method for converting corpus morphological annotation to EstNLTK morph_analysis attributes
+def parse_corpus_morph(token, morph_syntactic):
+    m = corpus_morph_pat.match(morph_syntactic)
+    if m:
+        root = m.group(1)
+        items = m.group(2).split()
+    else:
+        items = morph_syntactic.split()
+        root = items.pop(0).strip('"') if items else token
+    ending = '0'
+    if items and items[0].startswith('L'):
+        ending = items.pop(0)[1:]
+    pos = items.pop(0) if items else 'X'
+    categories = [c for c in items if not c.startswith(('@', '<', '"')) or c == '<?>']
+    if pos == 'Z':
+        ending = ''
+    clitic = ''
+    if ending not in ('', '0') and ending.endswith(('gi', 'ki')) and not (pos == 'P' and root.endswith(('gi', 'ki'))):
+        clitic = ending[-2:]
+        ending = ending[:-2] if len(ending) > 2 else '0'
+    # part of speech
+    if pos == 'S' and 'prop' in categories:
+        pos = 'H'
+    elif pos == 'A' and 'comp' in categories:
+        pos = 'C'
+    elif pos == 'A' and 'super' in categories:
+        pos = 'U'
+    elif pos == 'N' and 'ord' in categories:
+        pos = 'O'
+    # form
+    if pos == 'V':
+        form = _corpus_verb_form(token, categories, ending)
+    else:
+        number = 'sg' if 'sg' in categories else 'pl' if 'pl' in categories else None
+        case = [corpus_case_forms[c] for c in categories if c in corpus_case_forms]
+        if case:
+            # Vabamorf's short illative (aditiiv) has no number
+            form = (number+' '+case[0]) if number and case[0] != 'adt' else case[0]
+        elif '<?>' in categories:
+            form = '?'
+        else:
+            form = ''
+    # lemma
+    lemma = root.replace('_', '').replace('=', '')
+    if pos == 'V' and (form not in ('neg', 'neg o') or root == 'ole'):
+        lemma += 'ma'
+    return {'normalized_text': token, 'lemma': lemma, 'root': root, 'root_tokens': root.split('_'),
+            'ending': ending, 'clitic': clitic, 'form': form, 'partofspeech': pos}
+
+
+# -- method for creating words, sentences and morph_analysis layers from corpus tokens and morphological annotations
+def create_corpus_morph_layers(text_obj, sentence_base_annotations, mapping):
+    words = estnltk.Layer(name='words', text_object=text_obj, attributes=['normalized_form'], ambiguous=True)
+    sentences = estnltk.Layer(name='sentences', text_object=text_obj, attributes=[], enveloping='words')
+    morph_analysis = estnltk.Layer(name='morph_analysis', text_object=text_obj, parent='words', ambiguous=True,
+                                   attributes=['normalized_text', 'lemma', 'root', 'root_tokens', 'ending', 'clitic',
+                                               'form', 'partofspeech'])
+    for sentence_id, sentence in enumerate(sentence_base_annotations):
+        sentence_spans = []
+        for word_id_in_sentence, word_info in enumerate(sentence):
+            startend = mapping[(sentence_id, word_id_in_sentence)]
+            words.add_annotation(startend, normalized_form=None)
+            morph_analysis.add_annotation(startend, **parse_corpus_morph(word_info[2], word_info[3]))
+            sentence_spans.append(startend)
+        if sentence_spans:
+            sentences.add_annotation(sentence_spans)
+    return words, sentences, morph_analysis
+
+
 # -- method for creating EstNLTK Text-object from article text, returns Text-object and corpus word mapping
-def create_Text_obj(sentence_base_annotations):
+# -- if use_corpus_morph is True, words, sentences and morph_analysis layers are built from the corpus annotations
+# -- instead of running EstNLTK tokenization and Vabamorf
+def create_Text_obj(sentence_base_annotations, use_corpus_morph=False):
     letter_index = 0
     mapping = {}
-    text_obj = ""
+    sentence_texts = []
     
     for sentence_id, sentence in enumerate(sentence_base_annotations):
         sentence_text = []       
@@ -303,33 +446,36 @@ def create_Text_obj(sentence_base_annotations):
             sentence_text.append(word_text)
             mapping[(sentence_id, word_id_in_sentence)] = (letter_index - len(word_text), letter_index)
             letter_index += 1
-        sentence_text = " ".join(sentence_text)
-        if text_obj == "":
-            text_obj += sentence_text
-        else:
-            text_obj += " "+sentence_text
-            
-    return Text(text_obj).tag_layer('morph_analysis'), mapping
+        sentence_texts.append(" ".join(sentence_text))
+    # sentences are separated by a single space, like words
+    text_obj = Text(" ".join(sentence_texts))
+
+    if use_corpus_morph:
+        for layer in create_corpus_morph_layers(text_obj, sentence_base_annotations, mapping):
+            text_obj.add_layer(layer)
+        return text_obj, mapping
+    return text_obj.tag_layer('morph_analysis'), mapping
 
 
 # -- main method for compiling and returning Text-object with layers
-def create_Text_object_with_layers(filename, articlesDCT, baseAnnotations, eventsByLoc, timexesByLoc, event_timex_relations, event_dct_relations):
+def create_Text_object_with_layers(filename, articlesDCT, baseAnnotations, eventsByLoc, timexesByLoc, event_timex_relations, event_dct_relations,
+                                   use_corpus_morph=False):
     sentence_base_annotations = baseAnnotations.get(filename)
     sentence_events = eventsByLoc.get(filename)
     sentence_timex = timexesByLoc.get(filename)
     event_timex_rels = event_timex_relations.get(filename)
     event_dct_rels = event_dct_relations.get(filename)
     # creating Text-object
-    text_obj, mapping = create_Text_obj(sentence_base_annotations)
+    text_obj, mapping = create_Text_obj(sentence_base_annotations, use_corpus_morph=use_corpus_morph)
     text_obj.meta['dct'] = articlesDCT.get(filename)
     text_obj.meta['filename'] = filename
     # adding layers to Text-object
     event_layer, timex_layer = create_event_and_timex_layers(text_obj, sentence_base_annotations, sentence_events,
-                                             sentence_timex, mapping)
+                                             sentence_timex, mapping, exact_mapping=use_corpus_morph)
     text_obj.add_layer( event_layer )
     text_obj.add_layer( timex_layer )
-    text_obj.add_layer( create_gold_word_events_layer(text_obj) )
-    text_obj.add_layer( create_gold_word_events_with_classes_layer(text_obj) )
+    for layer in create_gold_word_event_layers(text_obj):
+        text_obj.add_layer( layer )
     text_obj.add_layer( create_gold_event_phrases(text_obj) )
     text_obj.add_layer( create_gold_timex_phrases(text_obj) )
     text_obj.add_layer( create_event_timex_rel_layer(text_obj, event_timex_rels) )
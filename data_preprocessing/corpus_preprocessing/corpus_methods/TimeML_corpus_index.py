@@ -0,0 +1,92 @@
+# Random-access index of the EstTimeMLCorpus export files
+#
+# CorpusIndex records the byte range of every article in each corpus file, so that
+# one article (or a small list of articles) can be read and converted to a Text-object
+# without loading the annotations of the whole corpus into memory.
+#
+# Usage example:
+#   index = CorpusIndex('EstTimeMLCorpus/corpus')
+#   text_obj = index.create_Text_object('aja_ml_2002_47.tasak.a023.sol')
+#
+# -- imports
+import os
+
+from .TimeML_corpus_reading import read_base_segmentation, read_entity_annotation, read_relation_annotation, \
+    read_relation_to_dct_annotations, read_articles_DCT
+from .TimeML_corpus_tables import CORPUS_FILES, corpusDir
+
+
+class CorpusIndex:
+    """Byte offsets of each article's rows in every EstTimeMLCorpus file."""
+
+    def __init__(self, corpus_dir=corpusDir):
+        self.corpus_dir = corpus_dir
+        # offsets[table][filename] = (start, end) in bytes
+        self.offsets = {table: self._index_file(os.path.join(corpus_dir, file_name))
+                        for table, file_name in CORPUS_FILES.items()}
+        self.filenames = list(self.offsets['base'].keys())
+
+    @staticmethod
+    def _index_file(path):
+        offsets = dict()
+        last_file = None
+        position = 0
+        with open(path, mode='rb') as f:
+            for line in f:
+                line_start = position
+                position += len(line)
+                # Skip the comment line
+                if line.lstrip().startswith(b'#'):
+                    continue
+                file = line.split(b'\t', 1)[0].decode('utf-8')
+                if file != last_file:
+                    if file in offsets:
+                        raise Exception(" Rows of article '"+file+"' are not contiguous in file: '"+path+"'")
+                    last_file = file
+                    offsets[file] = [line_start, position]
+                else:
+                    offsets[file][1] = position
+        return {file: tuple(startend) for file, startend in offsets.items()}
+
+    def __contains__(self, filename):
+        return filename in self.offsets['base']
+
+    def __len__(self):
+        return len(self.filenames)
+
+    # -- method for reading the lines of one article from one corpus file
+    def read_lines(self, table, filename):
+        startend = self.offsets[table].get(filename)
+        if startend is None:
+            return []
+        with open(os.path.join(self.corpus_dir, CORPUS_FILES[table]), mode='rb') as f:
+            f.seek(startend[0])
+            data = f.read(startend[1] - startend[0])
+        return data.decode('utf-8').splitlines(keepends=True)
+
+    def _read_lines(self, table, filenames):
+        lines = []
+        for filename in filenames:
+            lines.extend(self.read_lines(table, filename))
+        return lines
+
+    # -- method for loading annotations of the given articles, returns keyword arguments of create_Text_object_with_layers
+    def load_articles(self, filenames):
+        eventsByLoc, _ = read_entity_annotation(self._read_lines('events', filenames))
+        timexesByLoc, _ = read_entity_annotation(self._read_lines('timexes', filenames))
+        return {
+            'articlesDCT': read_articles_DCT(self._read_lines('metadata', filenames)),
+            'baseAnnotations': read_base_segmentation(self._read_lines('base', filenames)),
+            'eventsByLoc': eventsByLoc,
+            'timexesByLoc': timexesByLoc,
+            'event_timex_relations': read_relation_annotation(self._read_lines('tlink_event_timex', filenames)),
+            'event_dct_relations': read_relation_to_dct_annotations(self._read_lines('tlink_event_dct', filenames)),
+        }
+
+    def load_article(self, filename):
+        return self.load_articles([filename])
+
+    # -- method for creating Text-object with layers of one article
+    def create_Text_object(self, filename, **kwargs):
+        from .Text_object_with_layers import create_Text_object_with_layers
+        return create_Text_object_with_layers(filename, **self.load_article(filename), **kwargs)
@@ -16,10 +16,14 @@ articleMetadata_file   = "EstTimeMLCorpus/corpus/article-metadata"
 
 
 def load_base_segmentation(inputFile):
+    with open(inputFile, mode='r', encoding="utf-8") as f:
+        return read_base_segmentation(f)
+
+# Methods read_* parse an iterable of corpus file lines (e.g. an opened file or the lines of one article)
+def read_base_segmentation(lines):
     base_segmentation = dict()
     last_sentenceID = ""
-    f = open(inputFile, mode='r', encoding="utf-8")
-    for line in f:
+    for line in lines:
         # Skip the comment line
         if ( re.match("^#.+$", line) ):
             continue
@@ -40,14 +44,16 @@ def load_base_segmentation(inputFile):
         syntacticHeadID = items[6]
         base_segmentation[file][-1].append( [sentenceID, wordID, token, morphSyntactic, syntacticID, syntacticHeadID] )
         last_sentenceID = sentenceID
-    f.close()
     return base_segmentation
     
 def load_entity_annotation(inputFile):
+    with open(inputFile, mode='r', encoding="utf-8") as f:
+        return read_entity_annotation(f)
+
+def read_entity_annotation(lines):
     annotationsByLoc = dict()
     annotationsByID  = dict()
-    f = open(inputFile, mode='r', encoding="utf-8")
-    for line in f:
+    for line in lines:
         # Skip the comment line
         if ( re.match("^#.+$", line) ):
             continue
@@ -75,13 +81,15 @@ def load_entity_annotation(inputFile):
         if (entityID not in annotationsByID[file]):
             annotationsByID[file][entityID] = []
         annotationsByID[file][entityID].append( [sentenceID, wordID, expression, annotation] )
-    f.close()
     return (annotationsByLoc, annotationsByID)
 
 def load_dct_annotation(inputFile):
+    with open(inputFile, mode='r', encoding="utf-8") as f:
+        return read_dct_annotation(f)
+
+def read_dct_annotation(lines):
     DCTsByFile = dict()
-    f = open(inputFile, mode='r', encoding="utf-8")
-    for line in f:
+    for line in lines:
         # Skip the comment line
         if ( re.match("^#.+$", line) ):
             continue
@@ -92,13 +100,15 @@ def load_dct_annotation(inputFile):
         file = items[0]
         dct  = items[1]
         DCTsByFile[ file ] = dct
-    f.close()
     return DCTsByFile
 
 def load_relation_annotation(inputFile):
+    with open(inputFile, mode='r', encoding="utf-8") as f:
+        return read_relation_annotation(f)
+
+def read_relation_annotation(lines):
     annotationsByID  = dict()
-    f = open(inputFile, mode='r', encoding="utf-8")
-    for line in f:
+    for line in lines:
         # Skip the comment line
         if ( re.match("^#.+$", line) ):
             continue
@@ -122,13 +132,15 @@ def load_relation_annotation(inputFile):
         if (entityB not in annotationsByID[file]):
             annotationsByID[file][entityB] = []
         annotationsByID[file][entityB].append( annotation )
-    f.close()
     return annotationsByID
 
 def load_relation_to_dct_annotations(inputFile):
+    with open(inputFile, mode='r', encoding="utf-8") as f:
+        return read_relation_to_dct_annotations(f)
+
+def read_relation_to_dct_annotations(lines):
     annotationsByID  = dict()
-    f = open(inputFile, mode='r', encoding="utf-8")
-    for line in f:
+    for line in lines:
         # Skip the comment line
         if ( re.match("^#.+$", line) ):
             continue
@@ -147,14 +159,16 @@ def load_relation_to_dct_annotations(inputFile):
         if (entityA not in annotationsByID[file]):
             annotationsByID[file][entityA] = []
         annotationsByID[file][entityA].append( annotation )
-    f.close()
     return annotationsByID
 
 # Method for getting article DCT (not from TimeMLCorpus)
 def load_articles_DCT(inputFile):
+    with open(inputFile, mode='r', encoding="utf-8") as f:
+        return read_articles_DCT(f)
+
+def read_articles_DCT(lines):
     articlesDCT = dict()
-    f = open(inputFile, mode='r', encoding="utf-8")
-    for line in f:
+    for line in lines:
     # Skip the comment line
         if ( re.match("^#.+$", line) ):
             continue
@@ -0,0 +1,340 @@
+# Single-pass columnar loader for the EstTimeMLCorpus export files
+#
+# All nine corpus files are parsed once into compact array-backed tables:
+# strings (tokens, annotations, entity IDs, ...) are interned into one list,
+# sentence/word IDs are stored as ints and the rows of every table are grouped
+# by article, so that one article is a contiguous (start, end) row range.
+# The tables are persisted as a binary (pickle) cache next to the corpus files,
+# keyed by the size, mtime and SHA-1 of every source file.
+#
+# Usage example:
+#   tables = load_corpus_tables('EstTimeMLCorpus/corpus')
+#   baseAnnotations = tables.base_segmentation()
+#   (eventsByLoc, eventsByID) = tables.entity_annotation('events')
+#
+# -- imports
+import os
+import re
+import pickle
+import hashlib
+from array import array
+
+from .TimeML_corpus_reading import baseAnnotationFile, eventAnnotationFile, timexAnnotationFile, \
+    timexAnnotationDCTFile, tlinkEventTimexFile, tlinkEventDCTFile, tlinkMainEventsFile, tlinkSubEventsFile, \
+    articleMetadata_file
+
+# -- corpus directory and table names mapped to corpus file names
+corpusDir = os.path.dirname(baseAnnotationFile)
+
+CORPUS_FILES = {
+    'base':               os.path.basename(baseAnnotationFile),
+    'events':             os.path.basename(eventAnnotationFile),
+    'timexes':            os.path.basename(timexAnnotationFile),
+    'timex_dct':          os.path.basename(timexAnnotationDCTFile),
+    'tlink_event_timex':  os.path.basename(tlinkEventTimexFile),
+    'tlink_event_dct':    os.path.basename(tlinkEventDCTFile),
+    'tlink_main_events':  os.path.basename(tlinkMainEventsFile),
+    'tlink_sub_events':   os.path.basename(tlinkSubEventsFile),
+    'metadata':           os.path.basename(articleMetadata_file),
+}
+
+# -- columns of each table (int columns hold either numeric IDs or indexes of interned strings)
+TABLE_COLUMNS = {
+    'base':               ['sentence_ID', 'word_ID', 'token', 'morph_syntactic', 'syntactic_ID', 'syntactic_head_ID'],
+    'events':             ['sentence_ID', 'word_ID', 'expression', 'annotation', 'entity_ID'],
+    'timexes':            ['sentence_ID', 'word_ID', 'expression', 'annotation', 'entity_ID'],
+    'timex_dct':          ['dct'],
+    'tlink_event_timex':  ['entity_A', 'relation', 'entity_B', 'comment'],
+    'tlink_event_dct':    ['entity_A', 'relation', 'comment'],
+    'tlink_main_events':  ['entity_A', 'relation', 'entity_B', 'comment'],
+    'tlink_sub_events':   ['entity_A', 'relation', 'entity_B', 'comment'],
+    'metadata':           ['dct'],
+}
+
+# -- number of tab-separated items expected on a line of each file
+TABLE_N_ITEMS = {
+    'base': 7, 'events': 6, 'timexes': 6, 'timex_dct': 2, 'tlink_event_timex': 5,
+    'tlink_event_dct': 4, 'tlink_main_events': 5, 'tlink_sub_events': 5, 'metadata': 2,
+}
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_NAME = '.corpus_tables.pickle'
+
+
+class CorpusTables:
+    """Array-backed tables of all EstTimeMLCorpus annotations.
+       Accessor methods return the same structures as the loaders in
+       TimeML_corpus_reading.py, either for one article or for the whole corpus."""
+
+    def __init__(self):
+        self.strings = []
+        self.filenames = []
+        self.columns = {table: {column: array('i') for column in TABLE_COLUMNS[table]} for table in TABLE_COLUMNS}
+        # per-file row ranges: row_start[table][file_idx], row_end[table][file_idx]
+        self.row_start = {table: array('i') for table in TABLE_COLUMNS}
+        self.row_end = {table: array('i') for table in TABLE_COLUMNS}
+        self._string_ids = dict()
+        self._file_ids = dict()
+
+    def __getstate__(self):
+        # lookup dicts are rebuilt on load, which is faster than unpickling them
+        return {'strings': self.strings, 'filenames': self.filenames, 'columns': self.columns,
+                'row_start': self.row_start, 'row_end': self.row_end}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._string_ids = {string: i for i, string in enumerate(self.strings)}
+        self._file_ids = {filename: i for i, filename in enumerate(self.filenames)}
+
+    def intern(self, string):
+        string_id = self._string_ids.get(string)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(string)
+            self._string_ids[string] = string_id
+        return string_id
+
+    def file_id(self, filename, create=False):
+        file_id = self._file_ids.get(filename)
+        if file_id is None and create:
+            file_id = len(self.filenames)
+            self.filenames.append(filename)
+            self._file_ids[filename] = file_id
+            for table in TABLE_COLUMNS:
+                self.row_start[table].append(0)
+                self.row_end[table].append(0)
+        return file_id
+
+    def rows(self, table, filename):
+        file_id = self._file_ids.get(filename)
+        if file_id is None:
+            return range(0)
+        return range(self.row_start[table][file_id], self.row_end[table][file_id])
+
+    def has_rows(self, table, filename):
+        return len(self.rows(table, filename)) > 0
+
+    def _for_files(self, table, method, filename):
+        if filename is not None:
+            return method(filename)
+        return {f: method(f) for f in self.filenames if self.has_rows(table, f)}
+
+    # -- same structure as load_base_segmentation()
+    def base_segmentation(self, filename=None):
+        return self._for_files('base', self._base_segmentation, filename)
+
+    def _base_segmentation(self, filename):
+        columns = self.columns['base']
+        strings = self.strings
+        sentences = []
+        last_sentence_ID = None
+        for row in self.rows('base', filename):
+            sentence_ID = columns['sentence_ID'][row]
+            if sentence_ID != last_sentence_ID:
+                sentences.append([])
+                last_sentence_ID = sentence_ID
+            sentences[-1].append([str(sentence_ID), str(columns['word_ID'][row]),
+                                  strings[columns['token'][row]], strings[columns['morph_syntactic'][row]],
+                                  str(columns['syntactic_ID'][row]), str(columns['syntactic_head_ID'][row])])
+        return sentences if sentences else None
+
+    # -- same structure as load_entity_annotation(), table is 'events' or 'timexes'
+    def entity_annotation(self, table, filename=None):
+        if filename is not None:
+            return self._entity_annotation(table, filename)
+        annotationsByLoc = dict()
+        annotationsByID = dict()
+        for f in self.filenames:
+            if self.has_rows(table, f):
+                annotationsByLoc[f], annotationsByID[f] = self._entity_annotation(table, f)
+        return (annotationsByLoc, annotationsByID)
+
+    def _entity_annotation(self, table, filename):
+        columns = self.columns[table]
+        strings = self.strings
+        annotationsByLoc = dict()
+        annotationsByID = dict()
+        for row in self.rows(table, filename):
+            sentenceID = str(columns['sentence_ID'][row])
+            wordID = str(columns['word_ID'][row])
+            expression = strings[columns['expression'][row]]
+            annotation = strings[columns['annotation'][row]]
+            entityID = strings[columns['entity_ID'][row]]
+            annotationsByLoc.setdefault((sentenceID, wordID), []).append([entityID, expression, annotation])
+            annotationsByID.setdefault(entityID, []).append([sentenceID, wordID, expression, annotation])
+        if not annotationsByLoc:
+            return (None, None)
+        return (annotationsByLoc, annotationsByID)
+
+    # -- same structure as load_relation_annotation(), table is one of the 'tlink_*' tables (except 'tlink_event_dct')
+    def relation_annotation(self, table, filename=None):
+        return self._for_files(table, lambda f: self._relation_annotation(table, f), filename)
+
+    def _relation_annotation(self, table, filename):
+        columns = self.columns[table]
+        strings = self.strings
+        annotationsByID = dict()
+        for row in self.rows(table, filename):
+            entityA = strings[columns['entity_A'][row]]
+            entityB = strings[columns['entity_B'][row]]
+            annotation = [entityA, strings[columns['relation'][row]], entityB, strings[columns['comment'][row]]]
+            annotationsByID.setdefault(entityA, []).append(annotation)
+            annotationsByID.setdefault(entityB, []).append(annotation)
+        return annotationsByID if annotationsByID else None
+
+    # -- same structure as load_relation_to_dct_annotations()
+    def relation_to_dct_annotations(self, filename=None):
+        return self._for_files('tlink_event_dct', self._relation_to_dct_annotations, filename)
+
+    def _relation_to_dct_annotations(self, filename):
+        columns = self.columns['tlink_event_dct']
+        strings = self.strings
+        annotationsByID = dict()
+        for row in self.rows('tlink_event_dct', filename):
+            entityA = strings[columns['entity_A'][row]]
+            annotation = [entityA, strings[columns['relation'][row]], "t0", strings[columns['comment'][row]]]
+            annotationsByID.setdefault(entityA, []).append(annotation)
+        return annotationsByID if annotationsByID else None
+
+    # -- same structure as load_dct_annotation()
+    def dct_annotation(self, filename=None):
+        return self._for_files('timex_dct', lambda f: self._single_value('timex_dct', f), filename)
+
+    # -- same structure as load_articles_DCT()
+    def articles_DCT(self, filename=None):
+        return self._for_files('metadata', lambda f: self._single_value('metadata', f), filename)
+
+    def _single_value(self, table, filename):
+        rows = self.rows(table, filename)
+        if len(rows) == 0:
+            return None
+        return self.strings[self.columns[table]['dct'][rows[-1]]]
+
+
+# -- method for parsing one corpus file into the given table
+def _parse_corpus_file(tables, table, input_file):
+    columns = [tables.columns[table][column] for column in TABLE_COLUMNS[table]]
+    n_items = TABLE_N_ITEMS[table]
+    intern = tables.intern
+    row_start = tables.row_start[table]
+    row_end = tables.row_end[table]
+    n_rows = 0
+    last_file = None
+    last_file_id = None
+    with open(input_file, mode='r', encoding="utf-8") as f:
+        for line in f:
+            # Skip the comment line
+            if line.lstrip().startswith('#'):
+                continue
+            items = line.rstrip('\r\n').split("\t")
+            if len(items) != n_items:
+                raise Exception(" Unexpected number of items on line: '"+str(line)+"'")
+            file = items[0]
+            if file != last_file:
+                file_id = tables.file_id(file, create=True)
+                if row_end[file_id] != 0:
+                    raise Exception(" Rows of article '"+file+"' are not contiguous in file: '"+input_file+"'")
+                row_start[file_id] = n_rows
+                last_file = file
+                last_file_id = file_id
+            if table == 'base':
+                # fileName	sentence_ID	word_ID_in_sentence	token	morphological_and_syntactic_annotations	syntactic_ID	syntactic_ID_of_head
+                values = (int(items[1]), int(items[2]), intern(items[3]), intern(items[4]), int(items[5]), int(items[6]))
+            elif table in ('events', 'timexes'):
+                # fileName	sentence_ID	word_ID_in_sentence	expression	annotation	entity_ID
+                values = (int(items[1]), int(items[2]), intern(items[3]), intern(items[4]), intern(items[5].rstrip()))
+            elif table == 'tlink_event_dct':
+                # fileName	entityID_A	relation_to_DCT	comment
+                values = (intern(items[1]), intern(items[2]), intern(items[3].rstrip()))
+            elif table == 'timex_dct':
+                # fileName	document_creation_time
+                values = (intern(items[1].rstrip()),)
+            elif table == 'metadata':
+                # fileName	article metadata (DCT is the date in 'ajalehenumber')
+                dct = None
+                for inf in items[1].split(" | "):
+                    if "ajalehenumber" in inf:
+                        dct = re.search(r'(\d+\.\d+\.\d+)', inf).group(1)
+                        break
+                if dct is None:
+                    continue
+                values = (intern(dct),)
+            else:
+                # fileName	entityID_A	relation	entityID_B	comment
+                values = (intern(items[1]), intern(items[2]), intern(items[3]), intern(items[4].rstrip()))
+            for column, value in zip(columns, values):
+                column.append(value)
+            n_rows += 1
+            row_end[last_file_id] = n_rows
+
+
+# -- method for computing the cache key entry of one source file
+def _file_signature(path, with_hash=True):
+    stat = os.stat(path)
+    signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        with open(path, 'rb') as f:
+            signature['sha1'] = hashlib.sha1(f.read()).hexdigest()
+    return signature
+
+
+# -- method for checking whether cached signatures still match the source files
+def _signatures_match(cached, corpus_dir):
+    refresh = False
+    for file_name in CORPUS_FILES.values():
+        path = os.path.join(corpus_dir, file_name)
+        cached_signature = cached.get(file_name)
+        if cached_signature is None:
+            return False, False
+        current = _file_signature(path, with_hash=False)
+        if current['size'] != cached_signature['size']:
+            return False, False
+        if current['mtime_ns'] != cached_signature['mtime_ns']:
+            # e.g. a fresh checkout: contents may still be the same
+            if _file_signature(path)['sha1'] != cached_signature['sha1']:
+                return False, False
+            refresh = True
+    return True, refresh
+
+
+# -- method for parsing all corpus files into CorpusTables (without cache)
+def parse_corpus_tables(corpus_dir=corpusDir):
+    tables = CorpusTables()
+    for table, file_name in CORPUS_FILES.items():
+        _parse_corpus_file(tables, table, os.path.join(corpus_dir, file_name))
+    return tables
+
+
+# -- method for saving CorpusTables with source file signatures to a binary cache file
+def save_corpus_tables(tables, cache_file, signatures):
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        pickle.dump({'version': CACHE_VERSION, 'signatures': signatures, 'tables': tables}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+
+
+# -- main method for loading CorpusTables, reusing the binary cache if the corpus files have not changed
+def load_corpus_tables(corpus_dir=corpusDir, cache_file=None, use_cache=True):
+    if cache_file is None:
+        cache_file = os.path.join(corpus_dir, DEFAULT_CACHE_NAME)
+    if use_cache and os.path.isfile(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                cached = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            cached = None
+        if cached is not None and cached.get('version') == CACHE_VERSION:
+            matches, refresh = _signatures_match(cached['signatures'], corpus_dir)
+            if matches:
+                if refresh:
+                    signatures = {file_name: _file_signature(os.path.join(corpus_dir, file_name))
+                                  for file_name in CORPUS_FILES.values()}
+                    save_corpus_tables(cached['tables'], cache_file, signatures)
+                return cached['tables']
+    signatures = {file_name: _file_signature(os.path.join(corpus_dir, file_name))
+                  for file_name in CORPUS_FILES.values()}
+    tables = parse_corpus_tables(corpus_dir)
+    if use_cache:
+        save_corpus_tables(tables, cache_file, signatures)
+    return tables
@@ -0,0 +1,91 @@
+# ====================================================================
+#  Benchmark of file formats for saving and loading EstNLTK Text objects
+#
+#  Usage example (run in the corpus_preprocessing folder):
+#   python -m corpus_methods.benchmark_file_formats  [input_folder]  [--formats ...]  [--repeat N]
+#
+#  [input_folder] -- folder containing EstNLTK json files (searched recursively);
+#  --formats      -- formats to compare (default: all available formats);
+#  --repeat N     -- number of times loading is repeated (default: 3);
+#
+#  For each format, the script saves all Text objects to a temporary folder,
+#  loads them back and checks that the loaded Text objects equal the originals.
+#  Reports total file size, saving time and loading time.
+# ====================================================================
+
+# -- imports
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from estnltk.converters import json_to_text
+
+from .file_operations import TEXT_FILE_FORMATS, save_Text_to_json, load_Text_from_json, msgpack, zstandard
+
+
+# -- method for finding formats supported in the current environment
+def available_formats():
+    formats = ['json']
+    if msgpack is not None:
+        formats.append('msgpack')
+        if zstandard is not None:
+            formats.append('msgpack.zst')
+    return formats
+
+
+def _find_json_files(input_folder):
+    json_files = []
+    for root, dirs, files in os.walk(input_folder):
+        for fname in sorted(files):
+            if fname.endswith('.json'):
+                json_files.append(os.path.join(root, fname))
+    return sorted(json_files)
+
+
+# -- method for benchmarking one format, returns (size in bytes, saving time, loading time)
+def benchmark_format(text_objects, fmt, repeat=3):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = tmp_dir + os.sep
+        start = time.perf_counter()
+        for text_obj in text_objects:
+            save_Text_to_json(path, text_obj, fmt=fmt)
+        save_time = time.perf_counter() - start
+        filenames = [text_obj.meta['filename'] + TEXT_FILE_FORMATS[fmt] for text_obj in text_objects]
+        size = sum(os.path.getsize(path + filename) for filename in filenames)
+        load_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            loaded = [load_Text_from_json(path, filename) for filename in filenames]
+            load_times.append(time.perf_counter() - start)
+        for text_obj, loaded_obj in zip(text_objects, loaded):
+            if text_obj != loaded_obj:
+                raise Exception('(!) Text object {!r} changed after saving and loading in format {!r}'.format(
+                    text_obj.meta['filename'], fmt))
+    return size, save_time, min(load_times)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare file formats for saving and loading EstNLTK Text objects.')
+    parser.add_argument('input_folder')
+    parser.add_argument('--formats', nargs='+', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    if not os.path.isdir(args.input_folder):
+        print(f'(!) Unexpected input folder: {args.input_folder!r}.')
+        sys.exit(1)
+    formats = args.formats if args.formats else available_formats()
+    text_objects = []
+    for fpath in _find_json_files(args.input_folder):
+        text_obj = json_to_text(file=fpath)
+        # file names are used for saving, so they must be unique
+        text_obj.meta['filename'] = os.path.relpath(fpath, args.input_folder)[:-len('.json')].replace(os.sep, '__')
+        text_objects.append(text_obj)
+    print(f'{len(text_objects)} Text objects loaded from {args.input_folder!r}.')
+    results = {fmt: benchmark_format(text_objects, fmt, repeat=args.repeat) for fmt in formats}
+    json_load_time = results['json'][2] if 'json' in results else None
+    print(f"{'format':<12} {'size (MB)':>10} {'save (s)':>9} {'load (s)':>9} {'load speedup':>13}")
+    for fmt, (size, save_time, load_time) in results.items():
+        speedup = f'{json_load_time / load_time:.2f}x' if json_load_time else '-'
+        print(f'{fmt:<12} {size / 2**20:>10.2f} {save_time:>9.2f} {load_time:>9.2f} {speedup:>13}')
@@ -2,12 +2,14 @@
 #  Utilities for converting Brat annotation files (*.txt, *.ann) to 
 #  EstNLTK v1.6/v1.7 Text objects
 #
-#  Usage example:
-#   python convert_BRAT_to_estnltk_json  [input_folder]  [output_folder] 
+#  Usage example (run in the corpus_preprocessing folder):
+#   python -m corpus_methods.convert_BRAT_to_estnltk_json_updated  [input_folder]  [output_folder] 
 #
 #  [input_folder] -- folder containing brat files (*.txt, *.ann);
 #  [output_folder] -- folder for placing EstNLTK json files 
 #                     (must be an existing folder);
+#  [n_workers] -- number of parallel worker processes (optional, default: 1);
+#                 each json file is written as soon as its document is converted;
 #
 #  Requirements
 #     Python 3.7+
@@ -19,11 +21,15 @@
 import os, os.path
 import re
 import sys
+from bisect import bisect_left
+from multiprocessing import Pool
 
 from estnltk import Text, Layer
 from estnltk.converters import text_to_json
 from estnltk_core import RelationLayer
 
+from .word_span_index import WordSpanIndex
+
 # ====================================================================
 #    Utilities for parsing Brat annotations                           
 # ====================================================================
@@ -124,13 +130,31 @@ def _parse_attrib_annotation( line ):
         raise ValueError( '(!) Unexpected attribute annotation line: {!r}'.format(line) )
 
 def _add_attribute_annotations_to_entity_annotations( entity_annotations, attr_annotations ):
+    entity_attribs_by_id = _index_entity_attribs( entity_annotations )
     for (entity_id1, a_name, a_value, a_id) in attr_annotations:
-        for (entity_id2, entity_type, entity_start, entity_end, entity_attribs) in entity_annotations:
-            if entity_id1 == entity_id2:
-                if a_name in entity_attribs.keys():
-                    if entity_attribs[a_name] != a_value:
-                        raise ValueError('(!) conflicting values for entity attribute {!r}: {!r} vs {!r}'.format(a_name, entity_attribs[a_name], a_value))
-                entity_attribs[a_name] = a_value
+        if entity_id1 in entity_attribs_by_id:
+            _merge_entity_attribs( entity_attribs_by_id[entity_id1], {a_name: a_value} )
+
+def _index_entity_attribs( entity_annotations ):
+    """Maps entity ids to attribute dictionaries of entity annotations.
+       If an entity id appears more than once, its first annotation is used."""
+    entity_attribs_by_id = {}
+    for (entity_id, entity_type, entity_start, entity_end, entity_attribs) in entity_annotations:
+        entity_attribs_by_id.setdefault( entity_id, entity_attribs )
+    return entity_attribs_by_id
+
+def _merge_entity_attribs( entity_attribs, new_attribs ):
+    for a_name, a_value in new_attribs.items():
+        if a_name in entity_attribs and entity_attribs[a_name] != a_value:
+            raise ValueError( ('(!) conflicting values for entity attribute {!r}: {!r} vs {!r}'+
+                               '').format( a_name, entity_attribs[a_name], a_value ) )
+        entity_attribs[a_name] = a_value
+
+def _merge_entity_comment( entity_attribs, comment ):
+    if 'comment' not in entity_attribs:
+        entity_attribs['comment'] = comment
+    else:
+        entity_attribs['comment'] += ' | '+comment
 
 annotator_notes_specific_pat  = re.compile('^(#[0-9]+)\tAnnotatorNotes (\S+)\tOriginal: (.+)$')
 annotator_notes_subtimex_pat  = re.compile('((part_of_interval|begin_point|end_point)=\{[^}]+\})')
@@ -197,76 +221,61 @@ def _parse_relation_annotation( line ):
 
 def import_brat_annotations( fname ):
     assert fname.endswith('.ann')
-    annotations = []
-    # 1) collect annotations
     entity_annotation_pat  = re.compile('^T[0-9]+\t.*')
     attrib_annotation_pat = re.compile('^A[0-9]+\t.*')
     notes_annotation_pat  = re.compile('^#[0-9]+\t+AnnotatorNotes.*')
     relation_annotation_pat = re.compile('^R[0-9]+\t.*')
     entity_annotations = []
-    attr_annotations = []
     rel_annotations = []
-    notes_annotations = []
+    # entity id -> attributes of the entity annotation
+    entity_attribs_by_id = {}
+    # entity id -> attributes and notes preceding the entity annotation
+    pending_annotations = {}
+    
+    def merge_annotation( entity_id, annotation_type, content ):
+        entity_attribs = entity_attribs_by_id.get( entity_id )
+        if entity_attribs is None:
+            # the entity may be defined further in the file
+            pending_annotations.setdefault( entity_id, [] ).append( (annotation_type, content) )
+        elif annotation_type == 'COMMENT':
+            _merge_entity_comment( entity_attribs, content )
+        else:
+            _merge_entity_attribs( entity_attribs, content )
+    
+    # collect annotations and merge attributes and notes into entity annotations
     with open( fname, 'r', encoding='utf-8' ) as in_f:
-        split_lines_ahead = 0
         for line in in_f:
             line = line.rstrip('\n')
             if len(line) == 0:
                 continue
             if entity_annotation_pat.match(line):
-                entity_annotations.append( _parse_entity_annotation( line ) )
+                entity_annotation = _parse_entity_annotation( line )
+                entity_annotations.append( entity_annotation )
+                entity_id = entity_annotation[0]
+                if entity_id not in entity_attribs_by_id:
+                    entity_attribs_by_id[entity_id] = entity_annotation[4]
+                    for (annotation_type, content) in pending_annotations.pop( entity_id, [] ):
+                        merge_annotation( entity_id, annotation_type, content )
             elif attrib_annotation_pat.match(line):
-                attr_annotations.append( _parse_attrib_annotation( line ) )
+                (entity_id, a_name, a_value, a_id) = _parse_attrib_annotation( line )
+                merge_annotation( entity_id, 'ATTRIB', {a_name: a_value} )
             elif notes_annotation_pat.match(line):
-                notes_annotations.append( _parse_notes_annotation( line ) )
+                (entity_id, notes_content, notes_type) = _parse_notes_annotation( line )
+                if notes_type not in ('TIMEX_ATTRIBS', 'COMMENT'):
+                    raise Exception('(!) Unexpected AnnotationNotes {!r}'.format( (entity_id, notes_content, notes_type) ) )
+                merge_annotation( entity_id, notes_type, notes_content )
             elif relation_annotation_pat.match(line):
                 rel_annotations.append( _parse_relation_annotation( line ) )
             else:
                 print('(!) Cannot parse annotation {!r}'.format(line))
-    # 2) merge attribute annotations into entity annotations
-    for (entity_id1, a_name, a_value, a_id) in attr_annotations:
-        entity_found = False
-        for (entity_id2, entity_type, entity_start, entity_end, entity_attribs) in entity_annotations:
-            if entity_id1 == entity_id2:
-                if a_name in entity_attribs.keys():
-                    if entity_attribs[a_name] != a_value:
-                        raise ValueError( ('(!) conflicting values for entity attribute {!r}: {!r} vs {!r}'+
-                                           '').format( a_name, entity_attribs[a_name], a_value ) )
-                entity_attribs[a_name] = a_value
-                entity_found = True
-                break
-        if not entity_found:
-            print( '(!) Cannot find entity {!r} to add attribute value {!r}'.format(entity_id1, {a_name:a_value}) )
-    # 3) merge annotation notes annotations into entity annotations
-    for (entity_id1, notes_content, notes_type) in notes_annotations:
-        if notes_type == 'TIMEX_ATTRIBS':
-            timex_tag_attribs = notes_content
-            entity_found = False
-            for (entity_id2, entity_type, entity_start, entity_end, entity_attribs) in entity_annotations:
-                if entity_id1 == entity_id2:
-                    for a_name, a_value in timex_tag_attribs.items():
-                        if a_name in entity_attribs and entity_attribs[a_name] != a_value:
-                            raise ValueError( ('(!) conflicting values for entity attribute {!r}: {!r} vs {!r}'+
-                                               '').format( a_name, entity_attribs[a_name], a_value ) )
-                        entity_attribs[a_name] = a_value
-                    entity_found = True
-                    break
-            if not entity_found:
-                print( '(!) Cannot find entity {!r} to add attribute values {!r}'.format(entity_id1, timex_tag_attribs) )
-        elif notes_type == 'COMMENT':
-            entity_found = False
-            for (entity_id2, entity_type, entity_start, entity_end, entity_attribs) in entity_annotations:
-                if entity_id1 == entity_id2:
-                    if 'comment' not in entity_attribs:
-                        entity_attribs['comment'] = notes_content
-                    else:
-                        entity_attribs['comment'] += ' | '+notes_content
-                    entity_found = True
-                    break
-            if not entity_found:
-                print( '(!) Cannot find entity {!r} to add comment {!r}'.format(entity_id1, notes_content) )
-        else:
-            raise Exception('(!) Unexpected AnnotationNotes {!r}'.format( (entity_id1, notes_content, notes_type) ) )
+    for entity_id, annotations in pending_annotations.items():
+        for (annotation_type, content) in annotations:
+            if annotation_type == 'COMMENT':
+                print( '(!) Cannot find entity {!r} to add comment {!r}'.format(entity_id, content) )
+            elif annotation_type == 'TIMEX_ATTRIBS':
+                print( '(!) Cannot find entity {!r} to add attribute values {!r}'.format(entity_id, content) )
+            else:
+                print( '(!) Cannot find entity {!r} to add attribute value {!r}'.format(entity_id, content) )
     return [entity_annotations, rel_annotations]
 
 def import_brat_text( fname ):
@@ -280,22 +289,29 @@ def import_brat_text( fname ):
     #content = content.replace('\n', '  ')
     return content
 
-def _calculate_corrected_start_and_delta( text, start ):
-    corrected_start = start
-    delta = 0
-    i = 0
-    while i < corrected_start:
-        symbol = text[i]
-        if symbol == '\n':
-            # Substract 1 for every newline to get the correct location
-            # ( brat seems to apply the same logic while 
-            #   calculating annotations )
-            corrected_start -= 1
-            delta -= 1
-        i += 1
+def _get_newline_offsets( text ):
+    """Returns positions of newlines in the text, each increased by the 
+       number of preceding newlines. The list is sorted, so it can be used 
+       for correcting locations with a binary search."""
+    newline_offsets = []
+    position = text.find('\n')
+    while position != -1:
+        newline_offsets.append( position + len(newline_offsets) )
+        position = text.find('\n', position + 1)
+    return newline_offsets
+
+def _calculate_corrected_start_and_delta( text, start, newline_offsets=None ):
+    # Substract 1 for every newline to get the correct location
+    # ( brat seems to apply the same logic while 
+    #   calculating annotations )
+    # Newline j (at position p) is counted if p < start - j, i.e. p + j < start
+    if newline_offsets is None:
+        newline_offsets = _get_newline_offsets( text )
+    delta = -bisect_left( newline_offsets, start )
+    corrected_start = start + delta
     return corrected_start, delta
 
-def import_from_brat_folder( folder ):
+def _collect_brat_files( folder ):
     assert os.path.isdir( folder ), \
         "(!) Invalid folder name {!r}.".format(folder)
     annotation_files = dict()
@@ -315,216 +331,231 @@ def import_from_brat_folder( folder ):
                 raise ValueError('(!) Annotations file {!r} is missing .txt part.'.format(name))
             if not has_ann:
                 raise ValueError('(!) Annotations file {!r} is missing .ann part.'.format(name))
-    text_objects = []
-    for name in annotation_files.keys():
-        ann_file = [fname for fname in annotation_files[name] if fname.endswith('.ann')][0]
-        entity_annotations, rel_annotations = import_brat_annotations( ann_file )
-        txt_file = [fname for fname in annotation_files[name] if fname.endswith('.txt')][0]
-        content = import_brat_text( txt_file )
-        #
-        #  Create text object and entity annotations
-        #
-        text_obj = Text(content).tag_layer('morph_analysis')
-        text_obj.meta['filename'] = name  
-        event_layer = \
-            Layer('events', attributes=('brat_id', 'class', 'class_confidence', 'duration', 'duration_confidence', 'comment'), \
-                            text_object = text_obj, enveloping='words')
-        timex_layer = \
-            Layer('timexes', attributes=('brat_id', 'tid', 'type', 'value', 'mod', 'anchor_time_id', 'comment'), \
-                             text_object = text_obj, enveloping='words', ambiguous=True)
-        entity_layer = \
-            Layer('entities', attributes=('brat_id',), text_object = text_obj, enveloping='words')
-        entity_id_to_loc_map = dict()
-        for (entity_id, type, start, end, attribs) in entity_annotations:
-            # Check that location strings are expected ones
-            # Collect corrected locations
-            corrected_locs = []
-            if isinstance(start, int):
-                corrected_start, delta = _calculate_corrected_start_and_delta( content, start )
-                snippet = content[corrected_start : end+delta]
-                assert snippet == attribs['text'], \
-                    f"(!) {name!r} has mismatching entity texts {snippet!r} vs {attribs['text']!r}"
-                corrected_locs.append( (corrected_start, end+delta) )
-            elif isinstance(start, list):
-                if len(start) == len(attribs['text']):
-                    for s_start, s_end, s_text in zip(start, end, attribs['text']):
-                        corrected_start, delta = _calculate_corrected_start_and_delta( content, s_start )
-                        snippet = content[corrected_start : s_end+delta]
-                        assert snippet == s_text, \
-                            f"(!) {name!r} has mismatching entity texts {snippet!r} vs {attribs['text']!r}"
-                        corrected_locs.append( (corrected_start, s_end+delta) )
-                elif len(start) <= len(attribs['text']):
-                    # Tricky case: there can be less entity locations than entity text strings
-                    # (!) different number of entity texts ['oli', 'kõige', 'parem'] and start locs [1904, 1908]
-                    assert len(start) == len(end)
-                    for s_start, s_end in zip(start, end):
-                        corrected_start, delta = _calculate_corrected_start_and_delta( content, s_start )
-                        snippet = content[corrected_start : s_end+delta]
-                        assert any([s in snippet for s in attribs['text']]), \
-                            f"(!) {name!r} has mismatching entity texts {snippet!r} vs {attribs['text']!r}"
-                        corrected_locs.append( (corrected_start, s_end+delta) )
-                else:
-                    raise Exception('(!) Mismatching number of locations and texts in {!r}'.format( (entity_id, type, start, end, attribs) ) )
-            entity_id_to_loc_map[entity_id] = corrected_locs
-            #
-            # Synchronize corpus tokenization with EstNLTK word tokenization
-            #
-            estnltk_words = []
-            for loc in corrected_locs:
-                for i in range(len(text_obj.words)):
-                    estnltk_startend = tuple([text_obj.words[i].start, text_obj.words[i].end])
-                    if estnltk_startend == loc:
-                        # 1) full overlap
-                        estnltk_words.append(text_obj.words[i])
-                    elif estnltk_startend[0] <= loc[0] and loc[1] <= estnltk_startend[1]:
-                        # 2) partial overlap: EstNLTK word contains corpus word
-                        estnltk_words.append(text_obj.words[i])
-                    elif loc[0] <= estnltk_startend[0] and estnltk_startend[1] <= loc[1]:
-                        # 3) partial overlap: corpus word contains EstNLTK word
-                        estnltk_words.append(text_obj.words[i])
-                    elif estnltk_startend[0] < loc[0] < estnltk_startend[1]:
-                        # 4) partial overlap: EstNLTK word starts corpus word (but might not end it)
-                        estnltk_words.append(text_obj.words[i])
-                    elif loc[0] < estnltk_startend[0] < loc[1]:
-                        # 5) partial overlap: corpus word starts EstNLTK word (but might not end it)
-                        estnltk_words.append(text_obj.words[i])
-            # add enveloping layers
-            if type == 'Event':
-                attribs['brat_id'] = entity_id
-                event_layer.add_annotation( [s.base_span for s in estnltk_words], **attribs )
-            elif type == 'Timex':
-                attribs['brat_id'] = entity_id
-                timex_layer.add_annotation( [s.base_span for s in estnltk_words], **attribs )
-            elif type == 'Entity':
-                attribs['brat_id'] = entity_id
-                entity_layer.add_annotation( [s.base_span for s in estnltk_words], **attribs )
-        text_obj.add_layer( event_layer )
-        text_obj.add_layer( timex_layer )
-        text_obj.add_layer( entity_layer )
-        #
-        # Add event layer with IOB-annotations
-        #
-        gold_word_events_layer = Layer(name="gold_word_events", text_object=text_obj, 
-                                 attributes=['nertag'], enveloping='words')  
-        for word in text_obj.words:
-            # searching event layer for current word
-            event_idx = None
-            for event in text_obj.events:
-                for j in range(len(event)):
-                    if event[j] == word:
-                        event_idx = j
-                        break
-            if event_idx != None:
-                # if word is a single-word event or is first word of a multiword event, its tag will be 'B-EVENT'
-                if event_idx == 0:
-                    gold_word_events_layer.add_annotation([word.base_span], nertag="B-EVENT")
-                # if word is any subsequent word of a multiword event, its tag will be 'I-EVENT'
-                else:
-                    gold_word_events_layer.add_annotation([word.base_span], nertag="I-EVENT")
-            # if word is not part of any event, its tag will be 'O'
-            else:
-                gold_word_events_layer.add_annotation([word.base_span], nertag="O")        
-        text_obj.add_layer( gold_word_events_layer )
-        #
-        # Add event layer with IOB-annotations and event classes
-        #
-        gold_word_events_w_classes_layer = Layer(name="gold_word_events_w_classes", text_object=text_obj, attributes=['nertag'],
-                                     enveloping='words')
-    
-        for i in range(len(text_obj.gold_word_events)):
-            iob_word = text_obj.gold_word_events[i]
-            event = None
-            if iob_word['nertag'] == 'B-EVENT' or iob_word['nertag'] == 'I-EVENT':
-                for j in range(len(text_obj.events)):
-                    if iob_word[0] in text_obj.events[j]:
-                        event = text_obj.events[j]
-                        break
-            if event:
-                event_class = event['class']
-                gold_word_events_w_classes_layer.add_annotation([iob_word[0].base_span], nertag=iob_word['nertag']+'_'+event_class)
+    # name -> (.ann file, .txt file)
+    return { name: ( [fname for fname in fpaths if fname.endswith('.ann')][0], 
+                     [fname for fname in fpaths if fname.endswith('.txt')][0] ) 
+             for name, fpaths in annotation_files.items() }
+
+def import_from_brat_files( name, ann_file, txt_file ):
+    """Imports one document from brat files (*.ann, *.txt) and returns it as a Text object."""
+    entity_annotations, rel_annotations = import_brat_annotations( ann_file )
+    content = import_brat_text( txt_file )
+    newline_offsets = _get_newline_offsets( content )
+    #
+    #  Create text object and entity annotations
+    #
+    text_obj = Text(content).tag_layer('morph_analysis')
+    text_obj.meta['filename'] = name  
+    word_index = WordSpanIndex( text_obj.words )
+    event_layer = \
+        Layer('events', attributes=('brat_id', 'class', 'class_confidence', 'duration', 'duration_confidence', 'comment'), \
+                        text_object = text_obj, enveloping='words')
+    timex_layer = \
+        Layer('timexes', attributes=('brat_id', 'tid', 'type', 'value', 'mod', 'anchor_time_id', 'comment'), \
+                         text_object = text_obj, enveloping='words', ambiguous=True)
+    entity_layer = \
+        Layer('entities', attributes=('brat_id',), text_object = text_obj, enveloping='words')
+    entity_id_to_loc_map = dict()
+    for (entity_id, type, start, end, attribs) in entity_annotations:
+        # Check that location strings are expected ones
+        # Collect corrected locations
+        corrected_locs = []
+        if isinstance(start, int):
+            corrected_start, delta = _calculate_corrected_start_and_delta( content, start, newline_offsets )
+            snippet = content[corrected_start : end+delta]
+            assert snippet == attribs['text'], \
+                f"(!) {name!r} has mismatching entity texts {snippet!r} vs {attribs['text']!r}"
+            corrected_locs.append( (corrected_start, end+delta) )
+        elif isinstance(start, list):
+            if len(start) == len(attribs['text']):
+                for s_start, s_end, s_text in zip(start, end, attribs['text']):
+                    corrected_start, delta = _calculate_corrected_start_and_delta( content, s_start, newline_offsets )
+                    snippet = content[corrected_start : s_end+delta]
+                    assert snippet == s_text, \
+                        f"(!) {name!r} has mismatching entity texts {snippet!r} vs {attribs['text']!r}"
+                    corrected_locs.append( (corrected_start, s_end+delta) )
+            elif len(start) <= len(attribs['text']):
+                # Tricky case: there can be less entity locations than entity text strings
+                # (!) different number of entity texts ['oli', 'kõige', 'parem'] and start locs [1904, 1908]
+                assert len(start) == len(end)
+                for s_start, s_end in zip(start, end):
+                    corrected_start, delta = _calculate_corrected_start_and_delta( content, s_start, newline_offsets )
+                    snippet = content[corrected_start : s_end+delta]
+                    assert any([s in snippet for s in attribs['text']]), \
+                        f"(!) {name!r} has mismatching entity texts {snippet!r} vs {attribs['text']!r}"
+                    corrected_locs.append( (corrected_start, s_end+delta) )
             else:
-                gold_word_events_w_classes_layer.add_annotation([iob_word[0].base_span], nertag='O')
-    
-        text_obj.add_layer( gold_word_events_w_classes_layer )
+                raise Exception('(!) Mismatching number of locations and texts in {!r}'.format( (entity_id, type, start, end, attribs) ) )
+        entity_id_to_loc_map[entity_id] = corrected_locs
         #
-        #  Add tlink relation annotations
+        # Synchronize corpus tokenization with EstNLTK word tokenization
         #
-        relations_layer = RelationLayer('tlinks', span_names=['a_text', 'b_text'], 
-                                 attributes=['brat_id', 'rel_type'], 
-                                 display_order=['brat_id', 'a_text', 'rel_type', 'b_text'], 
-                                 text_object=text_obj, enveloping='words', ambiguous=True)  
-        for (rel_arg1, rel_type, rel_arg2, rel_id) in rel_annotations:
-            if rel_type == 'has_Argument':
+        estnltk_words = []
+        for loc in corrected_locs:
+            estnltk_words.extend( word_index.overlapping_words( loc[0], loc[1] ) )
+        # add enveloping layers
+        if type == 'Event':
+            attribs['brat_id'] = entity_id
+            event_layer.add_annotation( [s.base_span for s in estnltk_words], **attribs )
+        elif type == 'Timex':
+            attribs['brat_id'] = entity_id
+            timex_layer.add_annotation( [s.base_span for s in estnltk_words], **attribs )
+        elif type == 'Entity':
+            attribs['brat_id'] = entity_id
+            entity_layer.add_annotation( [s.base_span for s in estnltk_words], **attribs )
+    text_obj.add_layer( event_layer )
+    text_obj.add_layer( timex_layer )
+    text_obj.add_layer( entity_layer )
+    #
+    # Add event layers with IOB-annotations, and with IOB-annotations and event classes
+    #
+    # word base span -> list of (event index, position of the word in the event)
+    word_events = dict()
+    for event_idx, event in enumerate(text_obj.events):
+        for j, event_word in enumerate(event):
+            word_event_list = word_events.setdefault(event_word.base_span, [])
+            if not word_event_list or word_event_list[-1][0] != event_idx:
+                word_event_list.append( (event_idx, j) )
+    gold_word_events_layer = Layer(name="gold_word_events", text_object=text_obj, 
+                             attributes=['nertag'], enveloping='words')  
+    gold_word_events_w_classes_layer = Layer(name="gold_word_events_w_classes", text_object=text_obj, attributes=['nertag'],
+                                 enveloping='words')
+    for word in text_obj.words:
+        word_event_list = word_events.get(word.base_span)
+        if word_event_list:
+            # position of the word in the last event containing it determines its tag
+            # if word is a single-word event or is first word of a multiword event, its tag will be 'B-EVENT'
+            # if word is any subsequent word of a multiword event, its tag will be 'I-EVENT'
+            nertag = "B-EVENT" if word_event_list[-1][1] == 0 else "I-EVENT"
+            # class of the first event containing the word is used
+            event_class = text_obj.events[word_event_list[0][0]]['class']
+            gold_word_events_layer.add_annotation([word.base_span], nertag=nertag)
+            gold_word_events_w_classes_layer.add_annotation([word.base_span], nertag=nertag+'_'+event_class)
+        # if word is not part of any event, its tag will be 'O'
+        else:
+            gold_word_events_layer.add_annotation([word.base_span], nertag="O")
+            gold_word_events_w_classes_layer.add_annotation([word.base_span], nertag='O')
+    text_obj.add_layer( gold_word_events_layer )
+    text_obj.add_layer( gold_word_events_w_classes_layer )
+    #
+    #  Index events, entities and timexes by brat_id
+    #  (if a brat_id is repeated, the first event or entity and the last timex annotation is used)
+    #
+    event_by_brat_id = dict()
+    for event in text_obj.events:
+        event_by_brat_id.setdefault(event.brat_id, event)
+    entity_by_brat_id = dict()
+    for entity in text_obj.entities:
+        entity_by_brat_id.setdefault(entity.brat_id, entity)
+    timex_by_brat_id = dict()
+    for timex in text_obj.timexes:
+        for annotation in timex.annotations:
+            timex_by_brat_id[annotation['brat_id']] = annotation
+    #
+    #  Add tlink relation annotations
+    #
+    relations_layer = RelationLayer('tlinks', span_names=['a_text', 'b_text'], 
+                             attributes=['brat_id', 'rel_type'], 
+                             display_order=['brat_id', 'a_text', 'rel_type', 'b_text'], 
+                             text_object=text_obj, enveloping='words', ambiguous=True)  
+    for (rel_arg1, rel_type, rel_arg2, rel_id) in rel_annotations:
+        if rel_type == 'has_Argument':
+            continue
+        assert rel_arg1 in entity_id_to_loc_map.keys()
+        assert rel_arg2 in entity_id_to_loc_map.keys()
+        arg1_event_or_entity = event_by_brat_id.get(rel_arg1) or entity_by_brat_id.get(rel_arg1)
+        arg2_event_or_entity = event_by_brat_id.get(rel_arg2) or entity_by_brat_id.get(rel_arg2)
+        if arg1_event_or_entity:
+            arg2_timex = timex_by_brat_id.get(rel_arg2)
+            if arg2_timex is None:
+                print('(!) Cannot find timex {!r} of relation {!r} in {!r}'.format(rel_arg2, rel_id, text_obj.meta['filename']))
                 continue
-            assert rel_arg1 in entity_id_to_loc_map.keys()
-            assert rel_arg2 in entity_id_to_loc_map.keys()
-            arg1_event = [text_obj['events'][i] for i in range(len(text_obj['events'])) if text_obj['events'][i].brat_id==rel_arg1]
-            arg2_event = [text_obj['events'][i] for i in range(len(text_obj['events'])) if text_obj['events'][i].brat_id==rel_arg2]
-            arg1_entity = [text_obj['entities'][i] for i in range(len(text_obj['entities'])) if text_obj['entities'][i].brat_id==rel_arg1]
-            arg2_entity = [text_obj['entities'][i] for i in range(len(text_obj['entities'])) if text_obj['entities'][i].brat_id==rel_arg2]
-            if arg1_event or arg1_entity:
-                arg2_timex = None
-                for i in range(len(text_obj['timexes'])):
-                    for j in range(len(text_obj['timexes'][i].annotations)):
-                        if text_obj['timexes'][i].annotations[j]['brat_id'] == rel_arg2:
-                            arg1_timex = text_obj['timexes'][i].annotations[j]
-                event_or_entity = arg1_event or arg1_entity
-                relations_layer.add_annotation(brat_id=rel_id, a_text=[s.base_span for s in event_or_entity[0]], 
-                                                rel_type=rel_type, 
-                                                b_text=[s.base_span for s in arg2_timex[0]])
-            # check if relation needs to be reversed
-            # relation will be reversed, if event/entity is second argument
-            elif arg2_event or arg2_entity:
-                arg1_timex = None
-                for i in range(len(text_obj['timexes'])):
-                    for j in range(len(text_obj['timexes'][i].annotations)):
-                        if text_obj['timexes'][i].annotations[j]['brat_id'] == rel_arg1:
-                            arg1_timex = text_obj['timexes'][i].annotations[j]
-                event_or_entity = arg2_event or arg2_entity
-                if len(arg1_timex)==0:
-                    print(arg1_timex, rel_arg1, text_obj.meta['file'])
-                if rel_type == 'AFTER':
-                    rel_type = 'BEFORE'
-                elif rel_type == 'BEFORE':
-                    rel_type = 'AFTER'
-                elif rel_type == 'INCLUDES':
-                    rel_type = 'IS_INCLUDED'
-                elif rel_type == 'IS_INCLUDED':
-                    rel_type = 'INCLUDES'
-                relations_layer.add_annotation(brat_id=rel_id, a_text=[s.base_span for s in event_or_entity[0]], 
-                                                rel_type=rel_type, 
-                                                b_text=[s.base_span for s in arg1_timex.span])        
-        text_obj.add_layer( relations_layer )
-        #
-        #  Add has_Argument relations
-        #
-        arguments_layer = RelationLayer('event_arguments', span_names=['a_text', 'b_text'], 
-                                 attributes=['brat_id', 'rel_type'], 
-                                 display_order=['brat_id', 'a_text', 'rel_type', 'b_text'], 
-                                 text_object=text_obj, enveloping='words', ambiguous=True)
-        for (rel_arg1, rel_type, rel_arg2, rel_id) in rel_annotations:
-            if rel_type != 'has_Argument':
-                continue 
-            assert rel_arg1 in entity_id_to_loc_map.keys()
-            assert rel_arg2 in entity_id_to_loc_map.keys()
-            arg1_loc = entity_id_to_loc_map[rel_arg1]
-            arg2_loc = entity_id_to_loc_map[rel_arg2]  
-            arg1_event = [text_obj['events'][i] for i in range(len(text_obj['events'])) if text_obj['events'][i].brat_id==rel_arg1]
-            arg2_event = [text_obj['events'][i] for i in range(len(text_obj['events'])) if text_obj['events'][i].brat_id==rel_arg2]
-            # check if relation needs to be reversed
-            if arg1_loc[0] > arg2_loc[0]:
-                # reverse relation
-                temp = arg1_event
-                arg1_event = arg2_event
-                arg2_event = temp
-                # change rel_type        
-                rel_type = 'is_Argument_of'    
-            arguments_layer.add_annotation(brat_id=rel_id, a_text=[s.base_span for s in arg1_event[0]], 
-                                                rel_type=rel_type, 
-                                                b_text=[s.base_span for s in arg2_event[0]])
-        text_obj.add_layer( arguments_layer )
-        text_objects.append( text_obj )
-    return text_objects
+            relations_layer.add_annotation(brat_id=rel_id, a_text=[s.base_span for s in arg1_event_or_entity], 
+                                            rel_type=rel_type, 
+                                            b_text=[s.base_span for s in arg2_timex.span])
+        # check if relation needs to be reversed
+        # relation will be reversed, if event/entity is second argument
+        elif arg2_event_or_entity:
+            arg1_timex = timex_by_brat_id.get(rel_arg1)
+            if arg1_timex is None:
+                print('(!) Cannot find timex {!r} of relation {!r} in {!r}'.format(rel_arg1, rel_id, text_obj.meta['filename']))
+                continue
+            event_or_entity = arg2_event_or_entity
+            if rel_type == 'AFTER':
+                rel_type = 'BEFORE'
+            elif rel_type == 'BEFORE':
+                rel_type = 'AFTER'
+            elif rel_type == 'INCLUDES':
+                rel_type = 'IS_INCLUDED'
+            elif rel_type == 'IS_INCLUDED':
+                rel_type = 'INCLUDES'
+            relations_layer.add_annotation(brat_id=rel_id, a_text=[s.base_span for s in event_or_entity], 
+                                            rel_type=rel_type, 
+                                            b_text=[s.base_span for s in arg1_timex.span])        
+    text_obj.add_layer( relations_layer )
+    #
+    #  Add has_Argument relations
+    #
+    arguments_layer = RelationLayer('event_arguments', span_names=['a_text', 'b_text'], 
+                             attributes=['brat_id', 'rel_type'], 
+                             display_order=['brat_id', 'a_text', 'rel_type', 'b_text'], 
+                             text_object=text_obj, enveloping='words', ambiguous=True)
+    for (rel_arg1, rel_type, rel_arg2, rel_id) in rel_annotations:
+        if rel_type != 'has_Argument':
+            continue 
+        assert rel_arg1 in entity_id_to_loc_map.keys()
+        assert rel_arg2 in entity_id_to_loc_map.keys()
+        arg1_loc = entity_id_to_loc_map[rel_arg1]
+        arg2_loc = entity_id_to_loc_map[rel_arg2]  
+        arg1_event = event_by_brat_id.get(rel_arg1)
+        arg2_event = event_by_brat_id.get(rel_arg2)
+        # check if relation needs to be reversed
+        if arg1_loc[0] > arg2_loc[0]:
+            # reverse relation
+            temp = arg1_event
+            arg1_event = arg2_event
+            arg2_event = temp
+            # change rel_type        
+            rel_type = 'is_Argument_of'    
+        arguments_layer.add_annotation(brat_id=rel_id, a_text=[s.base_span for s in arg1_event], 
+                                            rel_type=rel_type, 
+                                            b_text=[s.base_span for s in arg2_event])
+    text_obj.add_layer( arguments_layer )
+    return text_obj
+
+def iter_import_from_brat_folder( folder ):
+    """Imports documents of the brat folder one by one, yielding Text objects."""
+    for name, (ann_file, txt_file) in _collect_brat_files( folder ).items():
+        yield import_from_brat_files( name, ann_file, txt_file )
+
+def import_from_brat_folder( folder ):
+    return list( iter_import_from_brat_folder( folder ) )
+
+def _convert_brat_document( args ):
+    name, ann_file, txt_file, output_folder = args
+    text_obj = import_from_brat_files( name, ann_file, txt_file )
+    fpath = os.path.join( output_folder, name+'.json' )
+    text_to_json(text_obj, file=fpath)
+    return fpath
+
+def convert_brat_folder( input_folder, output_folder, n_workers=1 ):
+    """Converts documents of the brat folder to EstNLTK json files in the output folder. 
+       With n_workers > 1, documents are converted in parallel processes. 
+       Each json file is written as soon as its document is converted. 
+       Returns the number of converted documents."""
+    tasks = [ (name, ann_file, txt_file, output_folder) for name, (ann_file, txt_file) in 
+              _collect_brat_files( input_folder ).items() ]
+    n_converted = 0
+    if n_workers > 1:
+        with Pool( n_workers ) as pool:
+            for fpath in pool.imap_unordered( _convert_brat_document, tasks ):
+                print('=>', fpath)
+                n_converted += 1
+    else:
+        for task in tasks:
+            print('=>', _convert_brat_document( task ))
+            n_converted += 1
+    return n_converted
 
 if __name__ == '__main__':
     input_folder  = None
@@ -536,12 +567,13 @@ if __name__ == '__main__':
         output_folder = sys.argv[2]
         assert os.path.isdir(output_folder), \
             '(!) Unexpected output folder: {!r}. Please give name of the (existing) output folder as the second argument.'.format(output_folder)
-        text_objects = import_from_brat_folder( input_folder )
-        for text in text_objects:
-            fpath = os.path.join( output_folder, text.meta['file']+'.json' )
-            print('=>', fpath)
-            text_to_json(text, file=fpath)
-        print(f"{len(text_objects)} files converted.")
+        n_workers = 1
+        if len(sys.argv) > 3:
+            assert sys.argv[3].isdigit() and int(sys.argv[3]) > 0, \
+                '(!) Unexpected number of workers: {!r}. Please give a positive integer as the third argument.'.format(sys.argv[3])
+            n_workers = int(sys.argv[3])
+        n_converted = convert_brat_folder( input_folder, output_folder, n_workers=n_workers )
+        print(f"{n_converted} files converted.")
     else:
         print(f'(!) Missing command line arguments input_folder and output_folder.\n'+\
-              f'Usage:  python  {sys.argv[0]}  [input_folder]  [output_folder] ')
+              f'Usage:  python  {sys.argv[0]}  [input_folder]  [output_folder]  [n_workers]')
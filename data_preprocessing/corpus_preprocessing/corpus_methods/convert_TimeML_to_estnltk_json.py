@@ -0,0 +1,155 @@
+# ====================================================================
+#  Parallel and resumable conversion of EstTimeMLCorpus articles to
+#  EstNLTK Text objects in JSON format
+#
+#  Usage example (run in the corpus_preprocessing folder):
+#   python -m corpus_methods.convert_TimeML_to_estnltk_json  [output_folder]  [options]
+#
+#  [output_folder] -- folder for placing EstNLTK json files
+#                     (default: EstTimeML_corpus_json);
+#  --workers N     -- number of worker processes (default: number of CPUs);
+#  --chunksize N   -- number of articles sent to a worker at once;
+#  --force         -- convert also the articles whose output is up to date;
+#  --articles ...  -- convert only the given articles;
+#  --corpus_morph  -- build words, sentences and morph_analysis layers from
+#                     the corpus annotations instead of running Vabamorf;
+#
+#  An output file is up to date if it is newer than all EstTimeMLCorpus
+#  files and Text_object_with_layers.py, so an interrupted conversion
+#  continues where it stopped. The conversion mode (Vabamorf or
+#  --corpus_morph) is saved in [output_folder]/.conversion_mode; when the
+#  mode changes, the file is rewritten and all older outputs are converted
+#  again.
+#
+#  Requirements: EstNLTK 1.7.2
+# ====================================================================
+
+# -- imports
+import os
+import sys
+import time
+import argparse
+from multiprocessing import Pool
+
+from estnltk.converters import text_to_json
+
+from .TimeML_corpus_index import CorpusIndex
+from .TimeML_corpus_tables import CORPUS_FILES, corpusDir
+from . import Text_object_with_layers
+
+# -- file of the conversion mode inside output folder
+MODE_FILE = '.conversion_mode'
+
+# -- corpus index of the worker process
+_index = None
+
+
+def _init_worker(corpus_dir):
+    global _index
+    _index = CorpusIndex(corpus_dir)
+
+
+# -- method for converting one article and saving it in JSON format
+def _convert_article(args):
+    filename, output_folder, use_corpus_morph = args
+    start = time.time()
+    text_obj = _index.create_Text_object(filename, use_corpus_morph=use_corpus_morph)
+    fpath = os.path.join(output_folder, filename + '.json')
+    # write to a temporary file first, so that an interrupted run does not leave incomplete outputs
+    tmp_fpath = fpath + '.tmp'
+    text_to_json(text_obj, file=tmp_fpath)
+    os.replace(tmp_fpath, fpath)
+    return filename, time.time() - start
+
+
+# -- method for finding the newest modification time of conversion inputs
+def _sources_mtime(corpus_dir):
+    sources = [os.path.join(corpus_dir, file_name) for file_name in CORPUS_FILES.values()]
+    sources.append(Text_object_with_layers.__file__)
+    return max(os.path.getmtime(path) for path in sources)
+
+
+# -- method for finding the modification time of the conversion mode file; if the mode of the output folder
+# -- is different (or unknown), the mode file is rewritten, so that all existing outputs become out of date
+def _mode_mtime(output_folder, use_corpus_morph):
+    mode = 'corpus_morph' if use_corpus_morph else 'vabamorf'
+    fpath = os.path.join(output_folder, MODE_FILE)
+    old_mode = None
+    if os.path.isfile(fpath):
+        with open(fpath, 'r', encoding='utf-8') as f:
+            old_mode = f.read().strip()
+    if old_mode != mode:
+        if old_mode is not None:
+            print(f'Output folder was converted in mode {old_mode!r}, converting all articles in mode {mode!r}.')
+        with open(fpath, 'w', encoding='utf-8') as f:
+            f.write(mode)
+    return os.path.getmtime(fpath)
+
+
+# -- method for checking whether the JSON file of an article is up to date
+def is_up_to_date(output_folder, filename, sources_mtime):
+    fpath = os.path.join(output_folder, filename + '.json')
+    return os.path.isfile(fpath) and os.path.getmtime(fpath) >= sources_mtime
+
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:d}:{minutes:02d}:{seconds:02d}'
+
+
+# -- main method for converting corpus articles in parallel, returns the number of converted articles
+def convert_corpus(output_folder, corpus_dir=corpusDir, articles=None, workers=None, chunksize=None, force=False,
+                   use_corpus_morph=False):
+    if not os.path.isdir(output_folder):
+        os.mkdir(output_folder)
+    index = CorpusIndex(corpus_dir)
+    if articles is None:
+        articles = index.filenames
+    for filename in articles:
+        if filename not in index:
+            raise ValueError('(!) Unknown article {!r}.'.format(filename))
+    sources_mtime = max(_sources_mtime(corpus_dir), _mode_mtime(output_folder, use_corpus_morph))
+    todo = [filename for filename in articles
+            if force or not is_up_to_date(output_folder, filename, sources_mtime)]
+    print(f'{len(articles)-len(todo)} of {len(articles)} articles are up to date, converting {len(todo)}.')
+    if not todo:
+        return 0
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(todo))
+    if chunksize is None:
+        # a few chunks per worker keeps all workers busy until the end
+        chunksize = max(1, len(todo) // (workers * 4))
+
+    start = time.time()
+    n_converted = 0
+    with Pool(workers, initializer=_init_worker, initargs=(corpus_dir,)) as pool:
+        tasks = [(filename, output_folder, use_corpus_morph) for filename in todo]
+        for filename, seconds in pool.imap_unordered(_convert_article, tasks, chunksize=chunksize):
+            n_converted += 1
+            elapsed = time.time() - start
+            eta = elapsed / n_converted * (len(todo) - n_converted)
+            print(f'[{n_converted}/{len(todo)}] {filename} ({seconds:.1f}s) '
+                  f'elapsed {_format_seconds(elapsed)}, ETA {_format_seconds(eta)}', flush=True)
+    return n_converted
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert EstTimeMLCorpus articles to EstNLTK JSON files.')
+    parser.add_argument('output_folder', nargs='?', default='EstTimeML_corpus_json')
+    parser.add_argument('--corpus_dir', default=corpusDir)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=None)
+    parser.add_argument('--force', action='store_true')
+    parser.add_argument('--articles', nargs='+', default=None)
+    parser.add_argument('--corpus_morph', action='store_true')
+    args = parser.parse_args()
+    if not os.path.isdir(args.corpus_dir):
+        print(f'(!) Unexpected corpus folder: {args.corpus_dir!r}. Please run the script in the corpus_preprocessing folder '
+              f'or give the corpus folder with --corpus_dir.')
+        sys.exit(1)
+    n_converted = convert_corpus(args.output_folder, corpus_dir=args.corpus_dir, articles=args.articles,
+                                 workers=args.workers, chunksize=args.chunksize, force=args.force,
+                                 use_corpus_morph=args.corpus_morph)
+    print(f"{n_converted} files converted.")
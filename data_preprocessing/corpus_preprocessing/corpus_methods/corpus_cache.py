@@ -0,0 +1,162 @@
+# On-disk cache of deserialised corpus files
+#
+# Loading EstNLTK Text objects from JSON is slow, because all layers are rebuilt
+# annotation by annotation. CorpusCache keeps a pickled copy of each loaded object
+# in a cache folder. A cache entry is keyed by the absolute path of the source file
+# (and the loading variant, e.g. the list of loaded layers); the size and mtime of
+# the source file are stored in the entry, so that an entry is invalidated when its
+# source file changes. When the cache grows over its size limit, the least recently
+# used entries are removed.
+#
+# The cache used by file_operations is enabled with environment variables:
+#   CORPUS_CACHE_DIR    -- cache folder, e.g. ~/.cache/Ajasemantika/corpus
+#                          (the cache is disabled if the variable is not set or empty);
+#   CORPUS_CACHE_MAX_MB -- size limit in megabytes (default: 4096);
+#
+# Usage example:
+#   cache = CorpusCache('corpus_cache')
+#   text_obj = cache.load('model_data/TimeML/dev/a.json', lambda fpath: json_to_text(file=fpath))
+#
+# -- imports
+import os
+import gc
+import pickle
+import hashlib
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'Ajasemantika', 'corpus')
+DEFAULT_CACHE_MAX_MB = 4096
+CACHE_ENTRY_EXTENSION = '.pickle'
+
+
+class CorpusCache:
+    """Pickled copies of loaded corpus files, invalidated by source file size and mtime."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size=DEFAULT_CACHE_MAX_MB * 2**20):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+        # running total size of entries; the cache folder is scanned on the first put and when the
+        # total grows over the size limit
+        self._total_size = None
+
+    # -- method for finding the source file stamp: (absolute path, size, mtime)
+    @staticmethod
+    def _stamp(fpath):
+        stat = os.stat(fpath)
+        return os.path.abspath(fpath), stat.st_size, stat.st_mtime_ns
+
+    # -- method for finding the cache entry file of the source file and loading variant
+    def _entry_path(self, fpath, variant=None):
+        key = repr((os.path.abspath(fpath), variant)).encode('utf-8')
+        return os.path.join(self.cache_dir, hashlib.sha1(key).hexdigest() + CACHE_ENTRY_EXTENSION)
+
+    # -- method for reading object from cache, returns None if there is no valid entry
+    def get(self, fpath, variant=None):
+        entry_path = self._entry_path(fpath, variant)
+        try:
+            with open(entry_path, 'rb') as f:
+                stamp = pickle.load(f)
+                if stamp != (self._stamp(fpath), variant):
+                    # source file has changed
+                    f.close()
+                    self._remove(entry_path)
+                    return None
+                # garbage collection makes unpickling of large object graphs several times slower
+                gc_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    obj = pickle.load(f)
+                finally:
+                    if gc_enabled:
+                        gc.enable()
+        except FileNotFoundError:
+            return None
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # broken entry (e.g. written by an incompatible EstNLTK version)
+            self._remove(entry_path)
+            return None
+        # entry modification time is used as the last access time
+        os.utime(entry_path)
+        return obj
+
+    # -- method for writing object to cache and evicting least recently used entries over the size limit
+    def put(self, fpath, obj, variant=None):
+        entry_path = self._entry_path(fpath, variant)
+        tmp_path = '{}.{}.tmp'.format(entry_path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((self._stamp(fpath), variant), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # size of the replaced entry
+        old_size = os.path.getsize(entry_path) if os.path.isfile(entry_path) else 0
+        os.replace(tmp_path, entry_path)
+        if self._total_size is None:
+            self._total_size = self.size()
+        else:
+            self._total_size += os.path.getsize(entry_path) - old_size
+        if self._total_size > self.max_size:
+            self.evict()
+
+    # -- method for loading object from cache, or with loader(fpath) if there is no valid entry
+    def load(self, fpath, loader, variant=None):
+        obj = self.get(fpath, variant)
+        if obj is None:
+            obj = loader(fpath)
+            self.put(fpath, obj, variant)
+        return obj
+
+    @staticmethod
+    def _remove(entry_path):
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            pass
+
+    # -- method for finding cache entries as (last access time, size, path), least recently used first
+    def entries(self):
+        entries = []
+        with os.scandir(self.cache_dir) as dir_entries:
+            for dir_entry in dir_entries:
+                if dir_entry.name.endswith(CACHE_ENTRY_EXTENSION):
+                    try:
+                        stat = dir_entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, dir_entry.path))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    # -- method for removing least recently used entries; removes down to 90% of the size limit,
+    # -- so that the cache folder is not scanned after every new entry
+    def evict(self):
+        entries = self.entries()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in entries:
+            if total_size <= 0.9 * self.max_size:
+                break
+            self._remove(entry_path)
+            total_size -= size
+        self._total_size = total_size
+
+    def clear(self):
+        for _, _, entry_path in self.entries():
+            self._remove(entry_path)
+        self._total_size = 0
+
+
+# -- caches created by get_default_cache in this process, by (cache folder, size limit)
+_default_caches = {}
+
+
+# -- method for getting the cache configured with environment variables, returns None if the cache is disabled
+# -- the same cache object is returned for the same configuration, so that its running size total is kept
+def get_default_cache():
+    cache_dir = os.environ.get('CORPUS_CACHE_DIR', '')
+    if not cache_dir:
+        return None
+    max_mb = float(os.environ.get('CORPUS_CACHE_MAX_MB', DEFAULT_CACHE_MAX_MB))
+    key = (cache_dir, int(max_mb * 2**20))
+    if key not in _default_caches:
+        _default_caches[key] = CorpusCache(cache_dir, max_size=key[1])
+    return _default_caches[key]
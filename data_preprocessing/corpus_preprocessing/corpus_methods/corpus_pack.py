@@ -0,0 +1,172 @@
+# ====================================================================
+#  Single-file corpus packs of EstNLTK Text objects
+#
+#  A corpus pack stores all Text objects of a corpus (or a corpus split)
+#  in one file, together with an offset table keyed by meta['filename'].
+#  The pack is memory-mapped on opening, so a Text object is read only
+#  when it is requested.
+#
+#  Usage example (run in the corpus_preprocessing folder):
+#   python -m corpus_methods.corpus_pack  [input_folder]  [pack_file]  [--format FORMAT]
+#
+#  [input_folder] -- folder containing EstNLTK json files;
+#  [pack_file]    -- corpus pack to be created;
+#  --format       -- format of Text objects in the pack: json, msgpack or
+#                    msgpack.zst (default: json);
+#
+#  Reading example:
+#   with CorpusPack('TimeML_train.pack') as pack:
+#       for text_obj in pack:
+#           ...
+#       text_obj = pack['aja_ml_2002_47.tasak.a006.sol']
+#
+#  Pack layout:
+#   magic (8 bytes) | Text objects | index (json) | index offset, index length (2 x uint64) | magic
+# ====================================================================
+
+# -- imports
+import os
+import sys
+import json
+import mmap
+import struct
+import argparse
+
+from estnltk.converters import text_to_json, json_to_text, dict_to_text
+
+from .file_operations import TEXT_FILE_FORMATS, text_to_bytes, bytes_to_text, select_layers
+
+PACK_MAGIC = b'ESTPACK1'
+PACK_FOOTER = struct.Struct('<QQ8s')
+
+
+# -- method for converting Text-object to bytes in the given format
+def _text_to_record(text_obj, fmt):
+    if fmt == 'json':
+        return text_to_json(text_obj).encode('utf-8')
+    return text_to_bytes(text_obj, fmt)
+
+
+# -- method for writing Text-objects into corpus pack, returns the number of written Text-objects
+# -- records are either Text-objects or (filename, bytes) pairs of already serialised Text-objects
+def write_corpus_pack(pack_file, records, fmt='json'):
+    if fmt not in TEXT_FILE_FORMATS:
+        raise ValueError('(!) Unknown file format {!r}. Supported formats: {!r}'.format(fmt, list(TEXT_FILE_FORMATS)))
+    index = []
+    names = set()
+    tmp_file = pack_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(PACK_MAGIC)
+        for record in records:
+            if isinstance(record, tuple):
+                name, data = record
+            else:
+                name, data = record.meta['filename'], _text_to_record(record, fmt)
+            if name in names:
+                raise ValueError('(!) Duplicate filename {!r} in corpus pack.'.format(name))
+            names.add(name)
+            index.append([name, f.tell(), len(data)])
+            f.write(data)
+        index_offset = f.tell()
+        index_data = json.dumps({'format': fmt, 'records': index}, ensure_ascii=False).encode('utf-8')
+        f.write(index_data)
+        f.write(PACK_FOOTER.pack(index_offset, len(index_data), PACK_MAGIC))
+    os.replace(tmp_file, pack_file)
+    return len(index)
+
+
+# -- method for packing folder of EstNLTK json files, returns the number of packed Text-objects
+def pack_json_folder(input_folder, pack_file, fmt='json'):
+    fnames = sorted(fname for fname in os.listdir(input_folder) if fname.endswith('.json'))
+
+    def records():
+        for fname in fnames:
+            fpath = os.path.join(input_folder, fname)
+            if fmt == 'json':
+                # json files are packed as they are
+                with open(fpath, 'rb') as f:
+                    data = f.read()
+                name = json.loads(data).get('meta', {}).get('filename', fname[:-len('.json')])
+                yield name, data
+            else:
+                yield json_to_text(file=fpath)
+
+    return write_corpus_pack(pack_file, records(), fmt=fmt)
+
+
+class CorpusPack:
+    """Memory-mapped corpus pack with access to Text objects by meta['filename']."""
+
+    def __init__(self, pack_file):
+        self.pack_file = pack_file
+        self._file = open(pack_file, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(PACK_MAGIC)] != PACK_MAGIC or len(self._mmap) < len(PACK_MAGIC) + PACK_FOOTER.size:
+            self.close()
+            raise ValueError('(!) {!r} is not a corpus pack.'.format(pack_file))
+        index_offset, index_length, magic = PACK_FOOTER.unpack(self._mmap[-PACK_FOOTER.size:])
+        if magic != PACK_MAGIC:
+            self.close()
+            raise ValueError('(!) Corpus pack {!r} is incomplete.'.format(pack_file))
+        index = json.loads(self._mmap[index_offset:index_offset + index_length].decode('utf-8'))
+        self.format = index['format']
+        # filename -> (offset, length)
+        self.offsets = {name: (offset, length) for name, offset, length in index['records']}
+        self.names = [record[0] for record in index['records']]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.offsets
+
+    # -- method for reading serialised Text-object without deserialising it
+    def read_bytes(self, name):
+        offset, length = self.offsets[name]
+        return self._mmap[offset:offset + length]
+
+    # -- method for loading Text-object; if layers is given, only these layers (and layers they depend on) are decoded
+    def get(self, name, layers=None):
+        data = self.read_bytes(name)
+        if self.format == 'json':
+            if layers is None:
+                return json_to_text(json_text=data.decode('utf-8'))
+            return dict_to_text(select_layers(json.loads(data), layers))
+        return bytes_to_text(data, self.format, layers=layers)
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def __iter__(self):
+        for name in self.names:
+            yield self[name]
+
+    # -- method for iterating over the given Text-objects (in the given order)
+    def subset(self, names, layers=None):
+        for name in names:
+            yield self.get(name, layers=layers)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pack a folder of EstNLTK json files into one corpus pack file.')
+    parser.add_argument('input_folder')
+    parser.add_argument('pack_file')
+    parser.add_argument('--format', default='json', choices=list(TEXT_FILE_FORMATS))
+    args = parser.parse_args()
+    if not os.path.isdir(args.input_folder):
+        print(f'(!) Unexpected input folder: {args.input_folder!r}.')
+        sys.exit(1)
+    n_packed = pack_json_folder(args.input_folder, args.pack_file, fmt=args.format)
+    print(f'{n_packed} Text objects packed into {args.pack_file!r}.')
@@ -0,0 +1,353 @@
+# ====================================================================
+#  Memory-mapped store of word embeddings
+#
+#  An embedding store keeps the last hidden layers of BERT (by default
+#  the last four) for all words of a corpus in one ragged float32 array
+#  of shape (number of words, number of layers, hidden size) in a .npy
+#  file, together with an index of word offsets keyed by
+#  meta['filename']. Row i of a document is the embedding of word i
+#  (span i of its embedding layer), so rows are aligned with word indexes.
+#  The array is memory-mapped on opening, so embeddings are read from
+#  disk only when they are used.
+#
+#  The hidden layers are stored once and different embeddings are
+#  derived from them when reading (see EMBEDDING_VIEWS):
+#    'concat'      -- concatenation of the layers (as BertTagger with method='concatenate');
+#    'add'         -- sum of the layers (as BertTagger with method='add');
+#    'penultimate' -- penultimate layer;
+#    'last'        -- last layer;
+#  other mixes are given as (layers, pooling) pairs, e.g. (slice(-2, None), 'concat').
+#  All views except sums and means are views of the memory-mapped array.
+#
+#  Embeddings can be stored in a compact encoding (see STORE_ENCODINGS):
+#    'float32' -- as extracted (default);
+#    'float16' -- half precision, half of the size;
+#    'int8'    -- 8-bit integers with scale and offset of each layer and
+#                 dimension (x = q * scale + offset), a quarter of the size;
+#  embeddings of compact stores are dequantised to float32 on reading,
+#  only for the words that are used.
+#
+#  Store files: [store].npy  -- embeddings, shape (number of words, number of layers, hidden size);
+#               [store].index.json -- document offsets and encoding;
+#               [store].scales.npy -- scales and offsets of int8 store, shape (2, number of layers, hidden size);
+#
+#  Usage example (run in the corpus_preprocessing folder):
+#   python -m corpus_methods.embedding_store  [embed_folder]  [--n_layers N]
+#
+#  [embed_folder] -- folder containing concatenated embedding layers in EstNLTK
+#                    json format, saved as [filename]_embed_concat.json (see
+#                    Embeddings.ipynb); the store is saved as [embed_folder]/embed_layers;
+#  --suffix       -- suffix of embedding layer files (default: _embed_concat.json);
+#  --n_layers N   -- number of concatenated hidden layers (default: 4);
+#  --encoding E   -- float32, float16 or int8 (default: float32);
+#  --reencode     -- instead of converting json layers, rewrite the existing
+#                    store [embed_folder]/embed_layers in the given encoding;
+#
+#  Reading example:
+#   store = EmbeddingStore('embeddings/BERT_embed_temp_facts/embed_layers')
+#   text_embeds = store.for_Texts(text_objects, view='concat')
+#   text_embeds[text_idx][word_idx]  -- embedding of a word (numpy array)
+#  Documents of compact stores are LazyEmbeddings, which are indexed the
+#  same way (np.asarray gives all embeddings of the document).
+# ====================================================================
+
+# -- imports
+import os
+import sys
+import json
+import shutil
+import argparse
+
+import numpy as np
+
+EMBEDDING_ATTRIBUTE = 'bert_embedding'
+STORE_DTYPE = np.float32
+# -- encodings of stored embeddings
+STORE_ENCODINGS = ('float32', 'float16', 'int8')
+# -- number of rows encoded at once when writing compact stores
+ENCODING_CHUNK_ROWS = 4096
+# -- number of hidden layers concatenated by BertTagger and RobertaTagger
+N_HIDDEN_LAYERS = 4
+
+# -- named views of hidden layers: view name -> (layers, pooling)
+EMBEDDING_VIEWS = {'concat': (slice(None), 'concat'),
+                   'add': (slice(None), 'add'),
+                   'penultimate': (-2, None),
+                   'last': (-1, None)}
+POOLINGS = ('concat', 'add', 'mean')
+
+
+def _store_files(store):
+    return store + '.npy', store + '.index.json'
+
+
+def _scales_file(store):
+    return store + '.scales.npy'
+
+
+# -- method for finding int8 scales and offsets of each layer and dimension from their minimum and maximum values
+def _int8_scales(min_values, max_values):
+    scale = (max_values - min_values) / 254
+    # constant dimensions are encoded as zeros
+    scale[scale == 0] = 1
+    offset = (max_values + min_values) / 2
+    return np.stack((scale, offset)).astype(STORE_DTYPE)
+
+
+# -- method for encoding float32 embeddings, scales is (scale, offset) pair of int8 encoding
+def encode_embeddings(embeddings, encoding, scales=None):
+    if encoding == 'float32':
+        return embeddings
+    if encoding == 'float16':
+        return embeddings.astype(np.float16)
+    if encoding == 'int8':
+        scale, offset = scales
+        return np.clip(np.rint((embeddings - offset) / scale), -127, 127).astype(np.int8)
+    raise ValueError('(!) Unknown encoding {!r}. Supported encodings: {!r}'.format(encoding, STORE_ENCODINGS))
+
+
+# -- method for decoding stored embeddings to float32, scales is (scale, offset) pair of int8 encoding
+def decode_embeddings(embeddings, scales=None):
+    if scales is not None:
+        scale, offset = scales
+        return embeddings * scale + offset
+    return np.asarray(embeddings, dtype=STORE_DTYPE)
+
+
+# -- method for converting concatenated embedding layer (as dictionary in EstNLTK json format) to array
+# -- of shape (number of words, n_layers, hidden size)
+def layer_dict_to_array(layer_dict, attribute=EMBEDDING_ATTRIBUTE, n_layers=N_HIDDEN_LAYERS):
+    embeddings = np.asarray([span['annotations'][0][attribute] for span in layer_dict['spans']], dtype=STORE_DTYPE)
+    if len(embeddings) == 0:
+        return embeddings.reshape(0, n_layers, 0)
+    # concatenated vectors contain the layers one after another, the last layer at the end
+    return embeddings.reshape(len(embeddings), n_layers, -1)
+
+
+# -- method for writing embedding store, returns the number of written documents
+# -- documents are (filename, array of shape (number of words, number of layers, hidden size)) pairs;
+# -- encoding is one of STORE_ENCODINGS
+def write_embedding_store(store, documents, encoding='float32'):
+    if encoding not in STORE_ENCODINGS:
+        raise ValueError('(!) Unknown encoding {!r}. Supported encodings: {!r}'.format(encoding, STORE_ENCODINGS))
+    npy_file, index_file = _store_files(store)
+    tmp_file = store + '.tmp'
+    offsets = {}
+    n_words = 0
+    word_shape = None
+    # minimum and maximum of each layer and dimension, for int8 scales
+    min_values = max_values = None
+    # the number of words is not known in advance, so the rows are written to a raw file first
+    with open(tmp_file, 'wb') as f:
+        for filename, embeddings in documents:
+            embeddings = np.ascontiguousarray(embeddings, dtype=STORE_DTYPE)
+            if embeddings.ndim != 3:
+                raise ValueError('(!) Embeddings of {!r} must have shape (words, layers, hidden size), got {!r}.'.format(
+                    filename, embeddings.shape))
+            # documents without words have no rows
+            if embeddings.size > 0:
+                if word_shape is None:
+                    word_shape = embeddings.shape[1:]
+                elif embeddings.shape[1:] != word_shape:
+                    raise ValueError('(!) Embeddings of {!r} have shape {!r} per word, expected {!r}.'.format(
+                        filename, embeddings.shape[1:], word_shape))
+                if encoding == 'int8':
+                    doc_min, doc_max = embeddings.min(axis=0), embeddings.max(axis=0)
+                    min_values = doc_min if min_values is None else np.minimum(min_values, doc_min)
+                    max_values = doc_max if max_values is None else np.maximum(max_values, doc_max)
+            if filename in offsets:
+                raise ValueError('(!) Duplicate filename {!r} in embedding store.'.format(filename))
+            offsets[filename] = [n_words, n_words + len(embeddings)]
+            n_words += len(embeddings)
+            f.write(embeddings.tobytes())
+    shape = (n_words,) + tuple(word_shape or (0, 0))
+    scales = None
+    if encoding == 'int8':
+        scales = _int8_scales(min_values, max_values) if min_values is not None else np.ones((2,) + shape[1:], STORE_DTYPE)
+    with open(npy_file + '.tmp', 'wb') as f:
+        np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(np.dtype(encoding)),
+                                                 'fortran_order': False, 'shape': shape})
+        if encoding == 'float32':
+            with open(tmp_file, 'rb') as raw:
+                shutil.copyfileobj(raw, f)
+        elif n_words > 0:
+            raw = np.memmap(tmp_file, dtype=STORE_DTYPE, mode='r', shape=shape)
+            for start in range(0, n_words, ENCODING_CHUNK_ROWS):
+                f.write(encode_embeddings(raw[start:start + ENCODING_CHUNK_ROWS], encoding, scales).tobytes())
+            del raw
+    os.remove(tmp_file)
+    os.replace(npy_file + '.tmp', npy_file)
+    if scales is not None:
+        with open(_scales_file(store) + '.tmp', 'wb') as f:
+            np.save(f, scales)
+        os.replace(_scales_file(store) + '.tmp', _scales_file(store))
+    elif os.path.isfile(_scales_file(store)):
+        # scales of a previous int8 store
+        os.remove(_scales_file(store))
+    with open(index_file, 'w', encoding='utf-8') as f:
+        json.dump({'shape': list(shape), 'encoding': encoding, 'offsets': offsets}, f, ensure_ascii=False)
+    return len(offsets)
+
+
+# -- method for rewriting embedding store in another encoding; if output_store is not given, the store is replaced
+# -- returns the number of written documents
+def encode_embedding_store(store, encoding, output_store=None):
+    source = EmbeddingStore(store)
+    filenames = sorted(source.offsets, key=lambda filename: source.offsets[filename][0])
+    documents = ((filename, source.get_layers(filename)) for filename in filenames)
+    if output_store is not None:
+        return write_embedding_store(output_store, documents, encoding=encoding)
+    tmp_store = store + '_' + encoding
+    n_written = write_embedding_store(tmp_store, documents, encoding=encoding)
+    # the source array must be closed before it is replaced
+    del source, documents
+    for tmp_file, store_file in zip(_store_files(tmp_store) + (_scales_file(tmp_store),),
+                                    _store_files(store) + (_scales_file(store),)):
+        if os.path.isfile(tmp_file):
+            os.replace(tmp_file, store_file)
+        elif os.path.isfile(store_file):
+            os.remove(store_file)
+    return n_written
+
+
+# -- method for finding the size of store files in bytes
+def embedding_store_size(store):
+    return sum(os.path.getsize(fpath) for fpath in _store_files(store) + (_scales_file(store),) if os.path.isfile(fpath))
+
+
+# -- method for converting concatenated embedding layers saved in EstNLTK json format into embedding store
+# -- layer files are found by their suffix, e.g. '_embed_concat.json'; returns the number of converted documents
+def convert_embedding_layers(embed_folder, suffix, store, attribute=EMBEDDING_ATTRIBUTE, n_layers=N_HIDDEN_LAYERS,
+                             encoding='float32'):
+    fnames = sorted(fname for fname in os.listdir(embed_folder) if fname.endswith(suffix))
+
+    def documents():
+        for fname in fnames:
+            with open(os.path.join(embed_folder, fname), 'r', encoding='utf-8') as f:
+                layer_dict = json.load(f)
+            yield fname[:-len(suffix)], layer_dict_to_array(layer_dict, attribute=attribute, n_layers=n_layers)
+
+    return write_embedding_store(store, documents(), encoding=encoding)
+
+
+# -- method for deriving word embeddings from hidden layers of shape (number of words, number of layers, hidden size)
+# -- view is a name in EMBEDDING_VIEWS or (layers, pooling) pair, where layers is an index, slice or list of
+# -- layer indexes and pooling is one of POOLINGS (used if several layers are selected)
+def get_embedding_view(hidden_layers, view='concat'):
+    layers, pooling = EMBEDDING_VIEWS[view] if isinstance(view, str) else view
+    selected = hidden_layers[:, layers]
+    if selected.ndim == 2:
+        # single layer
+        return selected
+    if pooling == 'concat':
+        # no copy is made if the selected layers are consecutive
+        return selected.reshape(len(selected), -1)
+    if pooling == 'add':
+        return selected.sum(axis=1)
+    if pooling == 'mean':
+        return selected.mean(axis=1)
+    raise ValueError('(!) Unknown pooling {!r}. Supported poolings: {!r}'.format(pooling, POOLINGS))
+
+
+class LazyEmbeddings:
+    """Word embeddings of a document in a compact store, dequantised when they are indexed."""
+
+    def __init__(self, hidden_layers, view='concat', scales=None):
+        self.hidden_layers = hidden_layers
+        self.view = view
+        self.scales = scales
+
+    def __len__(self):
+        return len(self.hidden_layers)
+
+    # -- method for getting embeddings of a word (by integer index) or several words (by slice or list of indexes)
+    def __getitem__(self, idx):
+        hidden_layers = self.hidden_layers[idx]
+        if hidden_layers.ndim == 2:
+            return get_embedding_view(decode_embeddings(hidden_layers[np.newaxis], self.scales), self.view)[0]
+        return get_embedding_view(decode_embeddings(hidden_layers, self.scales), self.view)
+
+    def __array__(self, dtype=None, copy=None):
+        embeddings = self[:]
+        return embeddings if dtype is None else embeddings.astype(dtype)
+
+
+class EmbeddingStore:
+    """Memory-mapped hidden layers of word embeddings of a corpus, accessed by meta['filename']."""
+
+    def __init__(self, store):
+        self.store = store
+        npy_file, index_file = _store_files(store)
+        with open(index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        # filename -> (start, end) rows
+        self.offsets = {filename: tuple(offset) for filename, offset in index['offsets'].items()}
+        self.embeddings = np.load(npy_file, mmap_mode='r')
+        if list(self.embeddings.shape) != index['shape']:
+            raise ValueError('(!) Embedding store {!r} is inconsistent: array shape {!r}, index shape {!r}.'.format(
+                store, self.embeddings.shape, index['shape']))
+        # stores written before compact encodings were added are float32
+        self.encoding = index.get('encoding', 'float32')
+        self.scales = np.load(_scales_file(store)) if self.encoding == 'int8' else None
+
+    @property
+    def n_layers(self):
+        return self.embeddings.shape[1]
+
+    @property
+    def hidden_size(self):
+        return self.embeddings.shape[2]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, filename):
+        return filename in self.offsets
+
+    # -- method for getting hidden layers of a document, returns float32 array of shape
+    # -- (number of words, number of layers, hidden size); embeddings of compact stores are dequantised
+    def get_layers(self, filename):
+        start, end = self.offsets[filename]
+        if self.encoding == 'float32':
+            return self.embeddings[start:end]
+        return decode_embeddings(self.embeddings[start:end], self.scales)
+
+    # -- method for getting word embeddings of a document, returns array of shape (number of words, dimension),
+    # -- or LazyEmbeddings of the document if the store is compact
+    # -- view is a name in EMBEDDING_VIEWS or (layers, pooling) pair, see get_embedding_view
+    def get(self, filename, view='concat'):
+        if self.encoding == 'float32':
+            return get_embedding_view(self.get_layers(filename), view)
+        start, end = self.offsets[filename]
+        return LazyEmbeddings(self.embeddings[start:end], view, self.scales)
+
+    def __getitem__(self, filename):
+        return self.get(filename)
+
+    # -- method for getting word embeddings of Text-objects, returns list of arrays in the order of Text-objects
+    def for_Texts(self, text_objects, view='concat'):
+        return [self.get(text_obj.meta['filename'], view) for text_obj in text_objects]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert concatenated embedding layers in EstNLTK json format into an embedding store.')
+    parser.add_argument('embed_folder')
+    parser.add_argument('--suffix', default='_embed_concat.json')
+    parser.add_argument('--n_layers', type=int, default=N_HIDDEN_LAYERS)
+    parser.add_argument('--attribute', default=EMBEDDING_ATTRIBUTE)
+    parser.add_argument('--encoding', default='float32', choices=STORE_ENCODINGS)
+    parser.add_argument('--reencode', action='store_true')
+    args = parser.parse_args()
+    if not os.path.isdir(args.embed_folder):
+        print(f'(!) Unexpected embeddings folder: {args.embed_folder!r}.')
+        sys.exit(1)
+    store = os.path.join(args.embed_folder, 'embed_layers')
+    if args.reencode:
+        old_size = embedding_store_size(store)
+        n_converted = encode_embedding_store(store, args.encoding)
+        print(f'{n_converted} documents of {store!r} rewritten in {args.encoding}: '
+              f'{old_size / 2**20:.1f} MB -> {embedding_store_size(store) / 2**20:.1f} MB.')
+    else:
+        n_converted = convert_embedding_layers(args.embed_folder, args.suffix, store, attribute=args.attribute,
+                                               n_layers=args.n_layers, encoding=args.encoding)
+        print(f'{n_converted} embedding layers converted into {store!r} ({args.encoding}).')
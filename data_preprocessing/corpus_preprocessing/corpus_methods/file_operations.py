@@ -3,17 +3,228 @@
 # -- imports
 import os
 import json
-from estnltk.converters import text_to_json, json_to_text
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed as futures_as_completed
+from estnltk.converters import text_to_json, json_to_text, text_to_dict, dict_to_text, dict_to_layer
 
+from .corpus_cache import get_default_cache
 
-# -- method for converting EstNLTK Text-object to JSON string and saving it in JSON format
-def save_Text_to_json(path, text_object):
-    filename = path + text_object.meta['filename'] + '.json'
-    text_to_json(text_object, file=filename)
+# -- optional dependencies of binary formats
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
-    
-# -- method for loading JSON string from JSON file and returning it as EstNLTK Text-object
-def load_Text_from_json(path, filename):
-    return json_to_text(file=path + filename)
-        
-        
\ No newline at end of file
+# -- supported file formats and their file extensions
+# -- 'msgpack' requires msgpack package, 'msgpack.zst' requires also zstandard package
+TEXT_FILE_FORMATS = {'json': '.json', 'msgpack': '.msgpack', 'msgpack.zst': '.msgpack.zst'}
+
+
+def _check_format(fmt):
+    if fmt not in TEXT_FILE_FORMATS:
+        raise ValueError('(!) Unknown file format {!r}. Supported formats: {!r}'.format(fmt, list(TEXT_FILE_FORMATS)))
+    if fmt != 'json' and msgpack is None:
+        raise ImportError('(!) File format {!r} requires msgpack package: pip install msgpack'.format(fmt))
+    if fmt == 'msgpack.zst' and zstandard is None:
+        raise ImportError('(!) File format {!r} requires zstandard package: pip install zstandard'.format(fmt))
+
+
+# -- method for finding file format from file name
+def get_file_format(filename):
+    for fmt, extension in sorted(TEXT_FILE_FORMATS.items(), key=lambda item: -len(item[1])):
+        if filename.endswith(extension):
+            return fmt
+    return 'json'
+
+
+# -- method for converting EstNLTK Text-object to bytes in binary format
+def text_to_bytes(text_object, fmt='msgpack'):
+    _check_format(fmt)
+    data = msgpack.packb(text_to_dict(text_object), use_bin_type=True)
+    if fmt == 'msgpack.zst':
+        data = zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+# -- method for converting bytes in binary format to dictionary of EstNLTK Text-object
+def _bytes_to_dict(data, fmt='msgpack'):
+    _check_format(fmt)
+    if fmt == 'msgpack.zst':
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+# -- method for converting bytes in binary format to EstNLTK Text-object
+# -- if layers is given, only these layers (and layers they depend on) are added to Text-object
+def bytes_to_text(data, fmt='msgpack', layers=None):
+    return dict_to_text(select_layers(_bytes_to_dict(data, fmt), layers))
+
+
+# -- method for selecting layers (and their parent and enveloped layers) from dictionary of EstNLTK Text-object
+# -- layers may contain names of span layers and relation layers; if layers is None, all layers are kept
+def select_layers(text_dict, layers):
+    if layers is None:
+        return text_dict
+    layer_dicts = {layer_dict['name']: layer_dict for layer_dict in text_dict['layers']}
+    relation_layer_dicts = {layer_dict['name']: layer_dict for layer_dict in text_dict.get('relation_layers', [])}
+    missing = [name for name in layers if name not in layer_dicts and name not in relation_layer_dicts]
+    if missing:
+        raise ValueError('(!) Text {!r} has no layers {!r}'.format(text_dict['meta'].get('filename'), missing))
+    selected = set()
+    to_visit = [name for name in layers if name in layer_dicts]
+    to_visit += [relation_layer_dicts[name]['enveloping'] for name in layers
+                 if name in relation_layer_dicts and relation_layer_dicts[name].get('enveloping')]
+    while to_visit:
+        name = to_visit.pop()
+        if name in selected:
+            continue
+        selected.add(name)
+        for dependency in (layer_dicts[name]['parent'], layer_dicts[name]['enveloping']):
+            if dependency is not None:
+                to_visit.append(dependency)
+    selected_dict = dict(text_dict)
+    selected_dict['layers'] = [layer_dict for layer_dict in text_dict['layers'] if layer_dict['name'] in selected]
+    if 'relation_layers' in text_dict:
+        selected_dict['relation_layers'] = [layer_dict for layer_dict in text_dict['relation_layers']
+                                            if layer_dict['name'] in layers]
+    return selected_dict
+
+
+# -- method for converting EstNLTK Text-object to JSON string (or binary format) and saving it
+# -- fmt is one of TEXT_FILE_FORMATS, file extension is chosen according to the format
+def save_Text_to_json(path, text_object, fmt='json'):
+    _check_format(fmt)
+    filename = path + text_object.meta['filename'] + TEXT_FILE_FORMATS[fmt]
+    if fmt == 'json':
+        text_to_json(text_object, file=filename)
+    else:
+        with open(filename, 'wb') as f:
+            f.write(text_to_bytes(text_object, fmt))
+
+
+# -- method for loading JSON string (or binary format) from file and returning it as EstNLTK Text-object
+# -- file format is detected from the file extension
+# -- if layers is given, only these layers (and layers they depend on) are decoded, e.g. layers=['gold_word_events']
+# -- if use_cache is True, the Text-object is kept in the corpus cache (see corpus_cache.py) and loaded from
+# -- there while the file does not change
+def load_Text_from_json(path, filename, layers=None, use_cache=False):
+    cache = get_default_cache() if use_cache else None
+    if cache is not None:
+        return cache.load(path + filename, lambda fpath: load_Text_from_json(path, filename, layers=layers),
+                          variant=_text_cache_variant(layers))
+    fmt = get_file_format(filename)
+    if fmt == 'json':
+        if layers is None:
+            return json_to_text(file=path + filename)
+        with open(path + filename, 'r', encoding='utf-8') as f:
+            return dict_to_text(select_layers(json.load(f), layers))
+    with open(path + filename, 'rb') as f:
+        return bytes_to_text(f.read(), fmt, layers=layers)
+
+
+# -- method for finding files of Text-objects (in any of TEXT_FILE_FORMATS) in a folder, in sorted order
+def list_Text_files(path):
+    extensions = tuple(TEXT_FILE_FORMATS.values())
+    return sorted(filename for filename in os.listdir(path) if filename.endswith(extensions))
+
+
+def _text_cache_variant(layers):
+    return None if layers is None else tuple(layers)
+
+
+def _load_Text_task(args):
+    path, filename, layers, use_cache = args
+    return load_Text_from_json(path, filename, layers=layers, use_cache=use_cache)
+
+
+def _read_json(fpath):
+    with open(fpath, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _load_json_task(args):
+    fpath, use_cache = args
+    cache = get_default_cache() if use_cache else None
+    if cache is not None:
+        return cache.load(fpath, _read_json, variant='json')
+    return _read_json(fpath)
+
+
+# -- method for running tasks in a pool, yields (task index, result) pairs in the order of completion
+# -- if lookup is given, results found with lookup(task) in the main process are yielded first, and only
+# -- the tasks for which lookup returns None are run (avoids sending cached objects between processes)
+def _run_tasks(function, tasks, n_workers=None, use_threads=False, lookup=None):
+    if lookup is not None:
+        todo = []
+        for i, task in enumerate(tasks):
+            result = lookup(task)
+            if result is None:
+                todo.append(i)
+            else:
+                yield i, result
+        for j, result in _run_tasks(function, [tasks[i] for i in todo], n_workers=n_workers, use_threads=use_threads):
+            yield todo[j], result
+        return
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(tasks))
+    if n_workers <= 1:
+        for i, task in enumerate(tasks):
+            yield i, function(task)
+        return
+    executor_class = ThreadPoolExecutor if use_threads else ProcessPoolExecutor
+    with executor_class(max_workers=n_workers) as executor:
+        futures = {executor.submit(function, task): i for i, task in enumerate(tasks)}
+        for future in futures_as_completed(futures):
+            yield futures[future], future.result()
+
+
+# -- method for loading all Text-objects of a folder in parallel
+# -- returns list of Text-objects sorted by file name; if as_completed is True, returns
+# -- a generator yielding Text-objects in the order they are loaded
+# -- n_workers -- number of worker threads (or processes if use_threads is False), default: number of CPUs;
+# -- use_threads -- threads are used by default, as worker processes can be started only from scripts whose
+# --                main code is under `if __name__ == '__main__':` (with the spawn start method on Windows
+# --                and macOS, workers import the main script again)
+# -- layers -- if given, only these layers (and layers they depend on) are loaded
+# -- use_cache -- if True, loaded Text-objects are kept in the corpus cache, if it is enabled
+# --             with CORPUS_CACHE_DIR (see corpus_cache.py)
+# -- filenames -- if given, only these files of the folder are loaded
+def load_Texts_from_dir(path, layers=None, n_workers=None, use_threads=True, as_completed=False, use_cache=True,
+                        filenames=None):
+    path = os.path.join(path, '')
+    if filenames is None:
+        filenames = list_Text_files(path)
+    tasks = [(path, filename, layers, use_cache) for filename in sorted(filenames)]
+    cache = get_default_cache() if use_cache else None
+    lookup = None
+    if cache is not None:
+        lookup = lambda task: cache.get(path + task[1], variant=_text_cache_variant(layers))
+    results = _run_tasks(_load_Text_task, tasks, n_workers=n_workers, use_threads=use_threads, lookup=lookup)
+    if as_completed:
+        return (text_obj for _, text_obj in results)
+    text_objects = [None] * len(tasks)
+    for i, text_obj in results:
+        text_objects[i] = text_obj
+    return text_objects
+
+
+# -- method for loading a layer of each Text-object from JSON files in parallel, returns list of layers
+# -- file_template is the path of layer files with a {filename} placeholder for meta['filename'],
+# -- e.g. 'embeddings/BERT_embed_temp_facts/{filename}_embed_concat.json'
+# -- JSON files are parsed in worker threads, or in worker processes if use_threads is False (see load_Texts_from_dir),
+# -- or loaded from the corpus cache if use_cache is True; layers are created in the main process
+def load_layers_for_Texts(text_objects, file_template, n_workers=None, use_threads=True, use_cache=True):
+    tasks = [(file_template.format(filename=text_obj.meta['filename']), use_cache) for text_obj in text_objects]
+    cache = get_default_cache() if use_cache else None
+    lookup = None
+    if cache is not None:
+        lookup = lambda task: cache.get(task[0], variant='json')
+    layers = [None] * len(tasks)
+    for i, layer_dict in _run_tasks(_load_json_task, tasks, n_workers=n_workers, use_threads=use_threads,
+                                    lookup=lookup):
+        layers[i] = dict_to_layer(layer_dict, text_objects[i])
+    return layers
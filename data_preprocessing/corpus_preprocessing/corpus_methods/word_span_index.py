@@ -0,0 +1,69 @@
+# Interval index for aligning character locations with EstNLTK words
+#
+# WordSpanIndex keeps the start and end positions of the spans of a words layer in
+# sorted lists, so that the words overlapping with a location are found with a binary
+# search instead of checking every word of the text.
+#
+# Usage example:
+#   index = WordSpanIndex(text_obj.words)
+#   words = index.overlapping_words(start, end)
+#
+# -- imports
+from bisect import bisect_left, bisect_right
+
+# -- types of overlap between a word and a location
+FULL_OVERLAP = 'full'
+# EstNLTK word contains corpus word
+WORD_CONTAINS_LOC = 'word_contains_loc'
+# corpus word contains EstNLTK word
+LOC_CONTAINS_WORD = 'loc_contains_word'
+# EstNLTK word starts corpus word (but might not end it)
+WORD_STARTS_LOC = 'word_starts_loc'
+# corpus word starts EstNLTK word (but might not end it)
+LOC_STARTS_WORD = 'loc_starts_word'
+
+
+# -- method for finding the overlap type of word (start, end) and location (start, end), returns None if they do not overlap
+def get_overlap_type(word_startend, loc):
+    if word_startend == loc:
+        # 1) full overlap
+        return FULL_OVERLAP
+    elif word_startend[0] <= loc[0] and loc[1] <= word_startend[1]:
+        # 2) partial overlap: EstNLTK word contains corpus word
+        return WORD_CONTAINS_LOC
+    elif loc[0] <= word_startend[0] and word_startend[1] <= loc[1]:
+        # 3) partial overlap: corpus word contains EstNLTK word
+        return LOC_CONTAINS_WORD
+    elif word_startend[0] < loc[0] < word_startend[1]:
+        # 4) partial overlap: EstNLTK word starts corpus word (but might not end it)
+        return WORD_STARTS_LOC
+    elif loc[0] < word_startend[0] < loc[1]:
+        # 5) partial overlap: corpus word starts EstNLTK word (but might not end it)
+        return LOC_STARTS_WORD
+    return None
+
+
+class WordSpanIndex:
+    """Sorted start and end positions of non-overlapping word spans (e.g. the words layer)."""
+
+    def __init__(self, words):
+        self.words = list(words)
+        self.starts = [word.start for word in self.words]
+        self.ends = [word.end for word in self.words]
+
+    # -- method for finding indexes and overlap types of words overlapping with location (start, end)
+    def overlapping(self, start, end):
+        loc = (start, end)
+        # only words ending at or after the start and starting at or before the end of the location can overlap
+        lo = bisect_left(self.ends, start)
+        hi = bisect_right(self.starts, end)
+        overlaps = []
+        for i in range(lo, hi):
+            overlap_type = get_overlap_type((self.starts[i], self.ends[i]), loc)
+            if overlap_type is not None:
+                overlaps.append((i, overlap_type))
+        return overlaps
+
+    # -- method for finding words overlapping with location (start, end)
+    def overlapping_words(self, start, end):
+        return [self.words[i] for i, _ in self.overlapping(start, end)]
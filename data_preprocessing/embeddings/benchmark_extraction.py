@@ -0,0 +1,169 @@
+# ====================================================================
+#  Benchmark of embedding extraction precisions and thread settings
+#
+#  Usage example (run in the data_preprocessing/embeddings folder):
+#   python benchmark_extraction.py  [model]  [train_folder]  [test_folder]  [options]
+#
+#  [model]          -- folder (or Hugging Face name) of EstBERT or Est-RoBERTa model;
+#  [train_folder]   -- folder of TempFact training documents (EstNLTK json files), e.g. TempFact/train_larger;
+#  [test_folder]    -- folder of TempFact test documents, e.g. TempFact/test;
+#  --timeml_train_folders ... -- folders of TimeML training documents for the TLINK classifier,
+#                      e.g. TimeML/train TimeML/dev (default: none);
+#  --timeml_test_folders ...  -- folders of TimeML test documents for the TLINK classifier,
+#                      e.g. TimeML/test (default: none);
+#  --precisions ... -- precisions to compare (default: fp32 int8 bf16);
+#  --threads ...    -- numbers of intra-op threads to compare (default: number of CPUs);
+#  --batch_tokens N -- maximum number of tokens in a batch (default: 8192);
+#
+#  For each precision and number of threads, extracts the embeddings of
+#  all documents and reports tokens per second. Embeddings of each
+#  precision are compared with fp32 embeddings (cosine similarity of
+#  concatenated word embeddings), and the classifiers of the duration
+#  and event-timex TLINK experiments (estbert_ev_durations_res and
+#  estbert_ev_timex_res: StandardScaler + linear SVC) are trained and
+#  tested on them:
+#    durations -- main word embedding of an event -> event duration
+#                 (examples as in 02_durations, see duration_examples.py);
+#    tlinks    -- mean embeddings of event and timex phrases -> TLINK type
+#                 (examples as in 04_event_timex_tlinks, see tlink_examples.py);
+#  so the accuracy change of cheaper extraction can be seen. As in the
+#  TLINK experiments, the TLINK classifier is trained and tested on TimeML
+#  and TempFact documents together if TimeML folders are given.
+# ====================================================================
+
+# -- imports
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import torch
+from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import make_pipeline
+from sklearn.svm import SVC
+from sklearn.metrics import accuracy_score
+
+# extract_embeddings adds data_preprocessing/corpus_preprocessing to sys.path
+from extract_embeddings import PRECISIONS, MAX_MODEL_LENGTH, set_threads, load_model, tokenize_sentences, extract_group
+from corpus_methods.file_operations import load_Texts_from_dir
+from corpus_methods.embedding_store import get_embedding_view, N_HIDDEN_LAYERS
+from duration_examples import duration_examples
+from tlink_examples import tlink_examples
+
+
+# -- method for extracting embeddings of Text-objects, returns (list of hidden layer arrays, tokens per second)
+def time_extraction(model, tokenizer, text_objects, batch_tokens, device, group_size=64):
+    max_length = min(tokenizer.model_max_length, MAX_MODEL_LENGTH)
+    n_tokens = sum(len(input_ids) for text_obj in text_objects
+                   for _, _, input_ids, _ in tokenize_sentences(text_obj, tokenizer, max_length))
+    embeddings = []
+    start = time.perf_counter()
+    with torch.inference_mode():
+        for i in range(0, len(text_objects), group_size):
+            embeddings.extend(extract_group(model, tokenizer, text_objects[i:i + group_size], N_HIDDEN_LAYERS,
+                                            batch_tokens, device, max_length))
+    return embeddings, n_tokens / (time.perf_counter() - start)
+
+
+# -- method for finding (embedding, duration) examples: main words of events and their durations
+def main_duration_examples(text_objects, embeddings):
+    main_embeds, _, durations = duration_examples(text_objects, embeddings)
+    return main_embeds, durations
+
+
+# -- method for finding (embedding, TLINK type) examples: mean embeddings of event and timex phrases
+# -- corpus_texts is a list of (corpus, Text-objects, embeddings) triples
+def mean_tlink_examples(corpus_texts):
+    X, y = [], []
+    for corpus, text_objects, embeddings in corpus_texts:
+        _, mean_embeds, tlinks = tlink_examples(text_objects, embeddings, corpus=corpus)
+        X.extend(mean_embeds)
+        y.extend(tlinks)
+    return X, y
+
+
+# -- method for training and testing the classifier of the experiments, returns accuracy
+def classifier_accuracy(train_examples, test_examples):
+    clf = make_pipeline(StandardScaler(), SVC(kernel='linear', random_state=0))
+    clf.fit(*train_examples)
+    X_test, y_test = test_examples
+    return accuracy_score(y_test, clf.predict(X_test))
+
+
+# -- method for finding mean and minimum cosine similarity of word embeddings
+def cosine_similarity(embeddings, reference):
+    a, b = np.concatenate(embeddings), np.concatenate(reference)
+    similarity = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-12)
+    return similarity.mean(), similarity.min()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare speed and accuracy of embedding extraction precisions.')
+    parser.add_argument('model')
+    parser.add_argument('train_folder')
+    parser.add_argument('test_folder')
+    parser.add_argument('--timeml_train_folders', nargs='+', default=[])
+    parser.add_argument('--timeml_test_folders', nargs='+', default=[])
+    parser.add_argument('--precisions', nargs='+', default=list(PRECISIONS), choices=PRECISIONS)
+    parser.add_argument('--threads', nargs='+', type=int, default=[os.cpu_count() or 1])
+    parser.add_argument('--batch_tokens', type=int, default=8192)
+    args = parser.parse_args()
+    # (corpus, train or test) -> input folders
+    input_folders = {('TempFact', 'train'): [args.train_folder], ('TempFact', 'test'): [args.test_folder],
+                     ('TimeML', 'train'): args.timeml_train_folders, ('TimeML', 'test'): args.timeml_test_folders}
+    for folder in sum(input_folders.values(), []):
+        if not os.path.isdir(folder):
+            print(f'(!) Unexpected input folder: {folder!r}.')
+            sys.exit(1)
+    # (corpus, train or test) -> Text-objects
+    texts = {part: sum((load_Texts_from_dir(folder, use_threads=False) for folder in folders), [])
+             for part, folders in input_folders.items()}
+    text_objects = sum(texts.values(), [])
+    for corpus in ('TempFact', 'TimeML'):
+        if texts[corpus, 'train'] or texts[corpus, 'test']:
+            print(f"{corpus}: {len(texts[corpus, 'train'])} training and {len(texts[corpus, 'test'])} test documents "
+                  f"loaded.")
+
+    speeds = {}
+    embeddings = {}
+    # fp32 embeddings are the reference, so they are extracted first
+    for precision in sorted(args.precisions, key=lambda precision: precision != 'fp32'):
+        tokenizer, model, device = load_model(args.model, precision=precision, device='cpu')
+        for n_threads in args.threads:
+            set_threads(n_threads, 1)
+            doc_embeddings, speeds[precision, n_threads] = time_extraction(model, tokenizer, text_objects,
+                                                                           args.batch_tokens, device)
+            embeddings.setdefault(precision, [get_embedding_view(e, 'concat') for e in doc_embeddings])
+            print(f'{precision}, {n_threads} threads: {speeds[precision, n_threads]:.0f} tokens/s', flush=True)
+
+    print(f"{'precision':<10} {'threads':>7} {'tokens/s':>9} {'speedup':>8}")
+    for (precision, n_threads), speed in speeds.items():
+        base_speed = speeds.get(('fp32', n_threads))
+        speedup = f'{speed / base_speed:.2f}x' if base_speed else '-'
+        print(f'{precision:<10} {n_threads:>7} {speed:>9.0f} {speedup:>8}')
+
+    # first document of each part in text_objects
+    part_starts = dict(zip(texts, np.cumsum([0] + [len(part_texts) for part_texts in texts.values()])))
+    accuracies = {}
+    print(f"{'precision':<10} {'cos mean':>9} {'cos min':>8} {'durations':>10} {'change':>7} {'tlinks':>7} {'change':>7}")
+    for precision, doc_embeddings in embeddings.items():
+        # (corpus, train or test) -> embeddings of the documents
+        part_embeddings = {part: doc_embeddings[part_starts[part]:part_starts[part] + len(part_texts)]
+                           for part, part_texts in texts.items()}
+        # durations are annotated only in TempFact
+        duration_accuracy = classifier_accuracy(
+            *[main_duration_examples(texts['TempFact', split], part_embeddings['TempFact', split])
+              for split in ('train', 'test')])
+        tlink_accuracy = classifier_accuracy(
+            *[mean_tlink_examples([(corpus, texts[corpus, split], part_embeddings[corpus, split])
+                                   for corpus in ('TimeML', 'TempFact')])
+              for split in ('train', 'test')])
+        accuracies[precision] = [duration_accuracy, tlink_accuracy]
+        if 'fp32' in embeddings:
+            cos_mean, cos_min = cosine_similarity(doc_embeddings, embeddings['fp32'])
+            changes = [acc - fp32_acc for acc, fp32_acc in zip(accuracies[precision], accuracies['fp32'])]
+        else:
+            cos_mean, cos_min, changes = float('nan'), float('nan'), [float('nan')] * 2
+        print(f'{precision:<10} {cos_mean:>9.4f} {cos_min:>8.4f} {accuracies[precision][0]:>10.3f} {changes[0]:>+7.3f} '
+              f'{accuracies[precision][1]:>7.3f} {changes[1]:>+7.3f}')
@@ -0,0 +1,149 @@
+# ====================================================================
+#  Size and accuracy of compact embedding store encodings
+#
+#  Usage example (run in the data_preprocessing/embeddings folder):
+#   python benchmark_store_encoding.py  [store]  [train_folder]  [test_folder]  [options]
+#
+#  [store]          -- float32 embedding store, e.g.
+#                      ../../model_training/embeddings/BERT_embed_temp_facts/embed_layers;
+#  [train_folder]   -- folder of training documents (EstNLTK json files), e.g. TempFact/train_larger;
+#  [test_folder]    -- folder of test documents, e.g. TempFact/test;
+#  --encodings ...  -- encodings to compare with float32 (default: float16 int8);
+#  --classifiers ...-- classifiers of the grid (default: SVC RF MLP XGB);
+#  --output_folder  -- folder for the encoded stores (default: temporary folder);
+#
+#  The store is rewritten in each encoding and the sizes of the store
+#  files are reported (and the size of json embedding layers, if they are
+#  in the store folder). Then the classifier grid of the duration
+#  experiments (02_durations: main word and mean phrase embeddings of
+#  events, four embedding views, StandardScaler + classifier) is trained
+#  and tested on the embeddings of each encoding, and the accuracy change
+#  from float32 is reported.
+# ====================================================================
+
+# -- imports
+import os
+import sys
+import glob
+import argparse
+import tempfile
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import make_pipeline
+from sklearn.metrics import accuracy_score
+from sklearn.svm import SVC
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.neural_network import MLPClassifier
+
+# -- corpus methods from data_preprocessing/corpus_preprocessing
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'corpus_preprocessing'))
+from corpus_methods.file_operations import load_Texts_from_dir
+from corpus_methods.embedding_store import (EmbeddingStore, encode_embedding_store, embedding_store_size,
+                                            EMBEDDING_VIEWS, STORE_ENCODINGS)
+from duration_examples import duration_examples
+
+CLASSIFIERS = ('SVC', 'RF', 'MLP', 'XGB')
+
+
+# -- method for creating a classifier of the duration experiments; XGB also needs the number of classes
+def make_classifier(name, n_classes):
+    if name == 'SVC':
+        clf = SVC(kernel='linear', random_state=0)
+    elif name == 'RF':
+        clf = RandomForestClassifier(random_state=0)
+    elif name == 'MLP':
+        clf = MLPClassifier(early_stopping=True, random_state=0)
+    elif name == 'XGB':
+        from xgboost import XGBClassifier
+        clf = XGBClassifier(objective='multi:softmax', num_class=n_classes, random_state=0)
+    else:
+        raise ValueError('(!) Unknown classifier {!r}. Supported classifiers: {!r}'.format(name, CLASSIFIERS))
+    return make_pipeline(StandardScaler(), clf)
+
+
+# -- method for training and testing the classifier grid, returns {(view, features, classifier): accuracy}
+def grid_accuracies(store, train_texts, test_texts, classifiers):
+    accuracies = {}
+    for view in EMBEDDING_VIEWS:
+        train_main, train_mean, y_train = duration_examples(train_texts, store.for_Texts(train_texts, view))
+        test_main, test_mean, y_test = duration_examples(test_texts, store.for_Texts(test_texts, view))
+        labels = sorted(set(y_train) | set(y_test))
+        for features, X_train, X_test in (('main', train_main, test_main), ('mean', train_mean, test_mean)):
+            for name in classifiers:
+                clf = make_classifier(name, len(labels))
+                if name == 'XGB':
+                    # XGBoost needs integer labels
+                    clf.fit(X_train, [labels.index(label) for label in y_train])
+                    y_pred = [labels[label] for label in clf.predict(X_test)]
+                else:
+                    clf.fit(X_train, y_train)
+                    y_pred = clf.predict(X_test)
+                accuracies[view, features, name] = accuracy_score(y_test, y_pred)
+    return accuracies
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare size and accuracy of embedding store encodings.')
+    parser.add_argument('store')
+    parser.add_argument('train_folder')
+    parser.add_argument('test_folder')
+    parser.add_argument('--encodings', nargs='+', default=['float16', 'int8'], choices=STORE_ENCODINGS)
+    parser.add_argument('--classifiers', nargs='+', default=list(CLASSIFIERS), choices=CLASSIFIERS)
+    parser.add_argument('--output_folder', default=None)
+    args = parser.parse_args()
+    for folder in (args.train_folder, args.test_folder):
+        if not os.path.isdir(folder):
+            print(f'(!) Unexpected input folder: {folder!r}.')
+            sys.exit(1)
+    classifiers = args.classifiers
+    if 'XGB' in classifiers:
+        try:
+            import xgboost
+        except ImportError:
+            print('(!) xgboost is not installed, XGB is left out of the grid.')
+            classifiers = [name for name in classifiers if name != 'XGB']
+    output_folder = args.output_folder or tempfile.mkdtemp(prefix='store_encoding_')
+    os.makedirs(output_folder, exist_ok=True)
+
+    stores = {'float32': EmbeddingStore(args.store)}
+    if stores['float32'].encoding != 'float32':
+        print(f'(!) Store {args.store!r} is {stores["float32"].encoding}, a float32 store is needed for comparison.')
+        sys.exit(1)
+    sizes = {'float32': embedding_store_size(args.store)}
+    for encoding in args.encodings:
+        if encoding == 'float32':
+            continue
+        store = os.path.join(output_folder, f'embed_layers_{encoding}')
+        encode_embedding_store(args.store, encoding, output_store=store)
+        stores[encoding] = EmbeddingStore(store)
+        sizes[encoding] = embedding_store_size(store)
+
+    json_files = glob.glob(os.path.join(os.path.dirname(args.store), '*_embed_*.json'))
+    if json_files:
+        sizes['json layers'] = sum(os.path.getsize(fpath) for fpath in json_files)
+    print(f"{'encoding':<12} {'MB':>9} {'of float32':>11}")
+    for encoding, size in sizes.items():
+        print(f"{encoding:<12} {size / 2**20:>9.1f} {size / sizes['float32']:>10.1%}")
+
+    train_texts = load_Texts_from_dir(args.train_folder, use_threads=False)
+    test_texts = load_Texts_from_dir(args.test_folder, use_threads=False)
+    print(f'{len(train_texts)} training and {len(test_texts)} test documents loaded.')
+    accuracies = {}
+    for encoding, store in stores.items():
+        accuracies[encoding] = grid_accuracies(store, train_texts, test_texts, classifiers)
+        print(f'{encoding} grid done.', flush=True)
+
+    encodings = [encoding for encoding in stores if encoding != 'float32']
+    print(f"{'view':<12} {'features':<8} {'classifier':<10} {'float32':>8}" +
+          ''.join(f' {encoding:>8} {"change":>7}' for encoding in encodings))
+    for view, features, name in accuracies['float32']:
+        base_acc = accuracies['float32'][view, features, name]
+        line = f'{view:<12} {features:<8} {name:<10} {base_acc:>8.3f}'
+        for encoding in encodings:
+            acc = accuracies[encoding][view, features, name]
+            line += f' {acc:>8.3f} {acc - base_acc:>+7.3f}'
+        print(line)
+    for encoding in encodings:
+        changes = [accuracies[encoding][key] - base for key, base in accuracies['float32'].items()]
+        print(f'{encoding}: mean accuracy change {np.mean(changes):+.4f}, largest drop {min(changes):+.4f}')
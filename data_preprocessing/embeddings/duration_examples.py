@@ -0,0 +1,45 @@
+# Duration examples of the event duration experiments
+#
+# Finds the examples of the duration classifiers in the same way as get_event_main_mean_embeddings of
+# model_training/02_durations (e.g. EstBERT_ev_durations.py), so that the benchmarks measure the
+# features the experiments are trained on: for every event word of gold_word_events_main, the first
+# event containing the word that has a duration gives the duration and the event phrase; the example
+# is the main word embedding and the mean embedding of the words of the event phrase.
+#
+# Usage example:
+#   main_embeds, mean_embeds, durations = duration_examples(text_objects, store.for_Texts(text_objects, 'concat'))
+#
+# -- imports
+import numpy as np
+
+
+# -- method for finding duration examples: (main word embeddings, mean phrase embeddings, durations) of events
+# -- text_embeds[i][j] is the embedding of the j-th word of text_objects[i]
+def duration_examples(text_objects, text_embeds):
+    main_embeds, mean_embeds, durations = [], [], []
+    for text_obj, embeds in zip(text_objects, text_embeds):
+        # word spans of events and of gold_word_events are looked up once per document
+        event_word_spans = [[text_obj.words.get(event_word) for event_word in event] for event in text_obj.events]
+        gold_word_spans = [text_obj.words.get(word[0]) for word in text_obj.gold_word_events]
+        for idx, word in enumerate(text_obj.gold_word_events_main):
+            if word.nertag not in ('B-EVENT', 'I-EVENT'):
+                continue
+            # gold_word_events_main envelopes words
+            word_span = text_obj.words.get(word[0])
+            event_phrase = None
+            duration = None
+            for event, word_spans in zip(text_obj.events, event_word_spans):
+                if word_span in word_spans:
+                    event_phrase = word_spans
+                    duration = event.duration
+                # events without duration are passed over
+                if event_phrase is not None and duration is not None:
+                    break
+            if not word_span or event_phrase is None or duration is None:
+                continue
+            phrase_embeds = [embeds[idx2] for idx2, span in enumerate(gold_word_spans) if span in event_phrase]
+            if phrase_embeds:
+                main_embeds.append(np.asarray(embeds[idx]))
+                mean_embeds.append(np.mean(phrase_embeds, 0))
+                durations.append(duration)
+    return main_embeds, mean_embeds, durations
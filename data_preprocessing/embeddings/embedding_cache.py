@@ -0,0 +1,119 @@
+# Content-addressed cache of sentence embeddings
+#
+# The extractor runs the model on every sentence separately, so the word embeddings of
+# a sentence depend only on its tokens, the word boundaries of the tokens and the model
+# settings. EmbeddingCache keeps the word embeddings of each sentence in a .npy file
+# named by a hash of these. When a document is changed or added, only its new or changed
+# sentences go through the model, and identical sentences of different corpora (e.g.
+# TimeML and TempFact duplicates) are extracted once. When the cache grows over its size
+# limit, the least recently used sentences are removed.
+#
+# Usage example:
+#   cache = EmbeddingCache('embedding_cache', model_id='EstBERT|fp32|4|512|sum')
+#   key = cache.key(input_ids, word_ids, n_words)
+#   embeddings = cache.get(key)      # None if not cached
+#   cache.put(key, embeddings)
+#
+# -- imports
+import os
+import hashlib
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'Ajasemantika', 'embeddings')
+DEFAULT_CACHE_MAX_MB = 20480
+CACHE_ENTRY_EXTENSION = '.npy'
+
+
+class EmbeddingCache:
+    """Word embeddings of sentences keyed by a hash of model settings, tokens and word boundaries."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, model_id='', max_size=DEFAULT_CACHE_MAX_MB * 2**20):
+        self.cache_dir = cache_dir
+        self.model_id = model_id
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+        # running total size of entries; the cache folder is scanned on the first put and when the
+        # total grows over the size limit
+        self.size = None
+        self.hits = 0
+        self.misses = 0
+
+    # -- method for finding the key of a sentence: input_ids are token ids (without special tokens),
+    # -- word_ids are indexes of the words of the tokens (relative to the first word of the sentence)
+    # -- and n_words is the number of words in the sentence
+    def key(self, input_ids, word_ids, n_words):
+        h = hashlib.sha1(self.model_id.encode('utf-8'))
+        h.update(np.int64(n_words).tobytes())
+        h.update(np.ascontiguousarray(input_ids, dtype=np.int64).tobytes())
+        h.update(np.ascontiguousarray(word_ids, dtype=np.int64).tobytes())
+        return h.hexdigest()
+
+    # -- entries are kept in subfolders by the first two characters of the key
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + CACHE_ENTRY_EXTENSION)
+
+    # -- method for reading word embeddings of a sentence, returns None if the sentence is not cached
+    def get(self, key):
+        entry_path = self._entry_path(key)
+        try:
+            embeddings = np.load(entry_path)
+        except (FileNotFoundError, ValueError, EOFError):
+            self.misses += 1
+            return None
+        # entry modification time is used as the last access time
+        os.utime(entry_path)
+        self.hits += 1
+        return embeddings
+
+    # -- method for writing word embeddings of a sentence
+    def put(self, key, embeddings):
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(entry_path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(embeddings, dtype=np.float32))
+        # size of the replaced entry
+        old_size = os.path.getsize(entry_path) if os.path.isfile(entry_path) else 0
+        os.replace(tmp_path, entry_path)
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        else:
+            self.size += os.path.getsize(entry_path) - old_size
+        if self.size > self.max_size:
+            self.evict()
+
+    # -- method for finding cache entries as (last access time, size, path), least recently used first
+    def entries(self):
+        entries = []
+        for root, dirs, files in os.walk(self.cache_dir):
+            for fname in files:
+                if fname.endswith(CACHE_ENTRY_EXTENSION):
+                    fpath = os.path.join(root, fname)
+                    try:
+                        stat = os.stat(fpath)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, fpath))
+        return sorted(entries)
+
+    # -- method for removing least recently used entries; removes down to 90% of the size limit,
+    # -- so that the cache folder is not scanned after every new entry
+    def evict(self):
+        entries = self.entries()
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in entries:
+            if self.size <= 0.9 * self.max_size:
+                break
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+
+
+# -- method for creating the cache from a cache folder option, returns None if the cache is disabled
+def get_embedding_cache(cache_dir, model_id, max_mb=DEFAULT_CACHE_MAX_MB):
+    if not cache_dir:
+        return None
+    return EmbeddingCache(cache_dir, model_id=model_id, max_size=int(max_mb * 2**20))
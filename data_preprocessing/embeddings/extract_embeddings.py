@@ -0,0 +1,548 @@
+# ====================================================================
+#  Batched extraction of EstBERT / Est-RoBERTa word embeddings
+#
+#  Replaces the tagging cells of Embeddings.ipynb. Sentences of many
+#  documents are gathered, sorted by length into batches of similar
+#  length and each batch goes through the model once. Subword embeddings
+#  of the last hidden layers are summed into word embeddings (as
+#  BertTagger with token_level=False does) with one scatter operation per
+#  batch. Sentences longer than 510 tokens are split into several inputs,
+#  each with its own [CLS] and [SEP] tokens; BertTagger splits the token
+#  ids without adding them, so embeddings of such sentences differ from
+#  BertTagger and from existing [filename]_embed_[view].json exports of
+#  documents that contain them (other sentences agree). The hidden layers of each document are saved as soon as the
+#  document is finished, so an interrupted extraction continues where it
+#  stopped; documents changed after their extraction are extracted again.
+#  Checkpoints are kept in a folder of the extraction settings (model,
+#  precision, number of layers), so a run with other settings into the
+#  same output folder extracts all documents again. A model folder is
+#  identified by a hash of its configuration, tokenizer and weight files,
+#  so retrained weights or another checkpoint in a folder of the same name
+#  are not mixed with earlier checkpoints.
+#  With --cache_dir, sentence embeddings are kept in a cache, so only new
+#  and changed sentences are run through the model. In the end, all documents are
+#  collected into an embedding store (see corpus_methods/embedding_store.py).
+#
+#  Usage example (run in the data_preprocessing/embeddings folder):
+#   python extract_embeddings.py  [model]  [output_folder]  [input_folders ...]  [options]
+#
+#  [model]          -- folder (or Hugging Face name) of EstBERT or Est-RoBERTa model;
+#  [output_folder]  -- folder for the embedding store embed_layers.npy
+#                      (and documents/[settings id]/[filename].npy checkpoints);
+#  [input_folders]  -- folders containing EstNLTK json files with sentences layer;
+#  --n_layers N     -- number of last hidden layers to save (default: 4);
+#  --batch_tokens N -- maximum number of tokens (including padding) in a batch (default: 8192);
+#  --group_size N   -- number of documents whose sentences are batched together (default: 64);
+#  --json_views ... -- also save embedding layers in EstNLTK json format for the given views
+#                      (concat, add, penultimate, last), as [filename]_embed_[view].json;
+#  --device DEVICE  -- torch device (default: cuda if available, else cpu);
+#  --precision P    -- fp32, int8 (dynamically quantised linear layers, CPU only) or
+#                      bf16 (default: fp32); see benchmark_extraction.py for speed and
+#                      accuracy of the cheaper modes;
+#  --threads N      -- number of intra-op threads (default: number of CPUs);
+#  --interop_threads N -- number of inter-op threads (default: 1, batches are run one by one);
+#  --cache_dir DIR  -- folder of the sentence embedding cache, e.g. ~/.cache/Ajasemantika/embeddings
+#                      (default: no cache; see embedding_cache.py);
+#  --cache_max_mb N -- size limit of the sentence embedding cache in megabytes (default: 20480);
+#  --encoding E     -- encoding of the embedding store: float32, float16 or int8 (default: float32);
+#                      see benchmark_store_encoding.py for size and accuracy of compact stores;
+#  --n_shards N     -- number of shards (default: 1, no sharding);
+#  --shard I        -- shard extracted by this worker (0 ... N-1);
+#  --merge          -- merge finished shards into the embedding store instead of extracting;
+#
+#  Example:
+#   python extract_embeddings.py EstBERT ../../model_training/embeddings/BERT_embed_temp_facts
+#          ../../model_training/TempFact/train_larger ../../model_training/TempFact/test
+#
+#  Sharded extraction: documents are divided into N shards by the hash of
+#  their file name, so that every worker finds the same shards without
+#  coordination. Each worker (on any machine that sees the output folder)
+#  is run with the same arguments and its own --shard; it saves its shard
+#  as a float32 store shards/shard_[I]_of_[N] and then a manifest
+#  shards/shard_[I]_of_[N].manifest.json, which marks the shard as finished.
+#  When all shards are finished, the merge step checks the manifests and
+#  writes the documents of all shards in file name order into one store
+#  (the same store as extraction without shards):
+#   python extract_embeddings.py EstBERT [output_folder] [input_folders ...] --n_shards 4 --shard 0
+#   ...
+#   python extract_embeddings.py EstBERT [output_folder] [input_folders ...] --n_shards 4 --shard 3
+#   python extract_embeddings.py EstBERT [output_folder] [input_folders ...] --n_shards 4 --merge
+#
+#  Requirements: EstNLTK 1.7.2, torch, transformers
+# ====================================================================
+
+# -- imports
+import os
+import sys
+import json
+import time
+import socket
+import hashlib
+import argparse
+
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModel
+
+# -- corpus methods from data_preprocessing/corpus_preprocessing
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'corpus_preprocessing'))
+from corpus_methods.file_operations import load_Texts_from_dir, list_Text_files
+from corpus_methods.embedding_store import (write_embedding_store, get_embedding_view, EmbeddingStore,
+                                            EMBEDDING_VIEWS, N_HIDDEN_LAYERS, STORE_ENCODINGS)
+from embedding_cache import get_embedding_cache, DEFAULT_CACHE_MAX_MB
+
+# -- folder of per-document checkpoints inside output folder
+DOCUMENTS_FOLDER = 'documents'
+# -- file of extraction settings inside a checkpoint folder
+SETTINGS_FILE = 'settings.json'
+# -- folder of shard stores and manifests inside output folder
+SHARDS_FOLDER = 'shards'
+# -- maximum input length of BERT models
+MAX_MODEL_LENGTH = 512
+# -- supported encoder precisions
+PRECISIONS = ('fp32', 'int8', 'bf16')
+# -- prefixes of the configuration, tokenizer and weight files of a model folder that embeddings depend on
+MODEL_FILE_PREFIXES = ('config.json', 'model', 'pytorch_model', 'tokenizer', 'special_tokens_map', 'vocab', 'merges',
+                       'sentencepiece')
+
+
+# -- method for setting the number of torch threads; must be called before the model is run
+def set_threads(n_threads=None, n_interop_threads=1):
+    torch.set_num_threads(n_threads or os.cpu_count() or 1)
+    if n_interop_threads is not None and torch.get_num_interop_threads() != n_interop_threads:
+        # inter-op threads can be set only once, before any inter-op parallel work
+        try:
+            torch.set_num_interop_threads(n_interop_threads)
+        except RuntimeError:
+            print(f'(!) Number of inter-op threads is already set to {torch.get_num_interop_threads()}.')
+
+
+# -- method for loading tokenizer and model in the given precision, returns (tokenizer, model, device)
+# -- 'int8' quantises weights of linear layers dynamically (activations are quantised on the fly), 'bf16'
+# -- runs the model in bfloat16; both return embeddings as float32
+def load_model(model_location, precision='fp32', device=None):
+    if precision not in PRECISIONS:
+        raise ValueError('(!) Unknown precision {!r}. Supported precisions: {!r}'.format(precision, PRECISIONS))
+    if device is None:
+        device = 'cuda' if torch.cuda.is_available() and precision != 'int8' else 'cpu'
+    if precision == 'int8' and device != 'cpu':
+        raise ValueError('(!) Precision int8 is supported only on cpu.')
+    tokenizer = AutoTokenizer.from_pretrained(model_location)
+    model = AutoModel.from_pretrained(model_location)
+    model.eval()
+    if precision == 'int8':
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif precision == 'bf16':
+        model = model.to(torch.bfloat16)
+    return tokenizer, model.to(device), device
+
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:d}:{minutes:02d}:{seconds:02d}'
+
+
+# -- method for finding the fingerprint of a model: hash of the names and contents of the configuration, tokenizer
+# -- and weight files of a model folder, or the Hugging Face name of the model; the fingerprint does not depend on
+# -- the folder path, so it is the same on all machines
+def get_model_fingerprint(model_location):
+    if not os.path.isdir(model_location):
+        return model_location
+    h = hashlib.sha1()
+    for fname in sorted(os.listdir(model_location)):
+        fpath = os.path.join(model_location, fname)
+        if fname.startswith(MODEL_FILE_PREFIXES) and os.path.isfile(fpath):
+            h.update(fname.encode('utf-8'))
+            with open(fpath, 'rb') as f:
+                for chunk in iter(lambda: f.read(2**24), b''):
+                    h.update(chunk)
+    return h.hexdigest()
+
+
+# -- method for finding extraction settings that checkpoints and shard manifests are recorded with; the model is
+# -- identified by its folder or Hugging Face name and its fingerprint, as workers on different machines may keep
+# -- it in different folders
+def get_settings(model_location, precision, n_layers):
+    return {'model': os.path.basename(os.path.normpath(model_location)),
+            'model_fingerprint': get_model_fingerprint(model_location), 'precision': precision, 'n_layers': n_layers}
+
+
+# -- method for finding the checkpoint folder of extraction settings; checkpoints extracted with other settings
+# -- are in other folders, so they are never mixed into the store
+def _documents_folder(output_folder, settings):
+    settings_id = hashlib.sha1(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(output_folder, DOCUMENTS_FOLDER, settings_id)
+
+
+# -- method for creating the checkpoint folder of extraction settings, the settings are written into the folder
+def _make_documents_folder(output_folder, settings):
+    documents_folder = _documents_folder(output_folder, settings)
+    os.makedirs(documents_folder, exist_ok=True)
+    settings_file = os.path.join(documents_folder, SETTINGS_FILE)
+    if not os.path.isfile(settings_file):
+        tmp_file = '{}.{}.tmp'.format(settings_file, os.getpid())
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(settings, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_file, settings_file)
+    return documents_folder
+
+
+def _document_file(output_folder, filename, settings):
+    return os.path.join(_documents_folder(output_folder, settings), filename + '.npy')
+
+
+# -- method for checking if the checkpoint of a document is extracted with the given settings and is newer than
+# -- its source file
+def is_up_to_date(output_folder, filename, source_file, settings):
+    fpath = _document_file(output_folder, filename, settings)
+    return os.path.isfile(fpath) and os.path.getmtime(fpath) >= os.path.getmtime(source_file)
+
+
+# -- method for finding the shard of a document file; the hash of the file name (without extension) does not
+# -- depend on the machine or the order of files, so all workers divide documents the same way
+def get_shard(fname, n_shards):
+    name = os.path.splitext(os.path.basename(fname))[0]
+    return int(hashlib.sha1(name.encode('utf-8')).hexdigest(), 16) % n_shards
+
+
+# -- method for finding (store, manifest file) of a shard
+def _shard_files(output_folder, shard, n_shards):
+    store = os.path.join(output_folder, SHARDS_FOLDER, f'shard_{shard:04d}_of_{n_shards:04d}')
+    return store, store + '.manifest.json'
+
+
+# -- method for finding the identifier of model settings that sentence embeddings depend on; the model is identified
+# -- by its fingerprint, so sentences of retrained weights are not found in the cache
+def get_model_id(model_location, precision, n_layers, max_length):
+    # subword embeddings are summed into word embeddings
+    return f'{get_model_fingerprint(model_location)}|{precision}|{n_layers}|{max_length}|sum'
+
+
+# -- method for tokenizing sentences of a Text-object
+# -- returns list of (index of the first word, number of words, input ids without special tokens, word index
+# -- of each token relative to the first word) tuples; sentences without tokens are left out
+def tokenize_sentences(text_obj, tokenizer, max_length=MAX_MODEL_LENGTH):
+    word_starts = np.array([word.start for word in text_obj.words], dtype=np.int64)
+    word_ends = np.array([word.end for word in text_obj.words], dtype=np.int64)
+    word_index = {start: i for i, start in enumerate(word_starts.tolist())}
+    sentences = []
+    for sentence in text_obj.sentences:
+        first_word, last_word = word_index[sentence.start], word_index[sentence[-1].start]
+        encoding = tokenizer(text_obj.text[sentence.start:sentence.end], add_special_tokens=False,
+                             return_offsets_mapping=True)
+        input_ids = np.array(encoding['input_ids'], dtype=np.int64)
+        if len(input_ids) == 0:
+            continue
+        token_starts = np.array([start for start, _ in encoding['offset_mapping']], dtype=np.int64) + sentence.start
+        # token belongs to the last word starting at or before it, or to the next word if it starts between words
+        word_ids = np.searchsorted(word_starts, token_starts, side='right') - 1
+        word_ids = np.clip(word_ids, first_word, last_word)
+        in_gap = token_starts >= word_ends[word_ids]
+        word_ids = np.clip(word_ids + in_gap, first_word, last_word)
+        sentences.append((first_word, last_word - first_word + 1, input_ids, word_ids - first_word))
+    return sentences
+
+
+# -- method for splitting tokens of a sentence into model inputs, returns list of (input ids, word ids) pairs
+# -- sentences longer than max_length tokens are split into several inputs, and every input gets [CLS] and [SEP]
+# -- tokens (unlike in BertTagger, which adds them only to the first and last input)
+def sentence_inputs(input_ids, word_ids, tokenizer, max_length=MAX_MODEL_LENGTH):
+    chunk_length = max_length - 2
+    return [(np.concatenate(([tokenizer.cls_token_id], input_ids[i:i + chunk_length], [tokenizer.sep_token_id])),
+             word_ids[i:i + chunk_length])
+            for i in range(0, len(input_ids), chunk_length)]
+
+
+# -- method for grouping inputs of similar length into batches of at most batch_tokens tokens (including padding)
+# -- inputs are (document index, input ids, word ids) triples
+def make_batches(inputs, batch_tokens):
+    inputs = sorted(inputs, key=lambda item: len(item[1]))
+    batches = []
+    batch = []
+    for item in inputs:
+        # inputs are sorted, so the current input is the longest in the batch
+        if batch and (len(batch) + 1) * len(item[1]) > batch_tokens:
+            batches.append(batch)
+            batch = []
+        batch.append(item)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+# -- method for running a batch through the model and adding subword embeddings to word embeddings
+# -- word_embeddings is tensor of shape (number of words in documents, n_layers, hidden size),
+# -- doc_offsets[document index] is the row of the first word of the document
+def run_batch(model, batch, pad_token_id, word_embeddings, doc_offsets, n_layers, device):
+    max_length = max(len(ids) for _, ids, _ in batch)
+    input_ids = np.full((len(batch), max_length), pad_token_id, dtype=np.int64)
+    attention_mask = np.zeros((len(batch), max_length), dtype=np.int64)
+    token_mask = np.zeros((len(batch), max_length), dtype=bool)
+    targets = []
+    for b, (doc_idx, ids, word_ids) in enumerate(batch):
+        input_ids[b, :len(ids)] = ids
+        attention_mask[b, :len(ids)] = 1
+        # special tokens at the start and end are not pooled
+        token_mask[b, 1:len(ids) - 1] = True
+        targets.append(word_ids + doc_offsets[doc_idx])
+    outputs = model(input_ids=torch.from_numpy(input_ids).to(device),
+                    attention_mask=torch.from_numpy(attention_mask).to(device),
+                    output_hidden_states=True)
+    # (batch, tokens, n_layers, hidden size)
+    hidden = torch.stack(outputs.hidden_states[-n_layers:], dim=2)
+    token_embeddings = hidden[torch.from_numpy(token_mask).to(device)].float().cpu()
+    word_embeddings.index_add_(0, torch.from_numpy(np.concatenate(targets)), token_embeddings)
+
+
+# -- method for converting word embeddings to an embedding layer in EstNLTK json format
+def _embedding_layer_dict(text_obj, embeddings, layer_name):
+    spans = [{'base_span': [word.start, word.end], 'annotations': [{'token': word.text, 'bert_embedding': vector}]}
+             for word, vector in zip(text_obj.words, embeddings.tolist())]
+    return {'name': layer_name, 'attributes': ['token', 'bert_embedding'], 'secondary_attributes': [],
+            'parent': None, 'enveloping': None, 'ambiguous': True, 'serialisation_module': None,
+            'meta': {}, 'spans': spans}
+
+
+# -- method for saving hidden layers of a document (and embedding layers of json_views)
+def save_document(output_folder, text_obj, embeddings, settings, json_views=(), layer_prefix='bert'):
+    filename = text_obj.meta['filename']
+    fpath = _document_file(output_folder, filename, settings)
+    for view in json_views:
+        layer_dict = _embedding_layer_dict(text_obj, get_embedding_view(embeddings, view),
+                                           f'{layer_prefix}_embeddings_{view}')
+        json_file = os.path.join(output_folder, f'{filename}_embed_{view}.json')
+        with open(json_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(layer_dict, f)
+        os.replace(json_file + '.tmp', json_file)
+    # hidden layers are saved last, their file marks the document as finished
+    with open(fpath + '.tmp', 'wb') as f:
+        np.save(f, embeddings)
+    os.replace(fpath + '.tmp', fpath)
+
+
+# -- method for extracting embeddings of a group of documents
+# -- if cache (EmbeddingCache) is given, sentences found in the cache are not run through the model and
+# -- embeddings of the other sentences are added to the cache
+def extract_group(model, tokenizer, text_objects, n_layers, batch_tokens, device, max_length=MAX_MODEL_LENGTH,
+                  cache=None):
+    doc_offsets = np.cumsum([0] + [len(text_obj.words) for text_obj in text_objects])
+    word_embeddings = torch.zeros((doc_offsets[-1], n_layers, model.config.hidden_size), dtype=torch.float32)
+    token_counts = np.zeros(doc_offsets[-1], dtype=np.int64)
+    inputs = []
+    # key -> first row of the sentence run through the model; repeated sentences are copied from it
+    new_sentences = {}
+    repeated_sentences = []
+    for doc_idx, text_obj in enumerate(text_objects):
+        for first_word, n_words, input_ids, word_ids in tokenize_sentences(text_obj, tokenizer, max_length):
+            row = doc_offsets[doc_idx] + first_word
+            np.add.at(token_counts, word_ids + row, 1)
+            if cache is not None:
+                key = cache.key(input_ids, word_ids, n_words)
+                if key in new_sentences:
+                    repeated_sentences.append((row, n_words, key))
+                    continue
+                embeddings = cache.get(key)
+                if embeddings is not None:
+                    word_embeddings[row:row + n_words] = torch.from_numpy(embeddings)
+                    continue
+                new_sentences[key] = (row, n_words)
+            for ids, chunk_word_ids in sentence_inputs(input_ids, word_ids, tokenizer, max_length):
+                inputs.append((doc_idx, ids, chunk_word_ids + first_word))
+    for batch in make_batches(inputs, batch_tokens):
+        run_batch(model, batch, tokenizer.pad_token_id, word_embeddings, doc_offsets, n_layers, device)
+    word_embeddings = word_embeddings.numpy()
+    if cache is not None:
+        # embeddings are cached before filling words without tokens, which depends on the previous sentence
+        for key, (row, n_words) in new_sentences.items():
+            cache.put(key, word_embeddings[row:row + n_words])
+        for row, n_words, key in repeated_sentences:
+            source_row = new_sentences[key][0]
+            word_embeddings[row:row + n_words] = word_embeddings[source_row:source_row + n_words]
+    # words without tokens (e.g. soft hyphens) get the embedding of the previous word, as in BertTagger
+    doc_starts = set(doc_offsets.tolist())
+    for i in np.flatnonzero(token_counts == 0):
+        if i not in doc_starts:
+            word_embeddings[i] = word_embeddings[i - 1]
+    return [word_embeddings[doc_offsets[i]:doc_offsets[i + 1]] for i in range(len(text_objects))]
+
+
+# -- main method for extracting embeddings of all documents in input folders, returns the number of extracted documents
+# -- if n_shards > 1, only documents of the given shard are extracted and saved as shard store with a manifest
+# -- (see merge_shards)
+def extract_embeddings(model_location, output_folder, input_folders, n_layers=N_HIDDEN_LAYERS, batch_tokens=8192,
+                       group_size=64, json_views=(), device=None, precision='fp32', cache_dir=None,
+                       cache_max_mb=DEFAULT_CACHE_MAX_MB, encoding='float32', n_shards=1, shard=0):
+    settings = get_settings(model_location, precision, n_layers)
+    _make_documents_folder(output_folder, settings)
+    text_objects = []
+    sources = []
+    todo = []
+    for input_folder in input_folders:
+        fnames = [fname for fname in list_Text_files(input_folder) if get_shard(fname, n_shards) == shard]
+        # load_Texts_from_dir returns Text-objects in the order of file names
+        # the extractor is run as a script, so documents can be loaded in worker processes
+        folder_texts = load_Texts_from_dir(input_folder, layers=['sentences'], filenames=fnames, use_threads=False)
+        for fname, text_obj in zip(fnames, folder_texts):
+            # documents changed after extraction or extracted with other settings are extracted again
+            if not is_up_to_date(output_folder, text_obj.meta['filename'], os.path.join(input_folder, fname), settings):
+                todo.append(text_obj)
+        text_objects.extend(folder_texts)
+        sources.extend(fnames)
+    shard_info = f' of shard {shard}/{n_shards}' if n_shards > 1 else ''
+    print(f'{len(text_objects)-len(todo)} of {len(text_objects)} documents{shard_info} are up to date, '
+          f'extracting {len(todo)}.')
+    if todo:
+        tokenizer, model, device = load_model(model_location, precision=precision, device=device)
+        max_length = min(tokenizer.model_max_length, MAX_MODEL_LENGTH)
+        cache = get_embedding_cache(cache_dir, get_model_id(model_location, precision, n_layers, max_length),
+                                    max_mb=cache_max_mb)
+        layer_prefix = 'roberta' if model.config.model_type in ('roberta', 'xlm-roberta', 'camembert') else 'bert'
+        start = time.time()
+        n_extracted = 0
+        with torch.inference_mode():
+            for i in range(0, len(todo), group_size):
+                group = todo[i:i + group_size]
+                embeddings = extract_group(model, tokenizer, group, n_layers, batch_tokens, device, max_length,
+                                           cache=cache)
+                for text_obj, doc_embeddings in zip(group, embeddings):
+                    save_document(output_folder, text_obj, doc_embeddings, settings, json_views=json_views,
+                                  layer_prefix=layer_prefix)
+                n_extracted += len(group)
+                elapsed = time.time() - start
+                eta = elapsed / n_extracted * (len(todo) - n_extracted)
+                print(f'[{n_extracted}/{len(todo)}] elapsed {_format_seconds(elapsed)}, ETA {_format_seconds(eta)}',
+                      flush=True)
+        if cache is not None:
+            print(f'{cache.hits} sentences found in embedding cache, {cache.misses} sentences extracted.')
+    filenames = sorted(text_obj.meta['filename'] for text_obj in text_objects)
+    documents = ((filename, np.load(_document_file(output_folder, filename, settings))) for filename in filenames)
+    if n_shards == 1:
+        store = os.path.join(output_folder, 'embed_layers')
+        write_embedding_store(store, documents, encoding=encoding)
+        print(f'Embeddings of {len(filenames)} documents saved into {store!r} ({encoding}).')
+        return len(todo)
+    store, manifest_file = _shard_files(output_folder, shard, n_shards)
+    os.makedirs(os.path.dirname(store), exist_ok=True)
+    # the shard is not finished until its new manifest is written
+    if os.path.isfile(manifest_file):
+        os.remove(manifest_file)
+    # shards are kept in float32, the merged store is encoded
+    write_embedding_store(store, documents)
+    offsets = EmbeddingStore(store).offsets
+    shard_documents = {}
+    for text_obj, fname in zip(text_objects, sources):
+        start, end = offsets[text_obj.meta['filename']]
+        shard_documents[text_obj.meta['filename']] = {'source': fname, 'n_words': end - start}
+    manifest = {'shard': shard, 'n_shards': n_shards, 'settings': settings,
+                'documents': shard_documents, 'host': socket.gethostname(),
+                'finished': time.strftime('%Y-%m-%d %H:%M:%S')}
+    with open(manifest_file + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(manifest_file + '.tmp', manifest_file)
+    print(f'Embeddings of {len(filenames)} documents saved into shard {store!r}.')
+    return len(todo)
+
+
+# -- method for merging finished shards into one embedding store, returns the number of merged documents
+# -- raises ValueError if shards are missing, extracted with other settings, or do not match the input folders
+def merge_shards(model_location, output_folder, input_folders, n_shards, n_layers=N_HIDDEN_LAYERS, precision='fp32',
+                 encoding='float32'):
+    # source file -> path, for all documents in input folders
+    source_files = {}
+    for input_folder in input_folders:
+        for fname in list_Text_files(input_folder):
+            if fname in source_files:
+                raise ValueError('(!) Duplicate document {!r} in input folders.'.format(fname))
+            source_files[fname] = os.path.join(input_folder, fname)
+    settings = get_settings(model_location, precision, n_layers)
+    manifests = {}
+    for shard in range(n_shards):
+        store, manifest_file = _shard_files(output_folder, shard, n_shards)
+        if not os.path.isfile(manifest_file):
+            continue
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifests[shard] = json.load(f)
+        if manifests[shard]['settings'] != settings:
+            raise ValueError('(!) Shard {} was extracted with settings {!r}, expected {!r}.'.format(
+                shard, manifests[shard]['settings'], settings))
+    missing = [shard for shard in range(n_shards) if shard not in manifests]
+    if missing:
+        raise ValueError('(!) Shards {!r} of {} are not finished.'.format(missing, n_shards))
+    # filename -> shard
+    document_shards = {}
+    merged_sources = set()
+    for shard, manifest in manifests.items():
+        manifest_mtime = os.path.getmtime(_shard_files(output_folder, shard, n_shards)[1])
+        for filename, document in manifest['documents'].items():
+            source = document['source']
+            if source not in source_files:
+                raise ValueError('(!) Document {!r} of shard {} is not in input folders.'.format(source, shard))
+            if get_shard(source, n_shards) != shard:
+                raise ValueError('(!) Document {!r} belongs to shard {}, found in shard {}.'.format(
+                    source, get_shard(source, n_shards), shard))
+            if os.path.getmtime(source_files[source]) > manifest_mtime:
+                raise ValueError('(!) Document {!r} has changed after shard {} was finished.'.format(source, shard))
+            if filename in document_shards:
+                raise ValueError('(!) Duplicate filename {!r} in shards {} and {}.'.format(
+                    filename, document_shards[filename], shard))
+            document_shards[filename] = shard
+            merged_sources.add(source)
+    not_extracted = sorted(set(source_files) - merged_sources)
+    if not_extracted:
+        raise ValueError('(!) Documents {!r} are missing from shards.'.format(not_extracted))
+    stores = {shard: EmbeddingStore(_shard_files(output_folder, shard, n_shards)[0]) for shard in manifests}
+    for filename, shard in document_shards.items():
+        start, end = stores[shard].offsets[filename]
+        if end - start != manifests[shard]['documents'][filename]['n_words']:
+            raise ValueError('(!) Store of shard {} does not match its manifest.'.format(shard))
+    # documents are written in the same order as without sharding
+    documents = ((filename, stores[document_shards[filename]].get_layers(filename))
+                 for filename in sorted(document_shards))
+    store = os.path.join(output_folder, 'embed_layers')
+    n_merged = write_embedding_store(store, documents, encoding=encoding)
+    print(f'Embeddings of {n_merged} documents from {n_shards} shards merged into {store!r} ({encoding}).')
+    return n_merged
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extract EstBERT / Est-RoBERTa word embeddings into an embedding store.')
+    parser.add_argument('model')
+    parser.add_argument('output_folder')
+    parser.add_argument('input_folders', nargs='+')
+    parser.add_argument('--n_layers', type=int, default=N_HIDDEN_LAYERS)
+    parser.add_argument('--batch_tokens', type=int, default=8192)
+    parser.add_argument('--group_size', type=int, default=64)
+    parser.add_argument('--json_views', nargs='+', default=[], choices=list(EMBEDDING_VIEWS))
+    parser.add_argument('--device', default=None)
+    parser.add_argument('--precision', default='fp32', choices=PRECISIONS)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--interop_threads', type=int, default=1)
+    parser.add_argument('--cache_dir', default=None)
+    parser.add_argument('--cache_max_mb', type=float, default=DEFAULT_CACHE_MAX_MB)
+    parser.add_argument('--encoding', default='float32', choices=STORE_ENCODINGS)
+    parser.add_argument('--n_shards', type=int, default=1)
+    parser.add_argument('--shard', type=int, default=0)
+    parser.add_argument('--merge', action='store_true')
+    args = parser.parse_args()
+    for input_folder in args.input_folders:
+        if not os.path.isdir(input_folder):
+            print(f'(!) Unexpected input folder: {input_folder!r}.')
+            sys.exit(1)
+    if args.n_shards < 1 or not 0 <= args.shard < args.n_shards:
+        print(f'(!) Unexpected shard {args.shard} of {args.n_shards} shards.')
+        sys.exit(1)
+    if args.merge:
+        try:
+            merge_shards(args.model, args.output_folder, args.input_folders, args.n_shards, n_layers=args.n_layers,
+                         precision=args.precision, encoding=args.encoding)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        sys.exit(0)
+    set_threads(args.threads, args.interop_threads)
+    extract_embeddings(args.model, args.output_folder, args.input_folders, n_layers=args.n_layers,
+                       batch_tokens=args.batch_tokens, group_size=args.group_size, json_views=args.json_views,
+                       device=args.device, precision=args.precision, cache_dir=args.cache_dir,
+                       cache_max_mb=args.cache_max_mb, encoding=args.encoding, n_shards=args.n_shards,
+                       shard=args.shard)
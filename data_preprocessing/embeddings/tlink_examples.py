@@ -0,0 +1,102 @@
+# Event-timex TLINK examples of the event-timex TLINK experiments
+#
+# Finds the examples of the TLINK classifiers in the same way as get_event_timex_embeddings of
+# model_training/04_event_timex_tlinks (e.g. EstBERT_ev_tim_tlinks.py), so that the benchmarks measure
+# the features the experiments are trained on: a TLINK is an example if the main word of its event is
+# found in gold_word_events_main and the main word of its timex (the timex word closest to the stanza
+# root of the sentence) is found among the words. The example is the concatenation of the event and
+# timex main word embeddings, the concatenation of the mean embeddings of the event and timex phrases,
+# and the TLINK type. TimeML documents have TLINKs in the event_timex_tlinks layer; in TempFact
+# documents, the TLINKs are in the tlinks layer and TLINKs of events inside entities are left out.
+#
+# Usage example:
+#   main_embeds, mean_embeds, tlinks = tlink_examples(text_objects, store.for_Texts(text_objects, 'concat'),
+#                                                     corpus='TempFact')
+#
+# -- imports
+import numpy as np
+
+# -- corpus -> TLINK layer of the corpus
+TLINK_LAYERS = {'TimeML': 'event_timex_tlinks', 'TempFact': 'tlinks'}
+
+
+# -- method for finding timex phrases of a sentence: for each TLINK, the words of the sentence in its timex
+def _sentence_phrases(text_obj, sentence, tlink_layer_name):
+    # sentence words by base span
+    sentence_words = {word.base_span: word for word in sentence.words}
+    phrases = []
+    for tlink in text_obj[tlink_layer_name]:
+        phrase = [sentence_words[span] for span in tlink.b_text.base_span if span in sentence_words]
+        if phrase:
+            phrases.append(phrase)
+    return phrases
+
+
+# -- method for finding the main word of a timex phrase: the phrase word found first in the depth-first
+# -- search of the syntax tree from current_word
+def _phrase_main_word(phrase, text_obj, current_word):
+    current_word_span = text_obj.words.get(current_word)
+    if current_word_span in phrase:
+        return current_word_span
+    for child in current_word.children:
+        current_word_span = _phrase_main_word(phrase, text_obj, child)
+        if current_word_span in phrase:
+            return current_word_span
+
+
+# -- method for finding the main words of all timex phrases of a document
+def _timex_main_words(text_obj, tlink_layer_name):
+    main_words = []
+    for sentence in text_obj.sentences:
+        # the last root of the sentence is used
+        sentence_root = None
+        for j in range(len(sentence.stanza_syntax)):
+            if sentence.stanza_syntax.deprel[j] == 'root':
+                sentence_root = sentence.stanza_syntax[j]
+        for phrase in _sentence_phrases(text_obj, sentence, tlink_layer_name):
+            main_words.append(phrase[0] if len(phrase) == 1 else _phrase_main_word(phrase, text_obj, sentence_root))
+    return main_words
+
+
+# -- method for finding TLINK examples: (main word embeddings, mean phrase embeddings, TLINK types) of
+# -- event-timex TLINKs; text_embeds[i][j] is the embedding of the j-th word of text_objects[i]
+def tlink_examples(text_objects, text_embeds, corpus='TempFact'):
+    if corpus not in TLINK_LAYERS:
+        raise ValueError('(!) Unknown corpus {!r}. Supported corpora: {!r}'.format(corpus, tuple(TLINK_LAYERS)))
+    tlink_layer_name = TLINK_LAYERS[corpus]
+    main_embeds, mean_embeds, tlinks = [], [], []
+    for text_obj, embeds in zip(text_objects, text_embeds):
+        timex_main_words = _timex_main_words(text_obj, tlink_layer_name)
+        # event words of gold_word_events_main (which envelopes words) as (index, word span)
+        event_words = [(idx, text_obj.words.get(word[0])) for idx, word in enumerate(text_obj.gold_word_events_main)
+                       if word.nertag in ('B-EVENT', 'I-EVENT')]
+        for tlink in text_obj[tlink_layer_name]:
+            ev_word_spans = [text_obj.words.get(span) for span in tlink.a_text.base_span]
+            tm_word_spans = [text_obj.words.get(span) for span in tlink.b_text.base_span]
+            if corpus == 'TempFact':
+                # events inside entities are left out
+                if any(span in entity for span in ev_word_spans for entity in text_obj.entities):
+                    continue
+                if None in ev_word_spans:
+                    continue
+            # timexes with tokenization problems are left out
+            if None in tm_word_spans:
+                continue
+            event_idx = next((idx for idx, span in event_words if span in ev_word_spans), None)
+            if event_idx is None:
+                continue
+            timex_idx = next((idx for idx, word in enumerate(text_obj.words)
+                              if word in tm_word_spans and word in timex_main_words), None)
+            if timex_idx is None:
+                continue
+            event_phrase_embeds = []
+            timex_phrase_embeds = []
+            for idx, word in enumerate(text_obj.words):
+                if word in ev_word_spans:
+                    event_phrase_embeds.append(np.asarray(embeds[idx]))
+                elif word in tm_word_spans:
+                    timex_phrase_embeds.append(embeds[idx])
+            main_embeds.append(np.concatenate((np.asarray(embeds[event_idx]), np.asarray(embeds[timex_idx]))))
+            mean_embeds.append(np.concatenate((np.mean(event_phrase_embeds, 0), np.mean(timex_phrase_embeds, 0))))
+            tlinks.append(tlink['rel_type'] if corpus == 'TimeML' else tlink['rel_type'][0])
+    return main_embeds, mean_embeds, tlinks
@@ -1,6 +1,9 @@
 import os
 import json
-from estnltk.converters import json_to_text
+import sys
+# -- corpus loading methods from data_preprocessing/corpus_preprocessing
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'data_preprocessing', 'corpus_preprocessing'))
+from corpus_methods.file_operations import load_Texts_from_dir
 
 import torch
 from transformers import AutoTokenizer, AutoModelForTokenClassification
@@ -9,11 +12,7 @@ from nervaluate import Evaluator
 def predict_on_tempf(model, tokenizer, layer):
     tempf_path = 'masters_thesis/temporal_facts_corpus_json_no_horisont/'
 
-    tempf_texts = []
-
-    for filename in os.listdir(tempf_path):
-        text_obj = json_to_text(file=os.path.join(tempf_path, filename))
-        tempf_texts.append(text_obj)
+    tempf_texts = load_Texts_from_dir(tempf_path)
 
     # -- Method for splitting corpus data into sentences with corresponding labels and IDs
     def split_data(text_objects, layer):
@@ -12,7 +12,10 @@
 import os
 os.environ['WANDB_DISABLED'] = 'true'
 import json
-from estnltk.converters import json_to_text
+import sys
+# -- corpus loading methods from data_preprocessing/corpus_preprocessing
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', '..', 'data_preprocessing', 'corpus_preprocessing'))
+from corpus_methods.file_operations import load_Texts_from_dir
 import sklearn
 import numpy as np
 
@@ -31,21 +34,9 @@ timeml_train_path = 'model_data/TimeML/train'
 timeml_dev_path = 'model_data/TimeML/dev'
 timeml_test_path = 'model_data/TimeML/test'
 
-train_texts = []
-dev_texts = []
-test_texts = []
-
-for filename in os.listdir(timeml_train_path):
-    text_obj = json_to_text(file=os.path.join(timeml_train_path, filename))
-    train_texts.append(text_obj)
-    
-for filename in os.listdir(timeml_dev_path):
-    text_obj = json_to_text(file=os.path.join(timeml_dev_path, filename))
-    dev_texts.append(text_obj)
-    
-for filename in os.listdir(timeml_test_path):
-    text_obj = json_to_text(file=os.path.join(timeml_test_path, filename))
-    test_texts.append(text_obj)
+train_texts = load_Texts_from_dir(timeml_train_path)
+dev_texts = load_Texts_from_dir(timeml_dev_path)
+test_texts = load_Texts_from_dir(timeml_test_path)
  
     
 # -- Method for splitting corpus data into sentences with corresponding labels and IDs
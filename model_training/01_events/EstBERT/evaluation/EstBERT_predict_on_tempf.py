@@ -2,7 +2,11 @@ import os
 import json
 
 import estnltk
-from estnltk.converters import json_to_text, text_to_json
+from estnltk.converters import text_to_json
+import sys
+# -- corpus loading methods from data_preprocessing/corpus_preprocessing
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'data_preprocessing', 'corpus_preprocessing'))
+from corpus_methods.file_operations import load_Texts_from_dir
 from estnltk_neural.taggers.embeddings.bert.bert_tokens_to_words_rewriter import BertTokens2WordsRewriter
 
 import torch
@@ -66,11 +70,7 @@ def save_predictions(tempf_path, corpus_texts, sentence_starts, tokens_w_spans,
 
 def predict_on_tempf(corpus_path, dtype, model, tokenizer, layer, event_classes):
     tempf_path = corpus_path
-    tempf_texts = []
-
-    for filename in os.listdir(tempf_path):
-        text_obj = json_to_text(file=os.path.join(tempf_path, filename))
-        tempf_texts.append(text_obj)
+    tempf_texts = load_Texts_from_dir(tempf_path)
 
     # -- Method for splitting corpus data into sentences with corresponding labels and IDs
     def split_data(text_objects, layer):
@@ -4,7 +4,12 @@
 import os
 import pickle
 from estnltk import Text, Layer
-from estnltk.converters import text_to_json, json_to_text, json_to_layer
+from estnltk.converters import text_to_json
+import sys
+# -- corpus loading methods from data_preprocessing/corpus_preprocessing
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'data_preprocessing', 'corpus_preprocessing'))
+from corpus_methods.file_operations import load_Texts_from_dir
+from corpus_methods.embedding_store import EmbeddingStore
 
 import pandas as pd
 import numpy as np
@@ -18,25 +23,23 @@ def read_articles(data_dir: str, embed_path: str):
 
     test_files = []
 
-    for filename in os.listdir(fn_path+data_dir):
-        test_files.append(json_to_text(file=os.path.join(fn_path+data_dir, filename)))
+    test_files.extend(load_Texts_from_dir(fn_path+data_dir))
     
     # embeddingutega lugemine testhulka, hetkel EstBERT
     #embed_path = "embeddings/BERT_embed_temp_facts/"
     
-    test_files_concat = []
-    test_files_add = []
     
-    for text in test_files:
-        filename = text.meta['filename']
-        test_files_concat.append(json_to_layer(text, file=f"{embed_path}{filename}_embed_concat.json"))
-        test_files_add.append(json_to_layer(text, file=f"{embed_path}{filename}_embed_add.json"))
+    store = EmbeddingStore(embed_path+"embed_layers")
+    test_files_concat = store.for_Texts(test_files, 'concat')
+    test_files_add = store.for_Texts(test_files, 'add')
+    test_files_penult = store.for_Texts(test_files, 'penultimate')
+    test_files_last = store.for_Texts(test_files, 'last')
     
     print("Lugesin sisse", len(test_files_concat), len(test_files_add), "testandmete faili.")
     
-    return test_files, test_files_concat, test_files_add
+    return test_files, test_files_concat, test_files_add, test_files_penult, test_files_last
 
-def get_event_main_mean_embeddings(text_list, text_embed_list, layer_type):
+def get_event_main_mean_embeddings(text_list, text_embed_list):
     """
     Leiab ja tagastab sündmuste embeddingud ning tlink labelid.
     """
@@ -65,30 +68,13 @@ def get_event_main_mean_embeddings(text_list, text_embed_list, layer_type):
             
                 if word_span and event_phrase is not None and duration_label is not None:
                     #word_spans.append(text.words.get(word[0]))
-                    emb = None
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            emb = np.asarray(text_embed_list[text_idx][idx].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            emb = np.asarray(text_embed_list[text_idx][idx].bert_embedding[-768:])
-                    else:
-                        emb = np.asarray(text_embed_list[text_idx][idx].bert_embedding)
+                    emb = np.asarray(text_embed_list[text_idx][idx])
                     
                     event_phrase_spans = [text.words.get(wrd) for wrd in event_phrase]
                     event_phrase_embed = []
                     for idx2, word2 in enumerate(text.gold_word_events):
                         if text.words.get(word2[0]) in event_phrase_spans:
-                            if layer_type:
-                                # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                                if layer_type == "penultimate":
-                                    event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                                # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                                elif layer_type == "last":
-                                    event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                            else:
-                                event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding)
+                            event_phrase_embed.append(text_embed_list[text_idx][idx2])
                     # leiame fraasi vektorite aritmeetilise keskmise
                     if len(event_phrase_embed) > 0:
                         phrase_lengths.append(len(event_phrase_embed))
@@ -103,7 +89,7 @@ def get_event_main_mean_embeddings(text_list, text_embed_list, layer_type):
     assert len(duration_labels) == len(embed) == len(phrase_embed), "different list lengths"
     return embed, phrase_embed, duration_labels
 
-def get_event_main_mean_embeddings_tri(text_list, text_embed_list, layer_type):
+def get_event_main_mean_embeddings_tri(text_list, text_embed_list):
     """
     Leiab ja tagastab sündmuste embeddingud ning tlink labelid.
     """
@@ -143,30 +129,13 @@ def get_event_main_mean_embeddings_tri(text_list, text_embed_list, layer_type):
             
                 if word_span and event_phrase is not None and duration_label is not None:
                     #word_spans.append(text.words.get(word[0]))
-                    emb = None
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            emb = np.asarray(text_embed_list[text_idx][idx].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            emb = np.asarray(text_embed_list[text_idx][idx].bert_embedding[-768:])
-                    else:
-                        emb = np.asarray(text_embed_list[text_idx][idx].bert_embedding)
+                    emb = np.asarray(text_embed_list[text_idx][idx])
                     
                     event_phrase_spans = [text.words.get(wrd) for wrd in event_phrase]
                     event_phrase_embed = []
                     for idx2, word2 in enumerate(text.gold_word_events):
                         if text.words.get(word2[0]) in event_phrase_spans:
-                            if layer_type:
-                                # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                                if layer_type == "penultimate":
-                                    event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                                # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                                elif layer_type == "last":
-                                    event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                            else:
-                                event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding)
+                            event_phrase_embed.append(text_embed_list[text_idx][idx2])
                     # leiame fraasi vektorite aritmeetilise keskmise
                     if len(event_phrase_embed) > 0:
                         phrase_lengths.append(len(event_phrase_embed))
@@ -181,7 +150,7 @@ def get_event_main_mean_embeddings_tri(text_list, text_embed_list, layer_type):
     assert len(duration_labels) == len(embed) == len(phrase_embed), "different list lengths"
     return embed, phrase_embed, duration_labels
 
-def get_event_main_mean_embeddings_bin(text_list, text_embed_list, layer_type):
+def get_event_main_mean_embeddings_bin(text_list, text_embed_list):
     """
     Leiab ja tagastab sündmuste embeddingud ning tlink labelid.
     """
@@ -221,30 +190,13 @@ def get_event_main_mean_embeddings_bin(text_list, text_embed_list, layer_type):
             
                 if word_span and event_phrase is not None and duration_label is not None:
                     #word_spans.append(text.words.get(word[0]))
-                    emb = None
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            emb = np.asarray(text_embed_list[text_idx][idx].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            emb = np.asarray(text_embed_list[text_idx][idx].bert_embedding[-768:])
-                    else:
-                        emb = np.asarray(text_embed_list[text_idx][idx].bert_embedding)
+                    emb = np.asarray(text_embed_list[text_idx][idx])
                     
                     event_phrase_spans = [text.words.get(wrd) for wrd in event_phrase]
                     event_phrase_embed = []
                     for idx2, word2 in enumerate(text.gold_word_events):
                         if text.words.get(word2[0]) in event_phrase_spans:
-                            if layer_type:
-                                # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                                if layer_type == "penultimate":
-                                    event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                                # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                                elif layer_type == "last":
-                                    event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                            else:
-                                event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding)
+                            event_phrase_embed.append(text_embed_list[text_idx][idx2])
                     # leiame fraasi vektorite aritmeetilise keskmise
                     if len(event_phrase_embed) > 0:
                         phrase_lengths.append(len(event_phrase_embed))
@@ -274,22 +226,22 @@ def run_pipeline(clf, save_path, model_type, clf_name, embed_type, agg_type, X_t
         f.write(f'{model_type}, {clf_name}, {embed_type}, {agg_type} accuracy: {acc_score}\n')
     
 # tekstid ja embeddingud        
-test_texts, test_concat, test_add = read_articles('rkogu/', 'masters_thesis/durations/embeddings/RoBERTa_embed_temp_facts/')
+test_texts, test_concat, test_add, test_penult, test_last = read_articles('rkogu/', 'masters_thesis/durations/embeddings/RoBERTa_embed_temp_facts/')
 
 # viimased neli kihti liidetuna (konkatenatsioon)
-X_test_main_concat, X_test_mean_concat, y_test_concat = get_event_main_mean_embeddings(test_texts, test_concat, None)
-X_test_main_concat_tri, X_test_mean_concat_tri, y_test_concat_tri = get_event_main_mean_embeddings_tri(test_texts, test_concat, None)
-X_test_main_concat_bin, X_test_mean_concat_bin, y_test_concat_bin = get_event_main_mean_embeddings_bin(test_texts, test_concat, None)
+X_test_main_concat, X_test_mean_concat, y_test_concat = get_event_main_mean_embeddings(test_texts, test_concat)
+X_test_main_concat_tri, X_test_mean_concat_tri, y_test_concat_tri = get_event_main_mean_embeddings_tri(test_texts, test_concat)
+X_test_main_concat_bin, X_test_mean_concat_bin, y_test_concat_bin = get_event_main_mean_embeddings_bin(test_texts, test_concat)
 
 # eelviimane kiht
-X_test_main_penult, X_test_mean_penult, y_test_penult = get_event_main_mean_embeddings(test_texts, test_concat, 'penultimate')
-X_test_main_penult_tri, X_test_mean_penult_tri, y_test_penult_tri = get_event_main_mean_embeddings_tri(test_texts, test_concat, 'penultimate')
-X_test_main_penult_bin, X_test_mean_penult_bin, y_test_penult_bin = get_event_main_mean_embeddings_bin(test_texts, test_concat, 'penultimate')
+X_test_main_penult, X_test_mean_penult, y_test_penult = get_event_main_mean_embeddings(test_texts, test_penult)
+X_test_main_penult_tri, X_test_mean_penult_tri, y_test_penult_tri = get_event_main_mean_embeddings_tri(test_texts, test_penult)
+X_test_main_penult_bin, X_test_mean_penult_bin, y_test_penult_bin = get_event_main_mean_embeddings_bin(test_texts, test_penult)
 
 # viimane kiht
-X_test_main_last, X_test_mean_last, y_test_last = get_event_main_mean_embeddings(test_texts, test_concat, 'last')
-X_test_main_last_tri, X_test_mean_last_tri, y_test_last_tri = get_event_main_mean_embeddings_tri(test_texts, test_concat, 'last')
-X_test_main_last_bin, X_test_mean_last_bin, y_test_last_bin = get_event_main_mean_embeddings_bin(test_texts, test_concat, 'last')
+X_test_main_last, X_test_mean_last, y_test_last = get_event_main_mean_embeddings(test_texts, test_last)
+X_test_main_last_tri, X_test_mean_last_tri, y_test_last_tri = get_event_main_mean_embeddings_tri(test_texts, test_last)
+X_test_main_last_bin, X_test_mean_last_bin, y_test_last_bin = get_event_main_mean_embeddings_bin(test_texts, test_last)
 
 # LabelEncoder
 #le = LabelEncoder()
@@ -4,7 +4,12 @@
 import os
 import pickle
 from estnltk import Text, Layer
-from estnltk.converters import text_to_json, json_to_text, json_to_layer
+from estnltk.converters import text_to_json
+import sys
+# -- corpus loading methods from data_preprocessing/corpus_preprocessing
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'data_preprocessing', 'corpus_preprocessing'))
+from corpus_methods.file_operations import load_Texts_from_dir
+from corpus_methods.embedding_store import EmbeddingStore
 
 import pandas as pd
 import numpy as np
@@ -26,35 +31,30 @@ def read_articles():
     train_files = []
     test_files = []
 
-    for filename in os.listdir(fn_path+"train_larger/"):
-        train_files.append(json_to_text(file=os.path.join(fn_path+"train_larger/", filename)))
-    for filename in os.listdir(fn_path+"test/"):
-        test_files.append(json_to_text(file=os.path.join(fn_path+"test/", filename)))
+    train_files.extend(load_Texts_from_dir(fn_path+"train_larger/"))
+    test_files.extend(load_Texts_from_dir(fn_path+"test/"))
     
     # embeddingutega lugemine train-dev-test hulkadesse    
     embed_path_estbert = "embeddings/BERT_embed_temp_facts/"
     
-    train_files_concat = []
-    test_files_concat = []
-    train_files_add = []
-    test_files_add = []
     
-    for text in train_files:
-        filename = text.meta['filename']
-        train_files_concat.append(json_to_layer(text, file=f"{embed_path_estbert}{filename}_embed_concat.json"))
-        train_files_add.append(json_to_layer(text, file=f"{embed_path_estbert}{filename}_embed_add.json"))
-    for text in test_files:
-        filename = text.meta['filename']
-        test_files_concat.append(json_to_layer(text, file=f"{embed_path_estbert}{filename}_embed_concat.json"))
-        test_files_add.append(json_to_layer(text, file=f"{embed_path_estbert}{filename}_embed_add.json"))
+    store = EmbeddingStore(embed_path_estbert+"embed_layers")
+    train_files_concat = store.for_Texts(train_files, 'concat')
+    train_files_add = store.for_Texts(train_files, 'add')
+    train_files_penult = store.for_Texts(train_files, 'penultimate')
+    train_files_last = store.for_Texts(train_files, 'last')
+    test_files_concat = store.for_Texts(test_files, 'concat')
+    test_files_add = store.for_Texts(test_files, 'add')
+    test_files_penult = store.for_Texts(test_files, 'penultimate')
+    test_files_last = store.for_Texts(test_files, 'last')
     
     print("Lugesin sisse", len(train_files_concat), len(train_files_add), "treeningandmete faili.")
     print("Lugesin sisse", len(test_files_concat), len(test_files_add), "testandmete faili.")
     
-    return train_files, test_files, train_files_concat, train_files_add, test_files_concat, test_files_add
+    return train_files, test_files, train_files_concat, train_files_add, train_files_penult, train_files_last, test_files_concat, test_files_add, test_files_penult, test_files_last
 
 
-def get_event_main_mean_embeddings(text_list, text_embed_list, layer_type):
+def get_event_main_mean_embeddings(text_list, text_embed_list):
     """
     Leiab ja tagastab sündmuste embeddingud ning tlink labelid.
     """
@@ -94,30 +94,13 @@ def get_event_main_mean_embeddings(text_list, text_embed_list, layer_type):
             
                 if word_span and event_phrase is not None and duration_label is not None:
                     #word_spans.append(text.words.get(word[0]))
-                    emb = None
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            emb = np.asarray(text_embed_list[text_idx][idx].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            emb = np.asarray(text_embed_list[text_idx][idx].bert_embedding[-768:])
-                    else:
-                        emb = np.asarray(text_embed_list[text_idx][idx].bert_embedding)
+                    emb = np.asarray(text_embed_list[text_idx][idx])
                     
                     event_phrase_spans = [text.words.get(wrd) for wrd in event_phrase]
                     event_phrase_embed = []
                     for idx2, word2 in enumerate(text.gold_word_events):
                         if text.words.get(word2[0]) in event_phrase_spans:
-                            if layer_type:
-                                # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                                if layer_type == "penultimate":
-                                    event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                                # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                                elif layer_type == "last":
-                                    event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                            else:
-                                event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding)
+                            event_phrase_embed.append(text_embed_list[text_idx][idx2])
                     # leiame fraasi vektorite aritmeetilise keskmise
                     if len(event_phrase_embed) > 0:
                         phrase_lengths.append(len(event_phrase_embed))
@@ -153,23 +136,23 @@ def run_pipeline(clf, save_path, clf_name, embed_type, X_train, y_train, X_test,
         f.write(f'{clf_name}, {embed_type} accuracy: {acc_score}\n')
     
 # tekstid ja embeddingud        
-train_texts, test_texts, train_concat, train_add, test_concat, test_add = read_articles()
+train_texts, test_texts, train_concat, train_add, train_penult, train_last, test_concat, test_add, test_penult, test_last = read_articles()
 
 # viimase nelja kihi konkatenatsioon
-X_train_main_concat, X_train_mean_concat, y_train_concat = get_event_main_mean_embeddings(train_texts, train_concat, None)
-X_test_main_concat, X_test_mean_concat, y_test_concat = get_event_main_mean_embeddings(test_texts, test_concat, None)
+X_train_main_concat, X_train_mean_concat, y_train_concat = get_event_main_mean_embeddings(train_texts, train_concat)
+X_test_main_concat, X_test_mean_concat, y_test_concat = get_event_main_mean_embeddings(test_texts, test_concat)
 
 # viimase nelja kihi summa
-X_train_main_add, X_train_mean_add, y_train_add = get_event_main_mean_embeddings(train_texts, train_add, None)
-X_test_main_add, X_test_mean_add, y_test_add = get_event_main_mean_embeddings(test_texts, test_add, None)
+X_train_main_add, X_train_mean_add, y_train_add = get_event_main_mean_embeddings(train_texts, train_add)
+X_test_main_add, X_test_mean_add, y_test_add = get_event_main_mean_embeddings(test_texts, test_add)
 
 # eelviimane kiht
-X_train_main_penult, X_train_mean_penult, y_train_penult = get_event_main_mean_embeddings(train_texts, train_concat, 'penultimate')
-X_test_main_penult, X_test_mean_penult, y_test_penult = get_event_main_mean_embeddings(test_texts, test_concat, 'penultimate')
+X_train_main_penult, X_train_mean_penult, y_train_penult = get_event_main_mean_embeddings(train_texts, train_penult)
+X_test_main_penult, X_test_mean_penult, y_test_penult = get_event_main_mean_embeddings(test_texts, test_penult)
 
 # viimane kiht
-X_train_main_last, X_train_mean_last, y_train_last = get_event_main_mean_embeddings(train_texts, train_concat, 'last')
-X_test_main_last, X_test_mean_last, y_test_last = get_event_main_mean_embeddings(test_texts, test_concat, 'last')
+X_train_main_last, X_train_mean_last, y_train_last = get_event_main_mean_embeddings(train_texts, train_last)
+X_test_main_last, X_test_mean_last, y_test_last = get_event_main_mean_embeddings(test_texts, test_last)
 
 # klasside arv treeningandmestikus
 n_classes = len(set(list(y_train_concat)))
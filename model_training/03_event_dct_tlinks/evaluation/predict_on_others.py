@@ -4,7 +4,12 @@
 import os
 import pickle
 from estnltk import Text, Layer
-from estnltk.converters import text_to_json, json_to_text, json_to_layer
+from estnltk.converters import text_to_json
+import sys
+# -- corpus loading methods from data_preprocessing/corpus_preprocessing
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'data_preprocessing', 'corpus_preprocessing'))
+from corpus_methods.file_operations import load_Texts_from_dir
+from corpus_methods.embedding_store import EmbeddingStore
 
 import pandas as pd
 import numpy as np
@@ -18,26 +23,24 @@ def read_articles(data_dir: str, embed_path: str):
 
     test_files = []
 
-    for filename in os.listdir(fn_path+data_dir):
-        test_files.append(json_to_text(file=os.path.join(fn_path+data_dir, filename)))
+    test_files.extend(load_Texts_from_dir(fn_path+data_dir))
     
     # embeddingutega lugemine testhulka, hetkel EstBERT
     #embed_path = "embeddings/BERT_embed_temp_facts/"
     
-    test_files_concat = []
-    test_files_add = []
     
-    for text in test_files:
-        filename = text.meta['filename']
-        test_files_concat.append(json_to_layer(text, file=f"{embed_path}{filename}_embed_concat.json"))
-        test_files_add.append(json_to_layer(text, file=f"{embed_path}{filename}_embed_add.json"))
+    store = EmbeddingStore(embed_path+"embed_layers")
+    test_files_concat = store.for_Texts(test_files, 'concat')
+    test_files_add = store.for_Texts(test_files, 'add')
+    test_files_penult = store.for_Texts(test_files, 'penultimate')
+    test_files_last = store.for_Texts(test_files, 'last')
     
     print("Lugesin sisse", len(test_files_concat), len(test_files_add), "testandmete faili.")
     
-    return test_files, test_files_concat, test_files_add
+    return test_files, test_files_concat, test_files_add, test_files_penult, test_files_last
 
 
-def get_event_main_embeddings(text_list, text_embed_list, layer_type):
+def get_event_main_embeddings(text_list, text_embed_list):
     """
     Leiab ja tagastab sündmuste-ajaväljendite peasõnade embeddingud ning tlink labelid.
     """
@@ -51,21 +54,13 @@ def get_event_main_embeddings(text_list, text_embed_list, layer_type):
             for idx2, word in enumerate(text.gold_word_events_main):
                 if word.nertag == 'B-EVENT' or word.nertag == 'I-EVENT':
                     if text.words.get(word[0]) in ev_word_spans:
-                        if layer_type:
-                            # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                            if layer_type == "penultimate":
-                                embed.append(np.asarray(text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                            # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                            elif layer_type == "last":
-                                embed.append(np.asarray(text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                        else:
-                            embed.append(np.asarray(text_embed_list[text_idx][idx2].bert_embedding))
+                        embed.append(np.asarray(text_embed_list[text_idx][idx2]))
             tlink_labels.append(tlink["rel_type"])
                 
     assert len(tlink_labels) == len(embed), "different list lengths"
     return embed, tlink_labels
 
-def get_event_mean_embeddings(text_list, text_embed_list, layer_type):
+def get_event_mean_embeddings(text_list, text_embed_list):
     """
     Leiab ja tagastab sündmusfraaside sõnade embeddingute aritmeetilised keskmised väärtused ning kestuste labelid.
     """
@@ -80,22 +75,14 @@ def get_event_mean_embeddings(text_list, text_embed_list, layer_type):
             event_phrase_embed = []
             for idx2, word in enumerate(text.words):
                 if word in ev_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                    else:
-                        event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding)
+                    event_phrase_embed.append(text_embed_list[text_idx][idx2])
             embed.append(np.mean(event_phrase_embed, 0))
             tlink_labels.append(tlink["rel_type"])                   
     assert len(tlink_labels) == len(embed), "different list lengths"
     return embed, tlink_labels
  
         
-def get_event_avg_embeddings(text_list, text_embed_list, layer_type):
+def get_event_avg_embeddings(text_list, text_embed_list):
     """
     Leiab ja tagastab sündmusfraaside sõnade embeddingute kaalutud keskmised väärtused ning kestuste labelid.
     """
@@ -110,21 +97,13 @@ def get_event_avg_embeddings(text_list, text_embed_list, layer_type):
             event_phrase_embed = []
             for idx2, word in enumerate(text.words):
                 if word in ev_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                    else:
-                        event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding)
+                    event_phrase_embed.append(text_embed_list[text_idx][idx2])
             embed.append(np.average(event_phrase_embed, 0))
             tlink_labels.append(tlink["rel_type"])           
     assert len(tlink_labels) == len(embed), "different list lengths"   
     return embed, tlink_labels
 
-def get_event_mean_embeddings_agg(text_list, text_embed_list, layer_type):
+def get_event_mean_embeddings_agg(text_list, text_embed_list):
     """
     Leiab ja tagastab sündmusfraaside sõnade embeddingute aritmeetilised keskmised väärtused ning kestuste labelid.
     """
@@ -146,22 +125,14 @@ def get_event_mean_embeddings_agg(text_list, text_embed_list, layer_type):
             event_phrase_embed = []
             for idx2, word in enumerate(text.words):
                 if word in ev_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                    else:
-                        event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding)
+                    event_phrase_embed.append(text_embed_list[text_idx][idx2])
             embed.append(np.mean(event_phrase_embed, 0))
             tlink_labels.append(agg_dct[tlink["rel_type"]])                   
     assert len(tlink_labels) == len(embed), "different list lengths"
     return embed, tlink_labels
  
         
-def get_event_avg_embeddings_agg(text_list, text_embed_list, layer_type):
+def get_event_avg_embeddings_agg(text_list, text_embed_list):
     """
     Leiab ja tagastab sündmusfraaside sõnade embeddingute kaalutud keskmised väärtused ning kestuste labelid.
     """
@@ -183,15 +154,7 @@ def get_event_avg_embeddings_agg(text_list, text_embed_list, layer_type):
             event_phrase_embed = []
             for idx2, word in enumerate(text.words):
                 if word in ev_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                    else:
-                        event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding)
+                    event_phrase_embed.append(text_embed_list[text_idx][idx2])
             embed.append(np.average(event_phrase_embed, 0))
             tlink_labels.append(agg_dct[tlink["rel_type"]])           
     assert len(tlink_labels) == len(embed), "different list lengths"   
@@ -212,31 +175,31 @@ def run_pipeline(clf, save_path, model_type, clf_name, embed_type, agg_type, X_t
         f.write(f'{model_type}, {clf_name}, {embed_type}, {agg_type} accuracy: {acc_score}\n')
     
 # tekstid ja embeddingud        
-test_texts, test_concat, test_add = read_articles('rkogu/', 'masters_thesis/tlinks_ev_dct/embeddings/RoBERTa_embed_temp_facts/')
+test_texts, test_concat, test_add, test_penult, test_last = read_articles('rkogu/', 'masters_thesis/tlinks_ev_dct/embeddings/RoBERTa_embed_temp_facts/')
 
 # viimased neli kihti liidetuna (konkatenatsioon)
-X_test_mean_concat, y_test_mean_concat = get_event_mean_embeddings(test_texts, test_concat, None)
-X_test_avg_concat, y_test_avg_concat = get_event_avg_embeddings(test_texts, test_concat, None)
-X_test_mean_concat_tri, y_test_mean_concat_tri = get_event_mean_embeddings_tri(test_texts, test_concat, None)
-X_test_avg_concat_tri, y_test_avg_concat_tri = get_event_avg_embeddings_tri(test_texts, test_concat, None)
-X_test_mean_concat_bin, y_test_mean_concat_bin = get_event_mean_embeddings_bin(test_texts, test_concat, None)
-X_test_avg_concat_bin, y_test_avg_concat_bin = get_event_avg_embeddings_bin(test_texts, test_concat, None)
+X_test_mean_concat, y_test_mean_concat = get_event_mean_embeddings(test_texts, test_concat)
+X_test_avg_concat, y_test_avg_concat = get_event_avg_embeddings(test_texts, test_concat)
+X_test_mean_concat_tri, y_test_mean_concat_tri = get_event_mean_embeddings_tri(test_texts, test_concat)
+X_test_avg_concat_tri, y_test_avg_concat_tri = get_event_avg_embeddings_tri(test_texts, test_concat)
+X_test_mean_concat_bin, y_test_mean_concat_bin = get_event_mean_embeddings_bin(test_texts, test_concat)
+X_test_avg_concat_bin, y_test_avg_concat_bin = get_event_avg_embeddings_bin(test_texts, test_concat)
 
 # eelviimane kiht
-X_test_mean_penult, y_test_mean_penult = get_event_mean_embeddings(test_texts, test_concat, 'penultimate')
-X_test_avg_penult, y_test_avg_penult = get_event_avg_embeddings(test_texts, test_concat, 'penultimate')
-X_test_mean_penult_tri, y_test_mean_penult_tri = get_event_mean_embeddings_tri(test_texts, test_concat, 'penultimate')
-X_test_avg_penult_tri, y_test_avg_penult_tri = get_event_avg_embeddings_tri(test_texts, test_concat, 'penultimate')
-X_test_mean_penult_bin, y_test_mean_penult_bin = get_event_mean_embeddings_bin(test_texts, test_concat, 'penultimate')
-X_test_avg_penult_bin, y_test_avg_penult_bin = get_event_avg_embeddings_bin(test_texts, test_concat, 'penultimate')
+X_test_mean_penult, y_test_mean_penult = get_event_mean_embeddings(test_texts, test_penult)
+X_test_avg_penult, y_test_avg_penult = get_event_avg_embeddings(test_texts, test_penult)
+X_test_mean_penult_tri, y_test_mean_penult_tri = get_event_mean_embeddings_tri(test_texts, test_penult)
+X_test_avg_penult_tri, y_test_avg_penult_tri = get_event_avg_embeddings_tri(test_texts, test_penult)
+X_test_mean_penult_bin, y_test_mean_penult_bin = get_event_mean_embeddings_bin(test_texts, test_penult)
+X_test_avg_penult_bin, y_test_avg_penult_bin = get_event_avg_embeddings_bin(test_texts, test_penult)
 
 # viimane kiht
-X_test_mean_last, y_test_mean_last = get_event_mean_embeddings(test_texts, test_concat, 'last')
-X_test_avg_last, y_test_avg_last = get_event_avg_embeddings(test_texts, test_concat, 'last')
-X_test_mean_last_tri, y_test_mean_last_tri = get_event_mean_embeddings_tri(test_texts, test_concat, 'last')
-X_test_avg_last_tri, y_test_avg_last_tri = get_event_avg_embeddings_tri(test_texts, test_concat, 'last')
-X_test_mean_last_bin, y_test_mean_last_bin = get_event_mean_embeddings_bin(test_texts, test_concat, 'last')
-X_test_avg_last_bin, y_test_avg_last_bin = get_event_avg_embeddings_bin(test_texts, test_concat, 'last')
+X_test_mean_last, y_test_mean_last = get_event_mean_embeddings(test_texts, test_last)
+X_test_avg_last, y_test_avg_last = get_event_avg_embeddings(test_texts, test_last)
+X_test_mean_last_tri, y_test_mean_last_tri = get_event_mean_embeddings_tri(test_texts, test_last)
+X_test_avg_last_tri, y_test_avg_last_tri = get_event_avg_embeddings_tri(test_texts, test_last)
+X_test_mean_last_bin, y_test_mean_last_bin = get_event_mean_embeddings_bin(test_texts, test_last)
+X_test_avg_last_bin, y_test_avg_last_bin = get_event_avg_embeddings_bin(test_texts, test_last)
 
 
 clf1 = pickle.load(open('./masters_thesis/durations/estbert_ev_durations_models/estbert_RF_mean_penult.pkl', 'rb')) # TEHTUD, TEHTUD
@@ -4,7 +4,12 @@
 import os
 import pickle
 from estnltk import Text, Layer
-from estnltk.converters import text_to_json, json_to_text, json_to_layer
+from estnltk.converters import text_to_json
+import sys
+# -- corpus loading methods from data_preprocessing/corpus_preprocessing
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'data_preprocessing', 'corpus_preprocessing'))
+from corpus_methods.file_operations import load_Texts_from_dir
+from corpus_methods.embedding_store import EmbeddingStore
 
 import pandas as pd
 import numpy as np
@@ -26,37 +31,31 @@ def read_articles():
     train_files = []
     test_files = []
 
-    for filename in os.listdir(fn_path+"train/"):
-        train_files.append(json_to_text(file=os.path.join(fn_path+"train/", filename)))
-    for filename in os.listdir(fn_path+"dev/"): # lisame dev failid train failide juurde
-        train_files.append(json_to_text(file=os.path.join(fn_path+"dev/", filename)))
-    for filename in os.listdir(fn_path+"test/"):
-        test_files.append(json_to_text(file=os.path.join(fn_path+"test/", filename)))
+    train_files.extend(load_Texts_from_dir(fn_path+"train/"))
+    train_files.extend(load_Texts_from_dir(fn_path+"dev/")) # lisame dev failid train failide juurde
+    test_files.extend(load_Texts_from_dir(fn_path+"test/"))
     
     # embeddingutega lugemine train-dev-test hulkadesse    
     embed_path_estbert = "embeddings/BERT_embed_EstTimeML/"
     
-    train_files_concat = []
-    test_files_concat = []
-    train_files_add = []
-    test_files_add = []
     
-    for text in train_files:
-        filename = text.meta['filename']
-        train_files_concat.append(json_to_layer(text, file=f"{embed_path_estbert}{filename}_embed_concat.json"))
-        train_files_add.append(json_to_layer(text, file=f"{embed_path_estbert}{filename}_embed_add.json"))
-    for text in test_files:
-        filename = text.meta['filename']
-        test_files_concat.append(json_to_layer(text, file=f"{embed_path_estbert}{filename}_embed_concat.json"))
-        test_files_add.append(json_to_layer(text, file=f"{embed_path_estbert}{filename}_embed_add.json"))
+    store = EmbeddingStore(embed_path_estbert+"embed_layers")
+    train_files_concat = store.for_Texts(train_files, 'concat')
+    train_files_add = store.for_Texts(train_files, 'add')
+    train_files_penult = store.for_Texts(train_files, 'penultimate')
+    train_files_last = store.for_Texts(train_files, 'last')
+    test_files_concat = store.for_Texts(test_files, 'concat')
+    test_files_add = store.for_Texts(test_files, 'add')
+    test_files_penult = store.for_Texts(test_files, 'penultimate')
+    test_files_last = store.for_Texts(test_files, 'last')
     
     print("Lugesin sisse", len(train_files_concat), len(train_files_add), "treeningandmete faili.")
     print("Lugesin sisse", len(test_files_concat), len(test_files_add), "testandmete faili.")
     
-    return train_files, test_files, train_files_concat, train_files_add, test_files_concat, test_files_add
+    return train_files, test_files, train_files_concat, train_files_add, train_files_penult, train_files_last, test_files_concat, test_files_add, test_files_penult, test_files_last
 
 
-def get_event_main_embeddings(text_list, text_embed_list, layer_type):
+def get_event_main_embeddings(text_list, text_embed_list):
     """
     Leiab ja tagastab sündmuste-ajaväljendite peasõnade embeddingud ning tlink labelid.
     """
@@ -77,22 +76,14 @@ def get_event_main_embeddings(text_list, text_embed_list, layer_type):
             for idx2, word in enumerate(text.gold_word_events_main):
                 if word.nertag == 'B-EVENT' or word.nertag == 'I-EVENT':
                     if text.words.get(word[0]) in ev_word_spans:
-                        if layer_type:
-                            # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                            if layer_type == "penultimate":
-                                embed.append(np.asarray(text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                            # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                            elif layer_type == "last":
-                                embed.append(np.asarray(text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                        else:
-                            embed.append(np.asarray(text_embed_list[text_idx][idx2].bert_embedding))
+                        embed.append(np.asarray(text_embed_list[text_idx][idx2]))
             tlink_labels.append(agg_dct[tlink["rel_type"]])
                 
     assert len(tlink_labels) == len(embed), "different list lengths"
     return embed, tlink_labels
 
         
-def get_event_mean_embeddings(text_list, text_embed_list, layer_type):
+def get_event_mean_embeddings(text_list, text_embed_list):
     """
     Leiab ja tagastab sündmusfraaside sõnade embeddingute aritmeetilised keskmised väärtused ning kestuste labelid.
     """
@@ -114,22 +105,14 @@ def get_event_mean_embeddings(text_list, text_embed_list, layer_type):
             event_phrase_embed = []
             for idx2, word in enumerate(text.words):
                 if word in ev_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                    else:
-                        event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding)
+                    event_phrase_embed.append(text_embed_list[text_idx][idx2])
             embed.append(np.mean(event_phrase_embed, 0))
             tlink_labels.append(agg_dct[tlink["rel_type"]])                   
     assert len(tlink_labels) == len(embed), "different list lengths"
     return embed, tlink_labels
  
         
-def get_event_avg_embeddings(text_list, text_embed_list, layer_type):
+def get_event_avg_embeddings(text_list, text_embed_list):
     """
     Leiab ja tagastab sündmusfraaside sõnade embeddingute kaalutud keskmised väärtused ning kestuste labelid.
     """
@@ -151,15 +134,7 @@ def get_event_avg_embeddings(text_list, text_embed_list, layer_type):
             event_phrase_embed = []
             for idx2, word in enumerate(text.words):
                 if word in ev_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                    else:
-                        event_phrase_embed.append(text_embed_list[text_idx][idx2].bert_embedding)
+                    event_phrase_embed.append(text_embed_list[text_idx][idx2])
             embed.append(np.average(event_phrase_embed, 0))
             tlink_labels.append(agg_dct[tlink["rel_type"]])           
     assert len(tlink_labels) == len(embed), "different list lengths"   
@@ -186,43 +161,43 @@ def run_pipeline(clf, save_path, clf_name, embed_type, X_train, y_train, X_test,
         f.write(f'{clf_name}, {embed_type} accuracy: {acc_score}\n')
     
 # tekstid ja embeddingud        
-train_texts, test_texts, train_concat, train_add, test_concat, test_add = read_articles()
+train_texts, test_texts, train_concat, train_add, train_penult, train_last, test_concat, test_add, test_penult, test_last = read_articles()
 
 # viimase nelja kihi konkatenatsioon
-X_train_main_concat, y_train_main_concat = get_event_main_embeddings(train_texts, train_concat, None)
-X_train_mean_concat, y_train_mean_concat = get_event_mean_embeddings(train_texts, train_concat, None)
-X_train_avg_concat, y_train_avg_concat = get_event_avg_embeddings(train_texts, train_concat, None)
+X_train_main_concat, y_train_main_concat = get_event_main_embeddings(train_texts, train_concat)
+X_train_mean_concat, y_train_mean_concat = get_event_mean_embeddings(train_texts, train_concat)
+X_train_avg_concat, y_train_avg_concat = get_event_avg_embeddings(train_texts, train_concat)
 
-X_test_main_concat, y_test_main_concat = get_event_main_embeddings(test_texts, test_concat, None)
-X_test_mean_concat, y_test_mean_concat = get_event_mean_embeddings(test_texts, test_concat, None)
-X_test_avg_concat, y_test_avg_concat = get_event_avg_embeddings(test_texts, test_concat, None)
+X_test_main_concat, y_test_main_concat = get_event_main_embeddings(test_texts, test_concat)
+X_test_mean_concat, y_test_mean_concat = get_event_mean_embeddings(test_texts, test_concat)
+X_test_avg_concat, y_test_avg_concat = get_event_avg_embeddings(test_texts, test_concat)
 
 # viimase nelja kihi summa
-X_train_main_add, y_train_main_add = get_event_main_embeddings(train_texts, train_add, None)
-X_train_mean_add, y_train_mean_add = get_event_mean_embeddings(train_texts, train_add, None)
-X_train_avg_add, y_train_avg_add = get_event_avg_embeddings(train_texts, train_add, None)
+X_train_main_add, y_train_main_add = get_event_main_embeddings(train_texts, train_add)
+X_train_mean_add, y_train_mean_add = get_event_mean_embeddings(train_texts, train_add)
+X_train_avg_add, y_train_avg_add = get_event_avg_embeddings(train_texts, train_add)
 
-X_test_main_add, y_test_main_add = get_event_main_embeddings(test_texts, test_add, None)
-X_test_mean_add, y_test_mean_add = get_event_mean_embeddings(test_texts, test_add, None)
-X_test_avg_add, y_test_avg_add = get_event_avg_embeddings(test_texts, test_add, None)
+X_test_main_add, y_test_main_add = get_event_main_embeddings(test_texts, test_add)
+X_test_mean_add, y_test_mean_add = get_event_mean_embeddings(test_texts, test_add)
+X_test_avg_add, y_test_avg_add = get_event_avg_embeddings(test_texts, test_add)
 
 # eelviimane kiht
-X_train_main_penult, y_train_main_penult = get_event_main_embeddings(train_texts, train_concat, 'penultimate')
-X_train_mean_penult, y_train_mean_penult = get_event_mean_embeddings(train_texts, train_concat, 'penultimate')
-X_train_avg_penult, y_train_avg_penult = get_event_avg_embeddings(train_texts, train_concat, 'penultimate')
+X_train_main_penult, y_train_main_penult = get_event_main_embeddings(train_texts, train_penult)
+X_train_mean_penult, y_train_mean_penult = get_event_mean_embeddings(train_texts, train_penult)
+X_train_avg_penult, y_train_avg_penult = get_event_avg_embeddings(train_texts, train_penult)
 
-X_test_main_penult, y_test_main_penult = get_event_main_embeddings(test_texts, test_concat, 'penultimate')
-X_test_mean_penult, y_test_mean_penult = get_event_mean_embeddings(test_texts, test_concat, 'penultimate')
-X_test_avg_penult, y_test_avg_penult = get_event_avg_embeddings(test_texts, test_concat, 'penultimate')
+X_test_main_penult, y_test_main_penult = get_event_main_embeddings(test_texts, test_penult)
+X_test_mean_penult, y_test_mean_penult = get_event_mean_embeddings(test_texts, test_penult)
+X_test_avg_penult, y_test_avg_penult = get_event_avg_embeddings(test_texts, test_penult)
 
 # viimane kiht
-X_train_main_last, y_train_main_last = get_event_main_embeddings(train_texts, train_concat, 'last')
-X_train_mean_last, y_train_mean_last = get_event_mean_embeddings(train_texts, train_concat, 'last')
-X_train_avg_last, y_train_avg_last = get_event_avg_embeddings(train_texts, train_concat, 'last')
+X_train_main_last, y_train_main_last = get_event_main_embeddings(train_texts, train_last)
+X_train_mean_last, y_train_mean_last = get_event_mean_embeddings(train_texts, train_last)
+X_train_avg_last, y_train_avg_last = get_event_avg_embeddings(train_texts, train_last)
 
-X_test_main_last, y_test_main_last = get_event_main_embeddings(test_texts, test_concat, 'last')
-X_test_mean_last, y_test_mean_last = get_event_mean_embeddings(test_texts, test_concat, 'last')
-X_test_avg_last, y_test_avg_last = get_event_avg_embeddings(test_texts, test_concat, 'last')
+X_test_main_last, y_test_main_last = get_event_main_embeddings(test_texts, test_last)
+X_test_mean_last, y_test_mean_last = get_event_mean_embeddings(test_texts, test_last)
+X_test_avg_last, y_test_avg_last = get_event_avg_embeddings(test_texts, test_last)
 
 # klasside arv treeningandmestikus
 n_classes = len(set(list(y_train_main_concat)))
@@ -4,7 +4,12 @@
 import os
 import pickle
 from estnltk import Text, Layer
-from estnltk.converters import text_to_json, json_to_text, json_to_layer
+from estnltk.converters import text_to_json
+import sys
+# -- corpus loading methods from data_preprocessing/corpus_preprocessing
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'data_preprocessing', 'corpus_preprocessing'))
+from corpus_methods.file_operations import load_Texts_from_dir
+from corpus_methods.embedding_store import EmbeddingStore
 
 import pandas as pd
 import numpy as np
@@ -18,23 +23,21 @@ def read_articles(data_dir: str, embed_path: str):
 
     test_files = []
 
-    for filename in os.listdir(fn_path+data_dir):
-        test_files.append(json_to_text(file=os.path.join(fn_path+data_dir, filename)))
+    test_files.extend(load_Texts_from_dir(fn_path+data_dir))
     
     # embeddingutega lugemine testhulka, hetkel EstBERT
     #embed_path = "embeddings/BERT_embed_temp_facts/"
     
-    test_files_concat = []
-    test_files_add = []
     
-    for text in test_files:
-        filename = text.meta['filename']
-        test_files_concat.append(json_to_layer(text, file=f"{embed_path}{filename}_embed_concat.json"))
-        test_files_add.append(json_to_layer(text, file=f"{embed_path}{filename}_embed_add.json"))
+    store = EmbeddingStore(embed_path+"embed_layers")
+    test_files_concat = store.for_Texts(test_files, 'concat')
+    test_files_add = store.for_Texts(test_files, 'add')
+    test_files_penult = store.for_Texts(test_files, 'penultimate')
+    test_files_last = store.for_Texts(test_files, 'last')
     
     print("Lugesin sisse", len(test_files_concat), len(test_files_add), "testandmete faili.")
     
-    return test_files, test_files_concat, test_files_add
+    return test_files, test_files_concat, test_files_add, test_files_penult, test_files_last
 
 # finds timex phrases of given sentence, if they exist in tlink layer
 def get_sentence_phrases(text_obj, sentence, tlink_layer_name):
@@ -63,7 +66,7 @@ def get_sentence_phrase_main_word(phrase, text_obj, current_word):
             if current_word_span in phrase:
                 return current_word_span
 
-def get_event_timex_embeddings(tempfact_text_list, tempfact_text_embed_list, layer_type):
+def get_event_timex_embeddings(tempfact_text_list, tempfact_text_embed_list):
     """
     Leiab ja tagastab sündmuste-ajaväljendite peasõnade embeddingud ning tlink labelid.
     """            
@@ -113,15 +116,7 @@ def get_event_timex_embeddings(tempfact_text_list, tempfact_text_embed_list, lay
                 if word.nertag == 'B-EVENT' or word.nertag == 'I-EVENT':
                     if text.words.get(word[0]) in ev_word_spans:
                         ev_found = True
-                        if layer_type:
-                            # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                            if layer_type == "penultimate":
-                                event_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                            # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                            elif layer_type == "last":
-                                event_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                        else:
-                            event_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding))
+                        event_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2]))
                         break
             
             if not ev_found:
@@ -132,15 +127,7 @@ def get_event_timex_embeddings(tempfact_text_list, tempfact_text_embed_list, lay
             for idx2, word in enumerate(text.words):
                 if word in tm_word_spans and word in all_timexes_main_words:
                     tm_found = True
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            timex_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            timex_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                    else:
-                        timex_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding))
+                    timex_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2]))
                     break
             
             if not tm_found:
@@ -151,25 +138,9 @@ def get_event_timex_embeddings(tempfact_text_list, tempfact_text_embed_list, lay
             timex_phrase_embed = []
             for idx2, word in enumerate(text.words):
                 if word in ev_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            event_phrase_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            event_phrase_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                    else:
-                        event_phrase_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding))
+                    event_phrase_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2]))
                 elif word in tm_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            timex_phrase_embed.append(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            timex_phrase_embed.append(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                    else:
-                        timex_phrase_embed.append(tempfact_text_embed_list[text_idx][idx2].bert_embedding)
+                    timex_phrase_embed.append(tempfact_text_embed_list[text_idx][idx2])
             
             # lisame sündmuse-ajaväljendi embeddingute aritmeetilise keskmise            
             event_timex_mean_embed.append(np.concatenate((np.mean(event_phrase_embed, 0), np.mean(timex_phrase_embed, 0))))
@@ -185,7 +156,7 @@ def get_event_timex_embeddings(tempfact_text_list, tempfact_text_embed_list, lay
     assert len(tlinks) == len(event_timex_main_embed) == len(event_timex_mean_embed), "different list lengths"
     return event_timex_main_embed, event_timex_mean_embed, tlinks
 
-def get_event_timex_embeddings_agg(tempfact_text_list, tempfact_text_embed_list, layer_type):
+def get_event_timex_embeddings_agg(tempfact_text_list, tempfact_text_embed_list):
     """
     Leiab ja tagastab sündmuste-ajaväljendite peasõnade embeddingud ning tlink labelid.
     """ 
@@ -241,15 +212,7 @@ def get_event_timex_embeddings_agg(tempfact_text_list, tempfact_text_embed_list,
                 if word.nertag == 'B-EVENT' or word.nertag == 'I-EVENT':
                     if text.words.get(word[0]) in ev_word_spans:
                         ev_found = True
-                        if layer_type:
-                            # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                            if layer_type == "penultimate":
-                                event_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                            # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                            elif layer_type == "last":
-                                event_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                        else:
-                            event_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding))
+                        event_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2]))
                         break
             
             if not ev_found:
@@ -260,15 +223,7 @@ def get_event_timex_embeddings_agg(tempfact_text_list, tempfact_text_embed_list,
             for idx2, word in enumerate(text.words):
                 if word in tm_word_spans and word in all_timexes_main_words:
                     tm_found = True
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            timex_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            timex_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                    else:
-                        timex_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding))
+                    timex_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2]))
                     break
             
             if not tm_found:
@@ -279,25 +234,9 @@ def get_event_timex_embeddings_agg(tempfact_text_list, tempfact_text_embed_list,
             timex_phrase_embed = []
             for idx2, word in enumerate(text.words):
                 if word in ev_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            event_phrase_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            event_phrase_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                    else:
-                        event_phrase_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding))
+                    event_phrase_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2]))
                 elif word in tm_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            timex_phrase_embed.append(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            timex_phrase_embed.append(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                    else:
-                        timex_phrase_embed.append(tempfact_text_embed_list[text_idx][idx2].bert_embedding)
+                    timex_phrase_embed.append(tempfact_text_embed_list[text_idx][idx2])
             
             # lisame sündmuse-ajaväljendi embeddingute aritmeetilise keskmise            
             event_timex_mean_embed.append(np.concatenate((np.mean(event_phrase_embed, 0), np.mean(timex_phrase_embed, 0))))
@@ -328,29 +267,29 @@ def run_pipeline(clf, save_path, model_type, clf_name, embed_type, agg_type, X_t
         f.write(f'{model_type}, {clf_name}, {embed_type}, {agg_type} accuracy: {acc_score}\n')
     
 # tekstid ja embeddingud        
-test_texts, test_concat, test_add = read_articles('horisont/', 'masters_thesis/tlinks_ev_tim/embeddings/RoBERTa_embed_temp_facts/')
+test_texts, test_concat, test_add, test_penult, test_last = read_articles('horisont/', 'masters_thesis/tlinks_ev_tim/embeddings/RoBERTa_embed_temp_facts/')
 
 # viimased neli kihti liidetuna (konkatenatsioon)
-X_test_main_concat, X_test_mean_concat, y_test_concat = get_event_timex_embeddings(test_texts, test_concat, None)
-#X_test_avg_concat, y_test_avg_concat = get_event_timex_avg_embeddings(test_texts, test_concat, None)
-X_test_main_concat_agg, X_test_mean_concat_agg, y_test_concat_agg = get_event_timex_embeddings_agg(test_texts, test_concat, None)
-#X_test_avg_concat_agg, y_test_avg_concat_agg = get_event_timex_avg_embeddings_agg(test_texts, test_concat, None)
+X_test_main_concat, X_test_mean_concat, y_test_concat = get_event_timex_embeddings(test_texts, test_concat)
+#X_test_avg_concat, y_test_avg_concat = get_event_timex_avg_embeddings(test_texts, test_concat)
+X_test_main_concat_agg, X_test_mean_concat_agg, y_test_concat_agg = get_event_timex_embeddings_agg(test_texts, test_concat)
+#X_test_avg_concat_agg, y_test_avg_concat_agg = get_event_timex_avg_embeddings_agg(test_texts, test_concat)
 
 # viimase nelja kihi summa
-X_test_main_add, X_test_mean_add, y_test_add = get_event_timex_embeddings(test_texts, test_add, None)
-#X_test_avg_add, y_test_avg_add = get_event_timex_avg_embeddings(test_texts, test_add, None)
-X_test_main_add_agg, X_test_mean_add_agg, y_test_add_agg = get_event_timex_embeddings_agg(test_texts, test_add, None)
-#X_test_avg_add_agg, y_test_avg_add_agg = get_event_timex_avg_embeddings_agg(test_texts, test_add, None)
+X_test_main_add, X_test_mean_add, y_test_add = get_event_timex_embeddings(test_texts, test_add)
+#X_test_avg_add, y_test_avg_add = get_event_timex_avg_embeddings(test_texts, test_add)
+X_test_main_add_agg, X_test_mean_add_agg, y_test_add_agg = get_event_timex_embeddings_agg(test_texts, test_add)
+#X_test_avg_add_agg, y_test_avg_add_agg = get_event_timex_avg_embeddings_agg(test_texts, test_add)
 
 # eelviimane kiht
-X_test_main_penult, X_test_mean_penult, y_test_penult = get_event_timex_embeddings(test_texts, test_concat, 'penultimate')
-#X_test_avg_penult, y_test_avg_penult = get_event_timex_avg_embeddings(test_texts, test_concat, 'penultimate')
-X_test_main_penult_agg, X_test_mean_penult_agg, y_test_penult_agg = get_event_timex_embeddings_agg(test_texts, test_concat, 'penultimate')
-#X_test_avg_penult_agg, y_test_avg_penult_agg = get_event_timex_avg_embeddings_agg(test_texts, test_concat, 'penultimate')
+X_test_main_penult, X_test_mean_penult, y_test_penult = get_event_timex_embeddings(test_texts, test_penult)
+#X_test_avg_penult, y_test_avg_penult = get_event_timex_avg_embeddings(test_texts, test_penult)
+X_test_main_penult_agg, X_test_mean_penult_agg, y_test_penult_agg = get_event_timex_embeddings_agg(test_texts, test_penult)
+#X_test_avg_penult_agg, y_test_avg_penult_agg = get_event_timex_avg_embeddings_agg(test_texts, test_penult)
 
 # viimane kiht
-X_test_main_last, X_test_mean_last, y_test_last = get_event_timex_embeddings(test_texts, test_concat, 'last')
-X_test_main_last_agg, X_test_mean_last_agg, y_test_last_agg = get_event_timex_embeddings_agg(test_texts, test_concat, 'last')
+X_test_main_last, X_test_mean_last, y_test_last = get_event_timex_embeddings(test_texts, test_last)
+X_test_main_last_agg, X_test_mean_last_agg, y_test_last_agg = get_event_timex_embeddings_agg(test_texts, test_last)
 
 labels2idx = {'OVERLAP': 0,
               'BEFORE': 1,
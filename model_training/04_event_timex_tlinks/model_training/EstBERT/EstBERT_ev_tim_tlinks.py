@@ -4,7 +4,12 @@
 import os
 import pickle
 from estnltk import Text, Layer
-from estnltk.converters import text_to_json, json_to_text, json_to_layer
+from estnltk.converters import text_to_json
+import sys
+# -- corpus loading methods from data_preprocessing/corpus_preprocessing
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'data_preprocessing', 'corpus_preprocessing'))
+from corpus_methods.file_operations import load_Texts_from_dir
+from corpus_methods.embedding_store import EmbeddingStore
 
 import pandas as pd
 import numpy as np
@@ -28,53 +33,42 @@ def read_articles():
     tempfact_train_files = []
     tempfact_test_files = []
 
-    for filename in os.listdir(fn_path1+"train/"):
-        timeml_train_files.append(json_to_text(file=os.path.join(fn_path1+"train/", filename)))
-    for filename in os.listdir(fn_path1+"dev/"): # lisame dev failid train failide juurde
-        timeml_train_files.append(json_to_text(file=os.path.join(fn_path1+"dev/", filename)))
-    for filename in os.listdir(fn_path1+"test/"):
-        timeml_test_files.append(json_to_text(file=os.path.join(fn_path1+"test/", filename)))
-    for filename in os.listdir(fn_path2+"train_larger/"): # lisame dev failid train failide juurde
-        tempfact_train_files.append(json_to_text(file=os.path.join(fn_path2+"train_larger/", filename)))
-    for filename in os.listdir(fn_path2+"test/"):
-        tempfact_test_files.append(json_to_text(file=os.path.join(fn_path2+"test/", filename)))
+    timeml_train_files.extend(load_Texts_from_dir(fn_path1+"train/"))
+    timeml_train_files.extend(load_Texts_from_dir(fn_path1+"dev/")) # lisame dev failid train failide juurde
+    timeml_test_files.extend(load_Texts_from_dir(fn_path1+"test/"))
+    tempfact_train_files.extend(load_Texts_from_dir(fn_path2+"train_larger/")) # lisame dev failid train failide juurde
+    tempfact_test_files.extend(load_Texts_from_dir(fn_path2+"test/"))
     
     # embeddingutega lugemine train-dev-test hulkadesse    
     embed_path_estbert1 = "embeddings/BERT_embed_EstTimeML/"
     embed_path_estbert2 = "embeddings/BERT_embed_temp_facts/"
     
-    timeml_train_files_concat = []
-    timeml_test_files_concat = []
-    timeml_train_files_add = []
-    timeml_test_files_add = []
     
-    tempfact_train_files_concat = []
-    tempfact_test_files_concat = []
-    tempfact_train_files_add = []
-    tempfact_test_files_add = []
     
-    for text in timeml_train_files:
-        filename = text.meta['filename']
-        timeml_train_files_concat.append(json_to_layer(text, file=f"{embed_path_estbert1}{filename}_embed_concat.json"))
-        timeml_train_files_add.append(json_to_layer(text, file=f"{embed_path_estbert1}{filename}_embed_add.json"))
-    for text in timeml_test_files:
-        filename = text.meta['filename']
-        timeml_test_files_concat.append(json_to_layer(text, file=f"{embed_path_estbert1}{filename}_embed_concat.json"))
-        timeml_test_files_add.append(json_to_layer(text, file=f"{embed_path_estbert1}{filename}_embed_add.json"))
+    timeml_store = EmbeddingStore(embed_path_estbert1+"embed_layers")
+    timeml_train_files_concat = timeml_store.for_Texts(timeml_train_files, 'concat')
+    timeml_train_files_add = timeml_store.for_Texts(timeml_train_files, 'add')
+    timeml_train_files_penult = timeml_store.for_Texts(timeml_train_files, 'penultimate')
+    timeml_train_files_last = timeml_store.for_Texts(timeml_train_files, 'last')
+    timeml_test_files_concat = timeml_store.for_Texts(timeml_test_files, 'concat')
+    timeml_test_files_add = timeml_store.for_Texts(timeml_test_files, 'add')
+    timeml_test_files_penult = timeml_store.for_Texts(timeml_test_files, 'penultimate')
+    timeml_test_files_last = timeml_store.for_Texts(timeml_test_files, 'last')
         
-    for text in tempfact_train_files:
-        filename = text.meta['filename']
-        tempfact_train_files_concat.append(json_to_layer(text, file=f"{embed_path_estbert2}{filename}_embed_concat.json"))
-        tempfact_train_files_add.append(json_to_layer(text, file=f"{embed_path_estbert2}{filename}_embed_add.json"))
-    for text in tempfact_test_files:
-        filename = text.meta['filename']
-        tempfact_test_files_concat.append(json_to_layer(text, file=f"{embed_path_estbert2}{filename}_embed_concat.json"))
-        tempfact_test_files_add.append(json_to_layer(text, file=f"{embed_path_estbert2}{filename}_embed_add.json"))
+    tempfact_store = EmbeddingStore(embed_path_estbert2+"embed_layers")
+    tempfact_train_files_concat = tempfact_store.for_Texts(tempfact_train_files, 'concat')
+    tempfact_train_files_add = tempfact_store.for_Texts(tempfact_train_files, 'add')
+    tempfact_train_files_penult = tempfact_store.for_Texts(tempfact_train_files, 'penultimate')
+    tempfact_train_files_last = tempfact_store.for_Texts(tempfact_train_files, 'last')
+    tempfact_test_files_concat = tempfact_store.for_Texts(tempfact_test_files, 'concat')
+    tempfact_test_files_add = tempfact_store.for_Texts(tempfact_test_files, 'add')
+    tempfact_test_files_penult = tempfact_store.for_Texts(tempfact_test_files, 'penultimate')
+    tempfact_test_files_last = tempfact_store.for_Texts(tempfact_test_files, 'last')
     
     #print("Lugesin sisse", len(train_files_concat), len(train_files_add), "treeningandmete faili.")
     #print("Lugesin sisse", len(test_files_concat), len(test_files_add), "testandmete faili.")
     
-    return timeml_train_files, timeml_test_files, tempfact_train_files, tempfact_test_files, timeml_train_files_concat, timeml_train_files_add, timeml_test_files_concat, timeml_test_files_add, tempfact_train_files_concat, tempfact_train_files_add, tempfact_test_files_concat, tempfact_test_files_add
+    return timeml_train_files, timeml_test_files, tempfact_train_files, tempfact_test_files, timeml_train_files_concat, timeml_train_files_add, timeml_train_files_penult, timeml_train_files_last, timeml_test_files_concat, timeml_test_files_add, timeml_test_files_penult, timeml_test_files_last, tempfact_train_files_concat, tempfact_train_files_add, tempfact_train_files_penult, tempfact_train_files_last, tempfact_test_files_concat, tempfact_test_files_add, tempfact_test_files_penult, tempfact_test_files_last
 
 # finds timex phrases of given sentence, if they exist in tlink layer
 def get_sentence_phrases(text_obj, sentence, tlink_layer_name):
@@ -103,7 +97,7 @@ def get_sentence_phrase_main_word(phrase, text_obj, current_word):
             if current_word_span in phrase:
                 return current_word_span
 
-def get_event_timex_embeddings(timeml_text_list, timeml_text_embed_list, tempfact_text_list, tempfact_text_embed_list, layer_type):
+def get_event_timex_embeddings(timeml_text_list, timeml_text_embed_list, tempfact_text_list, tempfact_text_embed_list):
     """
     Leiab ja tagastab sündmuste-ajaväljendite peasõnade embeddingud ning tlink labelid.
     """            
@@ -148,15 +142,7 @@ def get_event_timex_embeddings(timeml_text_list, timeml_text_embed_list, tempfac
                 if word.nertag == 'B-EVENT' or word.nertag == 'I-EVENT':
                     if text.words.get(word[0]) in ev_word_spans:
                         ev_found = True
-                        if layer_type:
-                            # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                            if layer_type == "penultimate":
-                                event_main_embed.append(np.asarray(timeml_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                            # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                            elif layer_type == "last":
-                                event_main_embed.append(np.asarray(timeml_text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                        else:
-                            event_main_embed.append(np.asarray(timeml_text_embed_list[text_idx][idx2].bert_embedding))
+                        event_main_embed.append(np.asarray(timeml_text_embed_list[text_idx][idx2]))
                         break
             
             if not ev_found:
@@ -167,15 +153,7 @@ def get_event_timex_embeddings(timeml_text_list, timeml_text_embed_list, tempfac
             for idx2, word in enumerate(text.words):
                 if word in tm_word_spans and word in all_timexes_main_words:
                     tm_found = True
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            timex_main_embed.append(np.asarray(timeml_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            timex_main_embed.append(np.asarray(timeml_text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                    else:
-                        timex_main_embed.append(np.asarray(timeml_text_embed_list[text_idx][idx2].bert_embedding))
+                    timex_main_embed.append(np.asarray(timeml_text_embed_list[text_idx][idx2]))
                     break
             
             if not tm_found:
@@ -186,25 +164,9 @@ def get_event_timex_embeddings(timeml_text_list, timeml_text_embed_list, tempfac
             timex_phrase_embed = []
             for idx2, word in enumerate(text.words):
                 if word in ev_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            event_phrase_embed.append(np.asarray(timeml_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            event_phrase_embed.append(np.asarray(timeml_text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                    else:
-                        event_phrase_embed.append(np.asarray(timeml_text_embed_list[text_idx][idx2].bert_embedding))
+                    event_phrase_embed.append(np.asarray(timeml_text_embed_list[text_idx][idx2]))
                 elif word in tm_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            timex_phrase_embed.append(timeml_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            timex_phrase_embed.append(timeml_text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                    else:
-                        timex_phrase_embed.append(timeml_text_embed_list[text_idx][idx2].bert_embedding)
+                    timex_phrase_embed.append(timeml_text_embed_list[text_idx][idx2])
             
             # lisame sündmuse-ajaväljendi embeddingute aritmeetilise keskmise            
             event_timex_mean_embed.append(np.concatenate((np.mean(event_phrase_embed, 0), np.mean(timex_phrase_embed, 0))))
@@ -250,15 +212,7 @@ def get_event_timex_embeddings(timeml_text_list, timeml_text_embed_list, tempfac
                 if word.nertag == 'B-EVENT' or word.nertag == 'I-EVENT':
                     if text.words.get(word[0]) in ev_word_spans:
                         ev_found = True
-                        if layer_type:
-                            # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                            if layer_type == "penultimate":
-                                event_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                            # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                            elif layer_type == "last":
-                                event_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                        else:
-                            event_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding))
+                        event_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2]))
                         break
             
             if not ev_found:
@@ -269,15 +223,7 @@ def get_event_timex_embeddings(timeml_text_list, timeml_text_embed_list, tempfac
             for idx2, word in enumerate(text.words):
                 if word in tm_word_spans and word in all_timexes_main_words:
                     tm_found = True
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            timex_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            timex_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                    else:
-                        timex_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding))
+                    timex_main_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2]))
                     break
             
             if not tm_found:
@@ -288,25 +234,9 @@ def get_event_timex_embeddings(timeml_text_list, timeml_text_embed_list, tempfac
             timex_phrase_embed = []
             for idx2, word in enumerate(text.words):
                 if word in ev_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            event_phrase_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768]))
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            event_phrase_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-768:]))
-                    else:
-                        event_phrase_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2].bert_embedding))
+                    event_phrase_embed.append(np.asarray(tempfact_text_embed_list[text_idx][idx2]))
                 elif word in tm_word_spans:
-                    if layer_type:
-                        # kui eelviimane kiht, siis võtame vektoriks bert_embedding[-1536:-768]
-                        if layer_type == "penultimate":
-                            timex_phrase_embed.append(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-1536:-768])
-                        # kui viimane kiht, siis võtame vektoriteks bert_embedding[-768:]
-                        elif layer_type == "last":
-                            timex_phrase_embed.append(tempfact_text_embed_list[text_idx][idx2].bert_embedding[-768:])
-                    else:
-                        timex_phrase_embed.append(tempfact_text_embed_list[text_idx][idx2].bert_embedding)
+                    timex_phrase_embed.append(tempfact_text_embed_list[text_idx][idx2])
             
             # lisame sündmuse-ajaväljendi embeddingute aritmeetilise keskmise            
             event_timex_mean_embed.append(np.concatenate((np.mean(event_phrase_embed, 0), np.mean(timex_phrase_embed, 0))))
@@ -343,23 +273,23 @@ def run_pipeline(clf, save_path, clf_name, embed_type, X_train, y_train, X_test,
         f.write(f'{clf_name}, {embed_type} accuracy: {acc_score}\n')
     
 # tekstid ja embeddingud        
-timeml_train_texts, timeml_test_texts, tempfact_train_texts, tempfact_test_texts, timeml_train_concat, timeml_train_add, timeml_test_concat, timeml_test_add, tempfact_train_concat, tempfact_train_add, tempfact_test_concat, tempfact_test_add = read_articles()
+timeml_train_texts, timeml_test_texts, tempfact_train_texts, tempfact_test_texts, timeml_train_concat, timeml_train_add, timeml_train_penult, timeml_train_last, timeml_test_concat, timeml_test_add, timeml_test_penult, timeml_test_last, tempfact_train_concat, tempfact_train_add, tempfact_train_penult, tempfact_train_last, tempfact_test_concat, tempfact_test_add, tempfact_test_penult, tempfact_test_last = read_articles()
 
 # viimase nelja kihi konkatenatsioon
-X_train_main_concat, X_train_mean_concat, y_train_concat = get_event_timex_embeddings(timeml_train_texts, timeml_train_concat, tempfact_train_texts, tempfact_train_concat, None)
-X_test_main_concat, X_test_mean_concat, y_test_concat = get_event_timex_embeddings(timeml_test_texts, timeml_test_concat, tempfact_test_texts, tempfact_test_concat, None)
+X_train_main_concat, X_train_mean_concat, y_train_concat = get_event_timex_embeddings(timeml_train_texts, timeml_train_concat, tempfact_train_texts, tempfact_train_concat)
+X_test_main_concat, X_test_mean_concat, y_test_concat = get_event_timex_embeddings(timeml_test_texts, timeml_test_concat, tempfact_test_texts, tempfact_test_concat)
 
 # viimase nelja kihi summa
-X_train_main_add, X_train_mean_add, y_train_add = get_event_timex_embeddings(timeml_train_texts, timeml_train_add, tempfact_train_texts, tempfact_train_add, None)
-X_test_main_add, X_test_mean_add, y_test_add = get_event_timex_embeddings(timeml_test_texts, timeml_test_add, tempfact_test_texts, tempfact_test_add, None)
+X_train_main_add, X_train_mean_add, y_train_add = get_event_timex_embeddings(timeml_train_texts, timeml_train_add, tempfact_train_texts, tempfact_train_add)
+X_test_main_add, X_test_mean_add, y_test_add = get_event_timex_embeddings(timeml_test_texts, timeml_test_add, tempfact_test_texts, tempfact_test_add)
 
 # eelviimane kiht
-X_train_main_penult, X_train_mean_penult, y_train_penult = get_event_timex_embeddings(timeml_train_texts, timeml_train_concat, tempfact_train_texts, tempfact_train_concat, 'penultimate')
-X_test_main_penult, X_test_mean_penult, y_test_penult = get_event_timex_embeddings(timeml_test_texts, timeml_test_concat, tempfact_test_texts, tempfact_test_concat, 'penultimate')
+X_train_main_penult, X_train_mean_penult, y_train_penult = get_event_timex_embeddings(timeml_train_texts, timeml_train_penult, tempfact_train_texts, tempfact_train_penult)
+X_test_main_penult, X_test_mean_penult, y_test_penult = get_event_timex_embeddings(timeml_test_texts, timeml_test_penult, tempfact_test_texts, tempfact_test_penult)
 
 # viimane kiht
-X_train_main_last, X_train_mean_last, y_train_last = get_event_timex_embeddings(timeml_train_texts, timeml_train_concat, tempfact_train_texts, tempfact_train_concat, 'last')
-X_test_main_last, X_test_mean_last, y_test_last = get_event_timex_embeddings(timeml_test_texts, timeml_test_concat, tempfact_test_texts, tempfact_test_concat, 'last')
+X_train_main_last, X_train_mean_last, y_train_last = get_event_timex_embeddings(timeml_train_texts, timeml_train_last, tempfact_train_texts, tempfact_train_last)
+X_test_main_last, X_test_mean_last, y_test_last = get_event_timex_embeddings(timeml_test_texts, timeml_test_last, tempfact_test_texts, tempfact_test_last)
 
 # klasside arv treeningandmestikus
 n_classes = len(set(list(y_train_concat)))